@@ -5,7 +5,7 @@ from django.utils.translation import gettext_lazy as _
 from simple_history.admin import SimpleHistoryAdmin
 
 # from accounts.forms import CustomUserCreationForm, CustomUserChangeForm
-from accounts.models import User, TenantQuota, Tenant, Profile
+from accounts.models import User, TenantQuota, TenantQuotaCounter, Tenant, Profile
 
 
 @admin.register(User)
@@ -77,6 +77,12 @@ class TenantQuotaAdmin(admin.ModelAdmin):
     list_display_links = ["name", "total_hours_allowed"]
 
 
+@admin.register(TenantQuotaCounter)
+class TenantQuotaCounterAdmin(admin.ModelAdmin):
+    list_display = ["tenant", "skus_remaining", "parse_units_remaining"]
+    raw_id_fields = ["tenant"]
+
+
 @admin.register(Tenant)
 class TenantAdmin(SimpleHistoryAdmin):
     history_list_display = ["tenant_status"]
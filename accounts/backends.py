@@ -0,0 +1,51 @@
+"""
+Tenant-scoped object permissions.
+
+All data in the app belongs to a tenant and is shared by the users of that tenant, so object permissions are
+derived from the tenant instead of being stored per object (as django-guardian does with one row per object).
+"""
+
+from django.contrib.auth.backends import BaseBackend
+from django.contrib.auth.models import AnonymousUser
+from django.db.models import Model
+from django.db.models.options import Options
+
+from accounts.models import Tenant, TenantStatus, User
+
+
+def get_user_tenant_ids(user: User | AnonymousUser) -> frozenset[int]:
+    """Returns the IDs of the tenants whose objects the user can access.
+
+    The result is cached on the user object (like ModelBackend caches the user's permissions),
+    so it is queried at most once per request.
+    """
+    if not user.is_active or user.is_anonymous:
+        return frozenset()
+    if not hasattr(user, "_tenant_ids_cache"):
+        user._tenant_ids_cache = frozenset(
+            Tenant.objects.filter(users=user).exclude(status=TenantStatus.DELETED).values_list("id", flat=True)
+        )
+    return user._tenant_ids_cache
+
+
+def _get_model_codenames(meta: Options) -> set[str]:
+    """Codenames of the model's default (add, change, ...) and custom permissions."""
+    codenames = {f"{action}_{meta.model_name}" for action in meta.default_permissions}
+    codenames.update(codename for codename, _ in meta.permissions)
+    return codenames
+
+
+class TenantPermissionBackend(BaseBackend):
+    """Grants the model's permissions on an object to the users of the object's tenant."""
+
+    def has_perm(self, user_obj: User | AnonymousUser, perm: str, obj: Model | None = None) -> bool:
+        if obj is None or not hasattr(obj, "tenant_id"):
+            return False
+
+        app_label, _, codename = perm.rpartition(".")
+        meta = obj._meta
+        if app_label and app_label != meta.app_label:
+            return False
+        if codename not in _get_model_codenames(meta):
+            return False
+        return obj.tenant_id in get_user_tenant_ids(user_obj)
@@ -0,0 +1,16 @@
+from typing import Callable
+
+from django.http import HttpRequest, HttpResponse
+
+from accounts.tenant_context import get_tenant_context
+
+
+class TenantContextMiddleware:
+    """Sets request.tenant_ctx (see accounts.tenant_context). Must come after AuthenticationMiddleware."""
+
+    def __init__(self, get_response: Callable[[HttpRequest], HttpResponse]) -> None:
+        self.get_response = get_response
+
+    def __call__(self, request: HttpRequest) -> HttpResponse:
+        request.tenant_ctx = get_tenant_context(request.user)
+        return self.get_response(request)
@@ -0,0 +1,21 @@
+# Generated by Django 5.1.4 on 2026-10-19 01:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("accounts", "0001_initial"),
+        ("auth", "0012_alter_user_first_name_max_length"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="user",
+            index=models.Index(
+                condition=models.Q(("is_active", True), ("is_demo_user", True)),
+                fields=["created_at"],
+                name="active_demo_user_idx",
+            ),
+        ),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 5.1.4 on 2026-10-19 01:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("accounts", "0002_active_demo_user_index"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="historicaltenant",
+            name="status",
+            field=models.IntegerField(
+                choices=[
+                    (1, "Trialing"),
+                    (2, "Active"),
+                    (3, "Exempt"),
+                    (4, "Canceled"),
+                    (5, "Trial expired"),
+                    (6, "Deleted"),
+                ],
+                default=2,
+            ),
+        ),
+        migrations.AlterField(
+            model_name="tenant",
+            name="status",
+            field=models.IntegerField(
+                choices=[
+                    (1, "Trialing"),
+                    (2, "Active"),
+                    (3, "Exempt"),
+                    (4, "Canceled"),
+                    (5, "Trial expired"),
+                    (6, "Deleted"),
+                ],
+                default=2,
+            ),
+        ),
+    ]
@@ -0,0 +1,61 @@
+# Generated by Django 5.1.4 on 2026-10-19 01:50
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def create_quota_counters(apps, schema_editor):
+    """The remaining quota of each tenant starts from what is left in its (possibly shared) TenantQuota row."""
+    Tenant = apps.get_model("accounts", "Tenant")
+    TenantQuotaCounter = apps.get_model("accounts", "TenantQuotaCounter")
+    TenantQuotaCounter.objects.bulk_create(
+        [
+            TenantQuotaCounter(
+                tenant_id=tenant_id,
+                skus_remaining=skus_limit or 0,
+                parse_units_remaining=parse_units_limit or 0,
+            )
+            for tenant_id, skus_limit, parse_units_limit in Tenant.objects.filter(quota__isnull=False).values_list(
+                "id", "quota__skus_limit", "quota__parse_units_limit"
+            )
+        ],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("accounts", "0003_tenant_status_deleted"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="TenantQuotaCounter",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("skus_remaining", models.PositiveIntegerField(default=0)),
+                ("parse_units_remaining", models.PositiveIntegerField(default=0)),
+                (
+                    "tenant",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="quota_counter",
+                        to="accounts.tenant",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Остаток квоты",
+                "verbose_name_plural": "Остатки квот",
+            },
+        ),
+        migrations.RunPython(create_quota_counters, migrations.RunPython.noop),
+    ]
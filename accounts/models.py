@@ -95,6 +95,7 @@ class TenantStatus(models.IntegerChoices):
     EXEMPT = 3, _("Exempt")  # # for using service without paying, e.g. admins, etc
     CANCELED = 4, _("Canceled")
     TRIAL_EXPIRED = 5, _("Trial expired")
+    DELETED = 6, _("Deleted")  # its data is being purged in the background, see utils.tenant_deletion
 
 
 class Tenant(models.Model):
@@ -170,7 +171,9 @@ class Tenant(models.Model):
 
         self.payment_plan = new_plan
         self._update_quota_for_plan(new_plan)
-        self.save()
+        self.save(update_fields=["payment_plan", "quota"])
+        # the counters are created again from the new plan's limits on the next use
+        TenantQuotaCounter.objects.filter(tenant=self).delete()
         logger.info("Successfully switched plan for tenant '%s' to '%s'", self.name, new_plan.get_name_display())
 
     def _update_quota_for_plan(self, new_plan) -> None:
@@ -192,7 +195,7 @@ class Tenant(models.Model):
         if amount < 0:
             raise ValueError("Cannot add a negative amount to the balance.")
         self.balance += amount
-        self.save()
+        self.save(update_fields=["balance"])
 
     def deduct_from_balance(self, amount: Decimal) -> None:
         """
@@ -203,7 +206,26 @@ class Tenant(models.Model):
         if self.balance < amount:
             raise ValueError("Insufficient balance to deduct the requested amount.")
         self.balance -= amount
-        self.save()
+        self.save(update_fields=["balance"])
+
+
+class TenantQuotaCounter(models.Model):
+    """
+    What is left of the tenant's quota.
+    TenantQuota rows hold the limits of a plan and are shared by all tenants on it, so the usage is counted per tenant.
+    The counters are only changed with conditional UPDATEs, see utils.billing.reserve_quota.
+    """
+
+    tenant = models.OneToOneField(Tenant, on_delete=models.CASCADE, related_name="quota_counter")
+    skus_remaining = models.PositiveIntegerField(default=0)
+    parse_units_remaining = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        verbose_name = "Остаток квоты"
+        verbose_name_plural = "Остатки квот"
+
+    def __str__(self):
+        return f"{self.tenant} - {self.skus_remaining} / {self.parse_units_remaining}"
 
 
 class User(AbstractUser):
@@ -230,6 +252,12 @@ class User(AbstractUser):
     class Meta:
         indexes = [
             models.Index(fields=["tenant"]),
+            # used to find expired demo users, see utils.demo.deactivate_expired_demo_users
+            models.Index(
+                fields=["created_at"],
+                condition=models.Q(is_demo_user=True, is_active=True),
+                name="active_demo_user_idx",
+            ),
         ]
         verbose_name = "Пользователь"
         verbose_name_plural = "Пользователи"
@@ -5,6 +5,7 @@ from django.db.models.signals import post_save, pre_save
 from django.dispatch import receiver
 
 from accounts.models import Tenant, TenantQuota, PaymentPlan, User, Profile
+from accounts.tenant_context import invalidate_tenant_context
 
 
 @receiver(post_save, sender=Tenant)
@@ -23,6 +24,22 @@ def assign_default_plan_quota(sender, instance, created, **kwargs):
         instance.save()
 
 
+# Saving the tenant covers plan switches and balance changes
+@receiver(post_save, sender=Tenant)
+def invalidate_tenant_context_on_tenant_save(sender, instance, created, **kwargs):  # type: ignore  # pylint: disable=[unused-argument]
+    invalidate_tenant_context(instance.id)
+
+
+@receiver(post_save, sender=TenantQuota)
+def invalidate_tenant_context_on_quota_save(sender, instance, **kwargs):  # type: ignore  # pylint: disable=[unused-argument]
+    invalidate_tenant_context(*instance.tenants.values_list("id", flat=True))
+
+
+@receiver(post_save, sender=PaymentPlan)
+def invalidate_tenant_context_on_plan_save(sender, instance, **kwargs):  # type: ignore  # pylint: disable=[unused-argument]
+    invalidate_tenant_context(*Tenant.objects.filter(payment_plan=instance).values_list("id", flat=True))
+
+
 # Add user to the Tenant group upon creation
 @receiver(post_save, sender=User)
 def add_user_to_group(sender, instance, created, **kwargs):  # type: ignore  # pylint: disable=[unused-argument]
@@ -0,0 +1,67 @@
+"""
+The tenant, payment plan and quota of the logged-in user.
+
+Views need them on almost every request, and each of them used to be a separate lazy query
+(request.user.tenant, tenant.payment_plan, tenant.quota). They are now loaded together with one select_related
+query and shared between requests for config.TENANT_CONTEXT_CACHE_SECONDS. The cached tenant is invalidated
+whenever the tenant, its quota or its plan is saved (see accounts.signals).
+
+The cache must be shared by all the processes in production (see settings.CACHES), otherwise the invalidations
+only reach the process that saved. The cached tenant is for reading only: code that changes the tenant (balance, plan)
+loads it from the database with select_for_update instead, so that it never saves outdated values.
+"""
+
+import logging
+from dataclasses import dataclass
+
+from django.core.cache import cache
+
+import config
+from accounts.models import PaymentPlan, Tenant, TenantQuota, User
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class TenantContext:
+    user: User
+    tenant: Tenant | None
+    payment_plan: PaymentPlan | None
+    quota: TenantQuota | None
+
+
+def _get_cache_key(tenant_id: int) -> str:
+    return f"tenant_ctx:{tenant_id}"
+
+
+def get_tenant_context(user: User) -> TenantContext:
+    """Returns the tenant context of the user, from the cache if possible.
+
+    The loaded tenant is also set as user.tenant, so that code using request.user.tenant
+    (and its payment_plan and quota) doesn't query them again.
+    """
+    if not user.is_authenticated or user.tenant_id is None:
+        return TenantContext(user=user, tenant=None, payment_plan=None, quota=None)
+
+    cache_key = _get_cache_key(user.tenant_id)
+    tenant = cache.get(cache_key)
+    if tenant is None:
+        tenant = Tenant.objects.select_related("payment_plan", "quota").filter(id=user.tenant_id).first()
+        if tenant is None:
+            return TenantContext(user=user, tenant=None, payment_plan=None, quota=None)
+        cache.set(cache_key, tenant, config.TENANT_CONTEXT_CACHE_SECONDS)
+
+    user.tenant = tenant
+    return TenantContext(user=user, tenant=tenant, payment_plan=tenant.payment_plan, quota=tenant.quota)
+
+
+def invalidate_tenant_context(*tenant_ids: int) -> None:
+    """Drops the cached context of the tenants, the next request loads it from the database again.
+
+    Called when the tenants are saved, so a cache outage is only logged: the write itself must not fail.
+    The outdated context then expires after config.TENANT_CONTEXT_CACHE_SECONDS.
+    """
+    try:
+        cache.delete_many([_get_cache_key(tenant_id) for tenant_id in tenant_ids])
+    except Exception:
+        logger.exception("Failed to invalidate the cached context of tenants %s", tenant_ids)
@@ -2,7 +2,7 @@ import logging
 
 from allauth.account.utils import send_email_confirmation
 from django.contrib import messages
-from django.contrib.auth import authenticate, login, logout
+from django.contrib.auth import login, logout
 from django.contrib.auth import get_user_model
 from django.contrib.auth.decorators import user_passes_test, login_required
 from django.core.exceptions import ValidationError
@@ -10,15 +10,11 @@ from django.db import transaction, IntegrityError
 from django.http import HttpResponseRedirect, HttpResponse
 from django.shortcuts import redirect, render
 from django.urls import reverse
-from django_celery_beat.models import PeriodicTask
 from django_htmx.http import HttpResponseClientRedirect
 
-import config
 from accounts.forms import ProfileForm, EmailChangeForm
-from main.models import Item
-from utils import demo
-from utils.billing import set_tenant_quota
-from utils.task_utils import task_name
+from main.tasks import delete_tenant_task, refill_demo_pool_task
+from utils import demo, tenant_deletion
 
 logger = logging.getLogger(__name__)
 user = get_user_model()
@@ -36,27 +32,20 @@ def logout_view(request):
 @transaction.atomic
 def demo_view(request) -> HttpResponse | HttpResponseRedirect:
     """
-    Creates a demo user and logs them in.
+    Logs in a demo user claimed from the pre-provisioned demo pool and refills the pool in the background.
+    A demo user is only created within the request if the pool is empty.
     Demo is expired after DEMO_USER_HOURS_ALLOWED hours (see accounts/models.py).
     """
     try:
-        demo_user, password_uuid = demo.create_demo_user()
-        set_tenant_quota(tenant=demo_user.tenant)
-        demo_items = demo.create_demo_items(demo_user)
-        demo_user.tenant.quota.skus_limit = config.DEMO_USER_MAX_ALLOWED_SKUS - len(demo_items)
-        demo_user.tenant.quota.save()
+        demo_user = demo.claim_demo_user() or demo.provision_demo_user()
     except (IntegrityError, ValidationError):
         return render(request, "account/demo_error.html")
     except Exception as e:
         logger.error("Unexpected error in demo_view: %s", e)
         return render(request, "account/demo_error.html")
 
-    demo_user = authenticate(request, username=demo_user.email, password=password_uuid)
-    if demo_user is not None:
-        login(request, demo_user, backend="django.contrib.auth.backends.ModelBackend")
-    else:
-        logger.error("Authentication failed for demo user %s", demo_user.email)
-        return render(request, "account/demo_error.html")
+    transaction.on_commit(refill_demo_pool_task.delay)
+    login(request, demo_user, backend="django.contrib.auth.backends.ModelBackend")
 
     if request.htmx:
         # this is required to make the redirect work properly with htmx's hx-get
@@ -70,48 +59,11 @@ def check_expired_demo_users(request):
     """
     For superusers only.
     This is a mirror of mp_monitor.celery.check_expired_demo_users celery task. In case manual intervention is needed.
-    Checks if any demo users are expired and deletes the corresponding periodic tasks, deactivates the user and
+    Checks if any demo users are expired and deletes the corresponding scrape schedules, deactivates the user and
     the parser for all items belonging to the user.
     """
     if request.method == "POST":
-        users_to_check = user.objects.filter(is_demo_user=True).filter(is_active=True).select_related("tenant")
-        logger.info("Found %s active demo users", users_to_check.count())
-        periodic_tasks_to_check = PeriodicTask.objects.filter(name__startswith="task_tenant_")
-        users_to_update = []
-        tenant_ids_for_items_deletion = []
-        periodic_tasks_to_delete = []
-
-        for user_to_check in users_to_check:
-            if not user_to_check.is_active_demo_user:
-                print(f"Checking if user {user_to_check} has an active periodic task...")
-
-                # look for matching periodic task without querying the database
-                matching_task = [task for task in periodic_tasks_to_check if task.name == task_name(user_to_check)]
-                if matching_task:
-                    tenant_ids_for_items_deletion.append(user_to_check.tenant.id)
-                    periodic_tasks_to_delete.append(matching_task[0].id)
-
-                # Update user status in memory
-                logger.info("Preparing to deactivate user %s", user_to_check)
-                user_to_check.is_demo_active = False
-                user_to_check.is_active = False
-                users_to_update.append(user_to_check)
-            else:
-                print(f"Demo not yet expired for {user_to_check} (id={user_to_check.id})")
-
-        with transaction.atomic():
-            # Perform bulk delete for items
-            if tenant_ids_for_items_deletion:
-                Item.objects.filter(tenant_id__in=tenant_ids_for_items_deletion).delete()
-
-            # Perform bulk delete for periodic tasks
-            if periodic_tasks_to_delete:
-                PeriodicTask.objects.filter(id__in=periodic_tasks_to_delete).delete()
-
-            # Perform bulk update for users
-            if users_to_update:
-                user.objects.bulk_update(users_to_update, ["is_demo_active", "is_active"])
-        logger.info("Bulk update completed for expired demo users.")
+        demo.deactivate_expired_demo_users()
     return redirect("index")
 
 
@@ -187,7 +139,7 @@ def email_verify(request):
     return redirect("profile_settings")
 
 
-# WARNING: Deleting the account will cascade delete the associated tenant and all its data
+# WARNING: Deleting the account deletes the associated tenant and all its data (in the background)
 # TODO(multitenancy): Currently safe to delete tenants as they are 1:1 with users.
 # When implementing full multitenancy support:
 # 1. Ensure tenant names are unique
@@ -198,7 +150,8 @@ def profile_delete_view(request):
     user = request.user
     if request.method == "POST":
         logout(request)
-        user.tenant.delete()
+        tenant_deletion.mark_tenant_deleted(user.tenant)
+        delete_tenant_task.delay(user.tenant_id)
         messages.success(request, "Аккаунт удалён. Очень жаль!")
         return redirect("index")
 
@@ -9,9 +9,31 @@ from decimal import Decimal
 DEMO_USER_HOURS_ALLOWED = 12
 DEMO_USER_MAX_ALLOWED_SKUS = 10
 DEMO_USER_ALLOWED_PARSE_UNITS = 150
+DEMO_POOL_SIZE = 20  # pre-provisioned demo users waiting to be claimed by the demo view
+DEMO_USERS_CLEANUP_CHUNK_SIZE = 1000  # expired demo users deactivated per transaction
+TENANT_DELETION_BATCH_SIZE = 1000  # rows deleted per statement when purging a deleted tenant's data
+TENANT_CONTEXT_CACHE_SECONDS = 60  # how long tenant, plan and quota of request.tenant_ctx are shared between requests
+NOTIFICATION_DIGEST_WINDOW_MINUTES = 5  # price changes of a tenant within this window are sent in one email
+EMAIL_MESSAGES_PER_CONNECTION = 50  # emails sent over one SMTP connection before it is reopened
+NOTIFICATION_ROW_CACHE_SECONDS = 60 * 60  # rendered item rows of the price change emails, see notifier.rendering
+NOTIFIER_QUEUE_SIZE = 100  # notifications waiting per channel before the dispatcher waits for the channel's workers
+NOTIFIER_MAX_ATTEMPTS = 4  # attempts to send a notification before it is dead-lettered
+NOTIFIER_RETRY_BACKOFF_SECONDS = 2  # delay before the first retry, doubled with every attempt
+NOTIFIER_HTTP_TIMEOUT_SECONDS = 10  # timeout of the webhook and Telegram requests
+DB_REPLICA_STICKY_SECONDS = 30  # a session reads from the primary for this long after it wrote to it
+DB_REPLICA_MAX_LAG_SECONDS = 5  # a replica further behind than this is not read from
+DB_REPLICA_CHECK_SECONDS = 10  # how long the result of the replica availability check is cached
 HOURS_ALLOWED = 24 * 30 * 12 * 10  # 10 years, should reset every month, so it's effectively infinite
 MAX_ITEMS_ON_SCREEN = 10  # used in the messages when many items are scraped
 MAX_RETRIES = 10
+SCHEDULED_SCRAPE_CHUNK_SIZE = 50  # number of SKUs scraped by a single task during scheduled updates
+SCHEDULER_TICK_SECONDS = 60  # how often the scheduler looks for items that are due for an update
+FREE_PLAN_MIN_SCHEDULE_INTERVAL_HOURS = 24
+SCHEDULED_RUN_LOCK_TTL_SECONDS = 600  # a run's lock expires unless its chunks keep extending it
+ADAPTIVE_POLLING_WINDOW_DAYS = 7  # price history used to estimate how often an item's price changes
+ADAPTIVE_POLLING_MAX_SPEEDUP = 4  # volatile items are polled up to this many times more often than scheduled
+ADAPTIVE_POLLING_MAX_SLOWDOWN = 4  # stable items are polled up to this many times less often than scheduled
+SCRAPE_JOB_RETENTION_DAYS = 7  # finished manual scrape jobs are purged after this many days
 
 
 class PlanType(Enum):
@@ -1,7 +1,7 @@
 from django.contrib import admin
 
 from accounts.models import PaymentPlan
-from main.models import Item, Price, Payment, Order
+from main.models import Item, Price, Payment, Order, Schedule, ScheduledRun, ScrapeJob
 
 
 @admin.register(Item)
@@ -32,5 +32,32 @@ class OrderAdmin(admin.ModelAdmin):
     search_help_text = "Search by tenant or order ID"
 
 
+@admin.register(ScrapeJob)
+class ScrapeJobAdmin(admin.ModelAdmin):
+    list_display = ("id", "tenant", "kind", "status", "processed", "total", "created_at", "finished_at")
+    list_filter = ("status", "kind")
+
+
+@admin.register(Schedule)
+class ScheduleAdmin(admin.ModelAdmin):
+    list_display = (
+        "tenant",
+        "interval_value",
+        "period",
+        "jitter_seconds",
+        "is_adaptive",
+        "last_run_at",
+        "locked_until",
+    )
+    list_editable = ("jitter_seconds",)
+
+
+@admin.register(ScheduledRun)
+class ScheduledRunAdmin(admin.ModelAdmin):
+    list_display = ("tenant", "status", "sku_count", "failures", "lock_wait", "duration", "started_at")
+    list_filter = ("status",)
+    search_fields = ("tenant__name",)
+
+
 admin.site.register(PaymentPlan)
 admin.site.register(Payment)
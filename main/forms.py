@@ -39,7 +39,7 @@ class ScrapeIntervalFormOld(forms.Form):
 class ScrapeIntervalForm(ModelForm):
     class Meta:
         model = Schedule
-        fields = ["interval_value", "period"]
+        fields = ["interval_value", "period", "is_adaptive"]
 
     def __init__(self, *args, **kwargs):
         """
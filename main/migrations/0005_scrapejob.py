@@ -0,0 +1,83 @@
+# Generated by Django 5.1.4 on 2026-10-19 00:55
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("accounts", "0001_initial"),
+        ("main", "0004_alter_item_price_alter_item_seller_price"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ScrapeJob",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "kind",
+                    models.CharField(
+                        choices=[
+                            ("scrape", "Добавление товаров"),
+                            ("update", "Обновление товаров"),
+                        ],
+                        default="scrape",
+                        max_length=20,
+                    ),
+                ),
+                (
+                    "status",
+                    models.CharField(
+                        choices=[
+                            ("pending", "В очереди"),
+                            ("running", "Выполняется"),
+                            ("completed", "Завершено"),
+                            ("failed", "Ошибка"),
+                        ],
+                        default="pending",
+                        max_length=20,
+                    ),
+                ),
+                ("task_id", models.CharField(blank=True, max_length=255, null=True)),
+                ("skus", models.JSONField(default=list)),
+                ("total", models.PositiveIntegerField(default=0)),
+                ("processed", models.PositiveIntegerField(default=0)),
+                (
+                    "items_data",
+                    models.JSONField(default=list, help_text="Данные успешно обработанных товаров"),
+                ),
+                ("invalid_skus", models.JSONField(default=list)),
+                ("is_reported", models.BooleanField(default=False)),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("finished_at", models.DateTimeField(blank=True, null=True)),
+                (
+                    "tenant",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="scrape_jobs",
+                        to="accounts.tenant",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Задача парсинга",
+                "verbose_name_plural": "Задачи парсинга",
+                "ordering": ["created_at"],
+                "indexes": [
+                    models.Index(
+                        fields=["tenant", "is_reported"],
+                        name="main_scrape_tenant__75e11d_idx",
+                    )
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,75 @@
+# Generated by Django 5.1.4 on 2026-10-19 01:07
+
+from datetime import timedelta
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def move_periodic_tasks_to_schedules(apps, schema_editor):
+    """Replace the per-tenant `task_tenant_<id>` periodic tasks with tenant schedules."""
+    PeriodicTask = apps.get_model("django_celery_beat", "PeriodicTask")
+    Schedule = apps.get_model("main", "Schedule")
+    Item = apps.get_model("main", "Item")
+
+    periodic_tasks = PeriodicTask.objects.filter(
+        name__startswith="task_tenant_", task="main.tasks.update_or_create_items_task"
+    ).select_related("interval")
+    for periodic_task in periodic_tasks:
+        tenant_id = int(periodic_task.name.removeprefix("task_tenant_"))
+        if periodic_task.interval is not None:
+            Schedule.objects.update_or_create(
+                tenant_id=tenant_id,
+                defaults={
+                    "interval_value": periodic_task.interval.every,
+                    "period": periodic_task.interval.period,
+                    "last_run_at": periodic_task.last_run_at,
+                },
+            )
+            run_every = timedelta(**{periodic_task.interval.period: periodic_task.interval.every})
+            Item.objects.filter(tenant_id=tenant_id, is_parser_active=True).update(
+                next_run_at=(periodic_task.last_run_at or timezone.now()) + run_every
+            )
+        periodic_task.delete()
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("accounts", "0001_initial"),
+        ("django_celery_beat", "0019_alter_periodictasks_options"),
+        ("main", "0005_scrapejob"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="item",
+            name="next_run_at",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="schedule",
+            name="last_run_at",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="schedule",
+            name="tenant",
+            field=models.OneToOneField(
+                blank=True,
+                null=True,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="scrape_schedule",
+                to="accounts.tenant",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="item",
+            index=models.Index(
+                condition=models.Q(("is_parser_active", True)),
+                fields=["next_run_at"],
+                name="item_due_idx",
+            ),
+        ),
+        migrations.RunPython(move_periodic_tasks_to_schedules, migrations.RunPython.noop),
+    ]
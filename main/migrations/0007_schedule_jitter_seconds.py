@@ -0,0 +1,17 @@
+# Generated by Django 5.1.4 on 2026-10-19 01:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("main", "0006_central_scheduler"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="schedule",
+            name="jitter_seconds",
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
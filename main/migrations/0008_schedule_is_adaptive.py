@@ -0,0 +1,17 @@
+# Generated by Django 5.1.4 on 2026-10-19 01:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("main", "0007_schedule_jitter_seconds"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="schedule",
+            name="is_adaptive",
+            field=models.BooleanField(default=False, verbose_name="Адаптивная частота"),
+        ),
+    ]
@@ -0,0 +1,74 @@
+# Generated by Django 5.1.4 on 2026-10-19 01:22
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("accounts", "0001_initial"),
+        ("main", "0008_schedule_is_adaptive"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="schedule",
+            name="lock_token",
+            field=models.CharField(blank=True, default="", max_length=32),
+        ),
+        migrations.AddField(
+            model_name="schedule",
+            name="locked_at",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="schedule",
+            name="locked_until",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.CreateModel(
+            name="ScheduledRun",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "status",
+                    models.CharField(
+                        choices=[("completed", "Завершен"), ("skipped", "Пропущен")],
+                        max_length=20,
+                    ),
+                ),
+                ("sku_count", models.PositiveIntegerField(default=0)),
+                ("lock_wait", models.DurationField(blank=True, null=True)),
+                ("started_at", models.DateTimeField()),
+                ("finished_at", models.DateTimeField(blank=True, null=True)),
+                ("duration", models.DurationField(blank=True, null=True)),
+                (
+                    "tenant",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="scheduled_runs",
+                        to="accounts.tenant",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Запуск по расписанию",
+                "verbose_name_plural": "Запуски по расписанию",
+                "ordering": ["-started_at"],
+                "indexes": [
+                    models.Index(
+                        fields=["tenant", "-started_at"],
+                        name="main_schedu_tenant__1c1fec_idx",
+                    )
+                ],
+            },
+        ),
+    ]
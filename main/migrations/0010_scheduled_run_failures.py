@@ -0,0 +1,17 @@
+# Generated by Django 5.1.4 on 2026-10-19 01:29
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("main", "0009_scheduled_run_locks"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="scheduledrun",
+            name="failures",
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
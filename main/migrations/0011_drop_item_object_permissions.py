@@ -0,0 +1,26 @@
+from django.db import migrations
+
+
+def drop_item_object_permissions(apps, schema_editor):
+    """Item permissions are derived from the tenant now (accounts.backends.TenantPermissionBackend)."""
+    ContentType = apps.get_model("contenttypes", "ContentType")
+    GroupObjectPermission = apps.get_model("guardian", "GroupObjectPermission")
+    UserObjectPermission = apps.get_model("guardian", "UserObjectPermission")
+
+    item_content_type = ContentType.objects.filter(app_label="main", model="item").first()
+    if item_content_type is None:
+        return
+    GroupObjectPermission.objects.filter(content_type=item_content_type).delete()
+    UserObjectPermission.objects.filter(content_type=item_content_type).delete()
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("contenttypes", "0002_remove_content_type_name"),
+        ("guardian", "0002_generic_permissions_index"),
+        ("main", "0010_scheduled_run_failures"),
+    ]
+
+    operations = [
+        migrations.RunPython(drop_item_object_permissions, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 5.1.4 on 2026-10-19 01:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("main", "0011_drop_item_object_permissions"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="scrapejob",
+            name="reserved_parse_units",
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="scrapejob",
+            name="reserved_skus",
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
@@ -0,0 +1,16 @@
+# Generated by Django 5.1.4 on 2026-10-19 02:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("main", "0012_scrape_job_reserved_quota"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="price",
+            index=models.Index(fields=["item", "-created_at"], name="price_item_created_idx"),
+        ),
+    ]
@@ -0,0 +1,32 @@
+from django.core.exceptions import PermissionDenied
+from django.db.models import QuerySet
+
+from accounts.backends import get_user_tenant_ids
+from main.models import Item
+
+
+class TenantPermissionListMixin:
+    """Limits the queryset of a view to the objects of the user's tenant.
+
+    Replaces guardian's PermissionListMixin, see accounts.backends.TenantPermissionBackend.
+    """
+
+    def get_queryset(self) -> QuerySet[Item]:
+        queryset = super().get_queryset()
+        return queryset.filter(tenant_id__in=get_user_tenant_ids(self.request.user))
+
+
+class TenantPermissionRequiredMixin(TenantPermissionListMixin):
+    """Checks `permission_required` on the view's object.
+
+    Objects of other tenants are not found at all (404).
+    Replaces guardian's PermissionRequiredMixin, see accounts.backends.TenantPermissionBackend.
+    """
+
+    permission_required: list[str] = []
+
+    def get_object(self, queryset: QuerySet[Item] | None = None) -> Item:
+        obj = super().get_object(queryset)
+        if not self.request.user.has_perms(self.permission_required, obj):
+            raise PermissionDenied
+        return obj
@@ -1,16 +1,13 @@
 import logging
-from datetime import datetime
+import zlib
+from datetime import datetime, timedelta
 
 from _decimal import InvalidOperation, DivisionByZero
-from django.contrib.auth.models import Group
 from django.core.validators import MinValueValidator
 from django.db import models
 from django.db.models import Q, Max, Min, Avg
-from django.db.models.signals import post_save
-from django.dispatch import receiver
 from django.urls import reverse
 from django.utils.translation import gettext_lazy as _
-from guardian.shortcuts import assign_perm, get_perms
 
 from accounts.models import Tenant
 
@@ -49,12 +46,18 @@ class Item(models.Model):
     schedule = models.CharField(max_length=255, null=True, blank=True)
     is_in_stock = models.BooleanField(default=True)
     is_notifier_active = models.BooleanField(default=False)
+    # when the item is due for its next scheduled update, see main.tasks.dispatch_due_items_task
+    next_run_at = models.DateTimeField(null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         verbose_name = "Товар"
         verbose_name_plural = "Товары"
+        indexes = [
+            # due-time index scanned by the scheduler on every tick
+            models.Index(fields=["next_run_at"], condition=Q(is_parser_active=True), name="item_due_idx"),
+        ]
 
         constraints = [
             models.UniqueConstraint(fields=["tenant", "sku"], name="unique_tenant_sku"),
@@ -169,29 +172,6 @@ class Item(models.Model):
         # price_updated.send(sender=self.__class__, instance=self)
 
 
-# TODO: move to signals.py
-# Having post_save signal solves "Object needs to be persisted first" if adding perms on save, resulting in failure to
-# add a scraped item to db. This is because Django adds ManyToMany related fields after saving.
-# Source: https://stackoverflow.com/a/23772575
-@receiver(post_save, sender=Item)
-def add_perms_to_group(sender, instance, created, **kwargs) -> None:  # type: ignore # pylint: disable=unused-argument
-    group, created = Group.objects.get_or_create(name=instance.tenant)
-    if not group.permissions.filter(codename="view_item").exists():
-        logger.info(
-            "Adding 'view_item' permission for item '%s' to group '%s'",
-            instance.name,
-            group.name,
-        )
-        assign_perm("view_item", group, instance)
-        # get_perms: https://django-guardian.readthedocs.io/en/stable/userguide/check.html#get-perms
-        if "view_item" not in get_perms(group, instance):
-            logger.error(
-                "Failed to add 'view_item' permission for item '%s' to group '%s'",
-                instance.name,
-                group.name,
-            )
-
-
 class Schedule(models.Model):
     class Period(models.TextChoices):
         SECONDS = "seconds", _("Секунды")
@@ -211,6 +191,69 @@ class Schedule(models.Model):
     )
     cronjob_value = models.CharField(max_length=100, verbose_name="CronJob", blank=True, null=True)
     period = models.CharField(max_length=100, choices=Period.choices, default=Period.HOURS, blank=True)
+    tenant = models.OneToOneField(
+        Tenant, on_delete=models.CASCADE, null=True, blank=True, related_name="scrape_schedule"
+    )
+    last_run_at = models.DateTimeField(null=True, blank=True)
+    # spreads the chunks of a single run over this many seconds, 0 disables jitter
+    jitter_seconds = models.PositiveIntegerField(default=0)
+    # poll each item more or less often depending on how often its price changes, see utils.adaptive_polling
+    is_adaptive = models.BooleanField(default=False, verbose_name="Адаптивная частота")
+    # lease of the tenant's scheduled run, so that runs of the same tenant never overlap, see utils.run_locks
+    lock_token = models.CharField(max_length=32, blank=True, default="")
+    locked_at = models.DateTimeField(null=True, blank=True)
+    locked_until = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self) -> str:
+        return f"Schedule for {self.tenant}: every {self.interval_value} {self.period}"
+
+    @property
+    def run_every(self) -> timedelta:
+        return timedelta(**{self.period: self.interval_value})
+
+    @property
+    def phase_offset(self) -> timedelta:
+        """Deterministic offset of the tenant's runs within the interval (hash of the tenant id modulo the interval).
+
+        Tenants with the same interval are spread over it instead of all running at the same time.
+        """
+        interval_seconds = int(self.run_every.total_seconds())
+        return timedelta(seconds=zlib.crc32(str(self.tenant_id).encode()) % interval_seconds)
+
+    def get_next_run_at(self, after: datetime) -> datetime:
+        """Returns the first run of the schedule strictly after `after`, aligned to the tenant's phase offset."""
+        interval_seconds = self.run_every.total_seconds()
+        offset_seconds = self.phase_offset.total_seconds()
+        runs_since_epoch = (after.timestamp() - offset_seconds) // interval_seconds + 1
+        return datetime.fromtimestamp(offset_seconds + runs_since_epoch * interval_seconds, tz=after.tzinfo)
+
+
+class ScheduledRun(models.Model):
+    """A finished or skipped scheduled update of a tenant's items."""
+
+    class Status(models.TextChoices):
+        COMPLETED = "completed", _("Завершен")
+        SKIPPED = "skipped", _("Пропущен")
+
+    tenant = models.ForeignKey(Tenant, on_delete=models.CASCADE, related_name="scheduled_runs")
+    status = models.CharField(max_length=20, choices=Status.choices)
+    sku_count = models.PositiveIntegerField(default=0)
+    # SKUs that were not scraped: invalid ones and the chunks that gave up after their retries
+    failures = models.PositiveIntegerField(default=0)
+    # time the run's oldest due item waited for the tenant's run lock
+    lock_wait = models.DurationField(null=True, blank=True)
+    started_at = models.DateTimeField()
+    finished_at = models.DateTimeField(null=True, blank=True)
+    duration = models.DurationField(null=True, blank=True)
+
+    class Meta:
+        verbose_name = "Запуск по расписанию"
+        verbose_name_plural = "Запуски по расписанию"
+        ordering = ["-started_at"]
+        indexes = [models.Index(fields=["tenant", "-started_at"])]
+
+    def __str__(self) -> str:
+        return f"Scheduled run of {self.tenant} at {self.started_at} ({self.status})"
 
 
 class Price(models.Model):
@@ -237,11 +280,79 @@ class Price(models.Model):
                 name="no_negative_price_value",
             ),
         ]
+        indexes = [
+            # latest prices of an item, e.g. for items.get_items_with_price_changes_over_threshold
+            models.Index(fields=["item", "-created_at"], name="price_item_created_idx"),
+        ]
 
     def __str__(self) -> str:
         return str(self.value)
 
 
+class ScrapeJob(models.Model):
+    """
+    A manual scrape (adding new items or updating selected ones) that runs in a Celery worker.
+    Stores progress counters and partial results so the item list can poll for them while the job runs.
+    """
+
+    class Kind(models.TextChoices):
+        SCRAPE = "scrape", _("Добавление товаров")
+        UPDATE = "update", _("Обновление товаров")
+
+    class Status(models.TextChoices):
+        PENDING = "pending", _("В очереди")
+        RUNNING = "running", _("Выполняется")
+        COMPLETED = "completed", _("Завершено")
+        FAILED = "failed", _("Ошибка")
+
+    tenant = models.ForeignKey(Tenant, on_delete=models.CASCADE, related_name="scrape_jobs")
+    kind = models.CharField(max_length=20, choices=Kind.choices, default=Kind.SCRAPE)
+    status = models.CharField(max_length=20, choices=Status.choices, default=Status.PENDING)
+    task_id = models.CharField(max_length=255, blank=True, null=True)
+    skus = models.JSONField(default=list)
+    total = models.PositiveIntegerField(default=0)
+    processed = models.PositiveIntegerField(default=0)
+    items_data = models.JSONField(default=list, help_text="Данные успешно обработанных товаров")
+    invalid_skus = models.JSONField(default=list)
+    # quota reserved when the job was queued, settled by billing.commit_quota once it finishes
+    reserved_skus = models.PositiveIntegerField(default=0)
+    reserved_parse_units = models.PositiveIntegerField(default=0)
+    # set once the completion messages have been shown to the user
+    is_reported = models.BooleanField(default=False)
+    created_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        verbose_name = "Задача парсинга"
+        verbose_name_plural = "Задачи парсинга"
+        ordering = ["created_at"]
+        indexes = [
+            models.Index(fields=["tenant", "is_reported"]),
+        ]
+
+    # the only fields of the scraped item data that are shown while the job runs and in its completion messages
+    RESULT_FIELDS = ("sku", "name", "price", "is_in_stock")
+
+    def __str__(self) -> str:
+        return f"ScrapeJob #{self.pk} ({self.get_status_display()})"
+
+    @classmethod
+    def compact_item_data(cls, item_data: dict) -> dict:
+        """Returns the part of the scraped item data that is stored in items_data."""
+        return {field: item_data[field] for field in cls.RESULT_FIELDS if field in item_data}
+
+    @property
+    def is_finished(self) -> bool:
+        return self.status in (self.Status.COMPLETED, self.Status.FAILED)
+
+    @property
+    def progress_percent(self) -> int:
+        # In progress template  {{ job.progress_percent }}
+        if not self.total:
+            return 0
+        return int(self.processed * 100 / self.total)
+
+
 # Create Transaction model with ForeignKey to Tenant
 # figure out what fields to add to Transaction model (see billing_form.html)
 
@@ -1,21 +1,26 @@
 import logging
+import random
+import uuid
+from datetime import datetime, timedelta, timezone as dt_timezone
 
-from celery import shared_task
-from django.contrib import messages
+from celery import chord, shared_task
+from django.conf import settings
 from django.contrib.auth import get_user_model
-from django_celery_beat.models import PeriodicTask
+from django.utils import timezone
+from django_celery_results.models import TaskResult
 
+import config
 from accounts.models import Tenant
-from main.exceptions import QuotaExceededException
-from main.models import Item
-from utils import billing, marketplace, items
+from main.exceptions import InvalidSKUException, QuotaExceededException
+from main.models import Item, Schedule, ScheduledRun, ScrapeJob
+from utils import adaptive_polling, billing, demo, marketplace, items, notifications, run_locks, tenant_deletion
 
 logger = logging.getLogger(__name__)
 user = get_user_model()
 
 
 # Currently not used in code, see: https://github.com/igorsimb/mp-monitor/issues/114
-@shared_task(bind=True)
+@shared_task(bind=True, ignore_result=True)
 def scrape_interval_task(self, tenant_id: int, selected_item_ids: list[int]) -> None:  # pylint: disable=[unused-argument]
     items_list = Item.objects.filter(id__in=selected_item_ids)
     logger.info("Found items: %s. Selected Item ids: %s", items_list, selected_item_ids)
@@ -49,34 +54,341 @@ def scrape_interval_task(self, tenant_id: int, selected_item_ids: list[int]) ->
             logger.debug("Updated item: %s | Name: %s...", item.sku, item.name)
 
 
-@shared_task(bind=True)
-def update_or_create_items_task(self, tenant_id, skus_list):
-    def convert_list_to_string(input_list):
-        # input: [179081012, 180771445, 155282898]
-        # output: '179081012,180771445,155282898'
-        if not input_list:
-            return ""
-        return ",".join([str(integer) for integer in input_list])
+@shared_task(ignore_result=True)
+def dispatch_due_items_task() -> None:
+    """
+    Central scheduler for the tenants' scheduled updates, run by beat every config.SCHEDULER_TICK_SECONDS.
+    Finds the tenants that have active items whose next_run_at is due (using the item_due_idx index),
+    takes their run locks (see utils.run_locks) and dispatches one update_or_create_items_task per tenant.
+    Only the tenant id is passed, the task reads the due items itself.
+    The per-tenant updates are spread evenly over the tick instead of all starting at once.
+    """
+    now = timezone.now()
+    # tenants whose previous run is still in progress are held back: their items stay due
+    # and are coalesced into the next run
+    due_tenant_ids = set(
+        Item.objects.filter(is_parser_active=True, next_run_at__lte=now)
+        .exclude(tenant_id__in=run_locks.get_locked_tenant_ids())
+        .order_by()
+        .values_list("tenant_id", flat=True)
+        .distinct()
+    )
+    if not due_tenant_ids:
+        return
+
+    schedules = list(Schedule.objects.filter(tenant_id__in=due_tenant_ids))
+    unscheduled_tenant_ids = due_tenant_ids - {schedule.tenant_id for schedule in schedules}
+    if unscheduled_tenant_ids:
+        logger.warning("Tenants %s have due items but no schedule, unscheduling them", unscheduled_tenant_ids)
+        Item.objects.filter(tenant_id__in=unscheduled_tenant_ids).update(next_run_at=None)
+
+    spacing = config.SCHEDULER_TICK_SECONDS / len(schedules) if schedules else 0
+    dispatched_tenant_ids = []
+    for position, schedule in enumerate(schedules):
+        lock_token = uuid.uuid4().hex
+        if not run_locks.acquire_run_lock(schedule.tenant_id, lock_token):
+            logger.warning("Scheduled run of tenant %s is still in progress, skipping", schedule.tenant_id)
+            ScheduledRun.objects.create(
+                tenant_id=schedule.tenant_id, status=ScheduledRun.Status.SKIPPED, started_at=now
+            )
+            continue
+        update_or_create_items_task.apply_async(
+            (schedule.tenant_id, lock_token),
+            {"jitter_seconds": min(schedule.jitter_seconds, schedule.run_every.total_seconds())},
+            countdown=round(position * spacing, 2),
+        )
+        dispatched_tenant_ids.append(schedule.tenant_id)
+
+    logger.info("Dispatched scheduled runs of tenants %s", dispatched_tenant_ids)
+    if dispatched_tenant_ids:
+        Schedule.objects.filter(tenant_id__in=dispatched_tenant_ids).update(last_run_at=now)
+
+
+@shared_task(ignore_result=True)
+def update_or_create_items_task(tenant_id, lock_token, jitter_seconds=0):
+    """
+    Scheduled update of the tenant's items, dispatched by dispatch_due_items_task with the tenant's run lock.
+    The run holds the lock (see utils.run_locks) until its chord callback finishes, so that runs of the same tenant
+    never overlap.
+    The tenant's due SKUs are streamed from the database in chunks that run as a Celery group on the scheduled queue,
+    so that a large tenant doesn't occupy a worker for the whole run and a crash only loses a single chunk.
+    Their next_run_at is moved to the next run of the tenant's schedule
+    (or to each item's own next run for adaptive schedules, see utils.adaptive_polling).
+    With `jitter_seconds` (Schedule.jitter_seconds) each chunk starts after a random delay within that window.
+    The chord callback processes price change notifications once all chunks are done.
+    """
+    started_at = timezone.now()
+    schedule = Schedule.objects.select_related("tenant__payment_plan").filter(tenant_id=tenant_id).first()
+    if schedule is None or not run_locks.extend_run_lock(tenant_id, lock_token):
+        logger.warning("Scheduled run of tenant %s no longer holds the run lock, skipping", tenant_id)
+        ScheduledRun.objects.create(tenant_id=tenant_id, status=ScheduledRun.Status.SKIPPED, started_at=started_at)
+        return
+
+    due_items = (
+        Item.objects.filter(tenant_id=tenant_id, is_parser_active=True, next_run_at__lte=started_at)
+        .order_by("next_run_at")
+        .values_list("id", "sku", "next_run_at")
+    )
+    chunks = []
+    item_ids = []
+    due_since = None
+    for item_id, sku, next_run_at in due_items.iterator(chunk_size=config.SCHEDULED_SCRAPE_CHUNK_SIZE):
+        due_since = due_since or next_run_at
+        if not chunks or len(chunks[-1]) == config.SCHEDULED_SCRAPE_CHUNK_SIZE:
+            chunks.append([])
+        chunks[-1].append(sku)
+        item_ids.append(item_id)
+
+    run_kwargs = {
+        "lock_token": lock_token,
+        "sku_count": len(item_ids),
+        "started_at": started_at.timestamp(),
+        "due_since": due_since.timestamp() if due_since else None,
+    }
+    if not chunks:
+        finish_scheduled_run(tenant_id, **run_kwargs)
+        return
+
+    # advanced before the quota check, so that a tenant out of quota waits for its next run
+    # instead of being dispatched again on every tick
+    if schedule.is_adaptive:
+        next_run_ats = adaptive_polling.get_adaptive_next_run_ats(schedule, item_ids, started_at)
+        Item.objects.bulk_update(
+            [Item(id=item_id, next_run_at=next_run_at) for item_id, next_run_at in next_run_ats.items()],
+            ["next_run_at"],
+            batch_size=500,
+        )
+    else:
+        Item.objects.filter(id__in=item_ids).update(next_run_at=schedule.get_next_run_at(started_at))
 
     user_to_update = user.objects.get(tenant__id=tenant_id)
     if user_to_update.is_demo_user:
         try:
-            # update_user_quota_for_scheduled_updates(user_to_update)
-            billing.update_user_quota_for_allowed_parse_units(user_to_update, skus_list)
+            billing.reserve_quota(schedule.tenant, parse_units=len(item_ids))
         except QuotaExceededException as e:
             logger.warning(e.message)
+            finish_scheduled_run(tenant_id, **run_kwargs, failures=len(item_ids), status=ScheduledRun.Status.SKIPPED)
             return
+        run_kwargs["reserved_parse_units"] = len(item_ids)
+
+    logger.info("Dispatching %s chunks of SKUs for tenant %s", len(chunks), tenant_id)
+    header = [update_or_create_items_chunk_task.s(tenant_id, chunk, lock_token=lock_token) for chunk in chunks]
+    if jitter_seconds:
+        header = [signature.set(countdown=round(random.uniform(0, jitter_seconds), 2)) for signature in header]
+    chord(header)(process_scheduled_price_changes_task.s(tenant_id, **run_kwargs))
 
-    skus = convert_list_to_string(skus_list)
-    # scrape_items_from_skus returns a tuple, but only the first part is needed for update_or_create_items_interval
-    items_data, _ = marketplace.scrape_items_from_skus(skus, is_parser_active=True)
-    items.update_or_create_items_interval(tenant_id, items_data)
 
-    task_name = self.request.properties["periodic_task_name"]
-    task_obj = PeriodicTask.objects.get(name=task_name)
-    if not task_obj:
-        logger.error("Task with name %s not found.", task_name)
-        messages.error(self.request, "Расписание не найдено. Попробуйте еще раз или обратитесь в службу поддержки.")
+def finish_scheduled_run(
+    tenant_id: int,
+    lock_token: str,
+    sku_count: int,
+    started_at: float,
+    due_since: float | None = None,
+    failures: int = 0,
+    reserved_parse_units: int = 0,
+    status: str = ScheduledRun.Status.COMPLETED,
+) -> None:
+    """
+    Release the tenant's run lock and record the run with a single ScheduledRun insert.
+    Nothing is written to django_celery_beat, so finishing a run never makes beat reload its schedule.
+    Parse units reserved for the run's failed SKUs are returned to the tenant's quota.
+    A run that scraped nothing because the tenant is out of quota is recorded as SKIPPED.
+    `started_at` and `due_since` are timestamps, as they are passed through the chord callback's arguments.
+    """
+    billing.commit_quota(tenant_id, reserved_parse_units=reserved_parse_units, used_parse_units=sku_count - failures)
+    locked_at = run_locks.release_run_lock(tenant_id, lock_token)
+    if locked_at is None:
+        logger.warning("Scheduled run of tenant %s finished after losing its lock", tenant_id)
         return
 
-    task_obj.save()
+    run_started_at = datetime.fromtimestamp(started_at, tz=dt_timezone.utc)
+    finished_at = timezone.now()
+    lock_wait = None
+    if due_since is not None:
+        lock_wait = max(locked_at - datetime.fromtimestamp(due_since, tz=dt_timezone.utc), timedelta(0))
+    ScheduledRun.objects.create(
+        tenant_id=tenant_id,
+        status=status,
+        sku_count=sku_count,
+        failures=failures,
+        lock_wait=lock_wait,
+        started_at=run_started_at,
+        finished_at=finished_at,
+        duration=finished_at - run_started_at,
+    )
+    logger.info(
+        "Scheduled run of tenant %s took %s (%s of %s SKUs failed)",
+        tenant_id,
+        finished_at - run_started_at,
+        failures,
+        sku_count,
+    )
+
+
+@shared_task(bind=True, max_retries=3)
+def update_or_create_items_chunk_task(self, tenant_id, skus_list, lock_token=None):
+    """
+    Scrape and bulk-persist a single chunk of a scheduled update.
+    Every attempt extends the lease of the run's lock (`lock_token`), so that a slow run keeps it.
+    A failed chunk is retried on its own. Once the retries are exhausted it returns no items,
+    so the rest of the run still reaches the notification step.
+
+    Returns:
+        Number of scraped items and the price changes detected while persisting them, collected by the chord callback.
+        Nothing else is returned to keep the results stored in the result backend small.
+    """
+
+    def convert_list_to_string(input_list):
+        # input: [179081012, 180771445, 155282898]
+        # output: '179081012,180771445,155282898'
+        if not input_list:
+            return ""
+        return ",".join([str(integer) for integer in input_list])
+
+    if lock_token:
+        run_locks.extend_run_lock(tenant_id, lock_token)
+
+    try:
+        skus = convert_list_to_string(skus_list)
+        # scrape_items_from_skus returns a tuple, but only the first part is needed for bulk_update_or_create_items
+        items_data, _ = marketplace.scrape_items_from_skus(skus, is_parser_active=True)
+        price_changes = items.bulk_update_or_create_items(tenant_id, items_data)
+    except Exception as e:
+        if self.request.retries >= self.max_retries:
+            logger.exception("Chunk of %s SKUs for tenant %s failed, giving up", len(skus_list), tenant_id)
+            return {"scraped": 0, "price_changes": []}
+        logger.warning("Chunk of %s SKUs for tenant %s failed, retrying: %s", len(skus_list), tenant_id, e)
+        raise self.retry(exc=e, countdown=10 * 2**self.request.retries)
+
+    return {"scraped": len(items_data), "price_changes": price_changes}
+
+
+@shared_task(ignore_result=True)
+def process_scheduled_price_changes_task(
+    chunk_results: list[dict],
+    tenant_id: int,
+    lock_token: str,
+    sku_count: int,
+    started_at: float,
+    due_since: float | None = None,
+    reserved_parse_units: int = 0,
+) -> None:
+    """
+    Chord callback of update_or_create_items_task: notify the tenant about price changes once per run,
+    then finish the run (release its lock and record it).
+    SKUs missing from the chunks' results (invalid or given up on) are recorded as the run's failures.
+    """
+    scraped = sum(chunk_result["scraped"] for chunk_result in chunk_results)
+    price_changes = [
+        items.PriceChange(*price_change)
+        for chunk_result in chunk_results
+        for price_change in chunk_result["price_changes"]
+    ]
+    failures = max(sku_count - scraped, 0)
+    logger.info("Scheduled update for tenant %s finished with %s items", tenant_id, scraped)
+    try:
+        tenant = Tenant.objects.get(id=tenant_id)
+        notifications.process_price_change_notifications(tenant, price_changes)
+    finally:
+        finish_scheduled_run(
+            tenant_id,
+            lock_token,
+            sku_count,
+            started_at,
+            due_since,
+            failures=failures,
+            reserved_parse_units=reserved_parse_units,
+        )
+
+
+@shared_task(bind=True, ignore_result=True)
+def scrape_job_task(self, job_id: int) -> None:  # pylint: disable=[unused-argument]
+    """
+    Scrape the SKUs of a manual ScrapeJob one by one, persisting each item as soon as it is scraped.
+    Progress counters and partial results are saved after every SKU so that the item list can poll them.
+    """
+    job = ScrapeJob.objects.select_related("tenant").get(id=job_id)
+    price_changes = []
+    job.status = ScrapeJob.Status.RUNNING
+    job.save(update_fields=["status"])
+    logger.info("Starting scrape job %s for tenant %s (%s SKUs)", job.id, job.tenant_id, job.total)
+
+    try:
+        for sku in job.skus:
+            try:
+                item_data = marketplace.scrape_item(sku)
+            except InvalidSKUException as e:
+                job.invalid_skus.append(e.sku)
+            else:
+                price_change = items.update_or_create_item(job.tenant, item_data)
+                if price_change:
+                    price_changes.append(price_change)
+                job.items_data.append(ScrapeJob.compact_item_data(item_data))
+            job.processed += 1
+            job.save(update_fields=["processed", "items_data", "invalid_skus"])
+
+        notifications.process_price_change_notifications(job.tenant, price_changes)
+    except Exception:
+        logger.exception("Scrape job %s failed", job.id)
+        job.status = ScrapeJob.Status.FAILED
+        job.finished_at = timezone.now()
+        job.save(update_fields=["status", "finished_at"])
+        raise
+    finally:
+        # only the successfully scraped SKUs are charged
+        billing.commit_quota(
+            job.tenant_id,
+            reserved_skus=job.reserved_skus,
+            used_skus=len(job.items_data),
+            reserved_parse_units=job.reserved_parse_units,
+            used_parse_units=len(job.items_data),
+        )
+
+    job.status = ScrapeJob.Status.COMPLETED
+    job.finished_at = timezone.now()
+    job.save(update_fields=["status", "finished_at"])
+    logger.info("Scrape job %s completed: %s scraped, %s invalid", job.id, len(job.items_data), len(job.invalid_skus))
+
+
+@shared_task(ignore_result=True)
+def purge_expired_results_task() -> None:
+    """
+    Periodic cleanup of task results: deletes Celery results older than settings.CELERY_RESULT_EXPIRES
+    from the database result backend and the finished ScrapeJobs older than config.SCRAPE_JOB_RETENTION_DAYS.
+    """
+    deleted_results = 0
+    if settings.CELERY_RESULT_BACKEND == "django-db":
+        expired_results = TaskResult.objects.get_all_expired(settings.CELERY_RESULT_EXPIRES)
+        deleted_results, _ = expired_results.delete()
+
+    jobs_expire_at = timezone.now() - timedelta(days=config.SCRAPE_JOB_RETENTION_DAYS)
+    deleted_jobs, _ = ScrapeJob.objects.filter(finished_at__lt=jobs_expire_at).delete()
+    logger.info("Purged %s expired task results and %s finished scrape jobs", deleted_results, deleted_jobs)
+
+
+@shared_task(ignore_result=True)
+def flush_notification_digests_task() -> None:
+    """Periodically sends the tenants' price change digests, see notifications.flush_notification_digests."""
+    notifications.flush_notification_digests()
+
+
+@shared_task(ignore_result=True)
+def refill_demo_pool_task() -> None:
+    """Keeps config.DEMO_POOL_SIZE demo users provisioned, so that demo_view only has to claim one."""
+    demo.refill_demo_pool()
+
+
+@shared_task(bind=True, ignore_result=True)
+def delete_tenant_task(self, tenant_id: int) -> None:
+    """
+    Purges the data of a tenant marked as deleted (see utils.tenant_deletion) in batches.
+    The progress (the last purged table and its number of deleted rows) is reported as the task's PROGRESS state.
+    """
+
+    def report_progress(label: str, deleted: int) -> None:
+        if self.request.is_eager:
+            return
+        self.update_state(state="PROGRESS", meta={"tenant_id": tenant_id, "model": label, "deleted": deleted})
+
+    deleted = tenant_deletion.purge_tenant(tenant_id, on_progress=report_progress)
+    logger.info("Purged tenant %s: %s", tenant_id, deleted)
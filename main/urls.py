@@ -7,8 +7,10 @@ from .views import (
     create_scrape_interval_task,
     update_scrape_interval,
     destroy_scrape_interval_task,
+    scheduler_capacity,
     scrape_items,
     update_items,
+    scrape_job_progress,
     oferta_view,
     # billing_view,
     payment_callback_view,
@@ -30,9 +32,11 @@ urlpatterns = [
         destroy_scrape_interval_task,
         name="destroy_scrape_interval",
     ),
+    path("scheduler/capacity/", scheduler_capacity, name="scheduler_capacity"),
     path("items/<str:slug>/", ItemDetailView.as_view(), name="item_detail"),
     path("scrape/<str:skus>/", scrape_items, name="scrape_item"),
     path("update_items/", update_items, name="update_items"),
+    path("scrape_jobs/<int:job_id>/progress/", scrape_job_progress, name="scrape_job_progress"),
     path("oferta/", oferta_view, name="oferta"),
     # path("billing/", billing_view, name="billing"),
     path("billing/", BillingView.as_view(), name="billing"),
@@ -9,26 +9,28 @@ from django.contrib.auth.decorators import user_passes_test, login_required
 from django.contrib.auth.mixins import LoginRequiredMixin, UserPassesTestMixin
 from django.core.handlers.wsgi import WSGIRequest
 from django.core.paginator import Paginator
-from django.db import IntegrityError
-from django.db.models.query import QuerySet
+from django.db import transaction
+from django.db.models import Min
 from django.http import HttpResponseRedirect, HttpResponse, JsonResponse
 from django.shortcuts import render, redirect, get_object_or_404
+from django.urls import reverse
 from django.utils import timezone
 from django.views import View
 from django.views.decorators.csrf import csrf_exempt
 from django.views.generic import ListView, DetailView
-from django_celery_beat.models import PeriodicTask, IntervalSchedule
+from django_htmx.http import HttpResponseClientRedirect
 from django_ratelimit.core import is_ratelimited
-from guardian.mixins import PermissionListMixin, PermissionRequiredMixin
 
 import config
 from accounts.forms import SwitchPlanForm
-from accounts.models import PaymentPlan
+from accounts.models import PaymentPlan, Tenant
 from main import plotly_charts
 from main.exceptions import QuotaExceededException, PlanScheduleLimitationException
 from main.forms import ScrapeForm, ScrapeIntervalForm, UpdateItemsForm, PriceHistoryDateForm, PaymentForm
-from main.models import Item, Price, Order
+from main.mixins import TenantPermissionListMixin, TenantPermissionRequiredMixin
+from main.models import Item, Price, Order, Schedule, ScrapeJob
 from mp_monitor import settings
+from mp_monitor.db_router import read_from_replica
 from notifier.forms import PriceAlertForm
 from notifier.models import PriceAlert
 from utils import billing, items, marketplace, notifications, payment, price_display, task_utils
@@ -45,9 +47,10 @@ def index(request):
     return render(request, "main/index.html")
 
 
-class ItemListView(LoginRequiredMixin, PermissionListMixin, ListView):
+class ItemListView(LoginRequiredMixin, TenantPermissionListMixin, ListView):
     # TODO: add min/max pills if min or max
     model = Item
+    read_from_replica = True  # see mp_monitor.db_router
     context_object_name = "items"
     permission_required = ["view_item"]
     template_name = "main/item_list.html"
@@ -66,19 +69,16 @@ class ItemListView(LoginRequiredMixin, PermissionListMixin, ListView):
         active_demo_users = user.objects.filter(is_demo_user=True, is_active=True)
         expired_active_demo_users = [user for user in active_demo_users if user.is_demo_expired]
         non_expired_active_demo_users = [user for user in active_demo_users if not user.is_demo_expired]
-        tenant_quota = billing.get_user_quota(self.request.user)
+        tenant_quota = self.request.tenant_ctx.quota
 
         time_since_user_created = timezone.now() - self.request.user.created_at
-        if billing.get_user_quota(self.request.user) is not None:
+        if tenant_quota is not None:
             remaining_time = timedelta(hours=tenant_quota.total_hours_allowed) - time_since_user_created
             remaining_hours = remaining_time.seconds // 3600
             remaining_minutes = (remaining_time.seconds % 3600) // 60
             context["demo_remaining_time"] = f"{remaining_hours} ч. {remaining_minutes} мин."
 
-        try:
-            periodic_task = PeriodicTask.objects.get(name=task_utils.task_name(self.request.user))
-        except PeriodicTask.DoesNotExist:
-            periodic_task = None
+        schedule = Schedule.objects.filter(tenant=self.request.user.tenant).first()
 
         sku = None
         context["sku"] = sku
@@ -90,26 +90,27 @@ class ItemListView(LoginRequiredMixin, PermissionListMixin, ListView):
         context["update_items_form"] = update_items_form
         context["scrape_interval_form"] = scrape_interval_form
         context["tenant_quota"] = tenant_quota
+        if tenant_quota is not None:
+            context["quota_counter"] = billing.get_quota_counter(self.request.tenant_ctx.tenant)
         context["demo_user_lifetime_hours"] = int(config.DEMO_USER_HOURS_ALLOWED)
         context["demo_max_allowed_skus"] = int(config.DEMO_USER_MAX_ALLOWED_SKUS)
         context["demo_allowed_parse_units"] = int(config.DEMO_USER_ALLOWED_PARSE_UNITS)
-        if periodic_task:
-            schedule_interval = periodic_task.schedule.run_every
-            context["scrape_interval_task"] = task_utils.get_interval_russian_translation(periodic_task)
-            context["next_interval_run_at"] = periodic_task.last_run_at + schedule_interval
+        context["scrape_jobs"] = ScrapeJob.objects.filter(tenant=self.request.user.tenant, is_reported=False)
+        if schedule:
+            context["scrape_interval_task"] = task_utils.get_interval_russian_translation(schedule)
+            context["next_interval_run_at"] = Item.objects.filter(
+                tenant=self.request.user.tenant, is_parser_active=True
+            ).aggregate(next_run_at=Min("next_run_at"))["next_run_at"]
         return context
 
-    def get_queryset(self) -> QuerySet[Item]:
-        queryset = super().get_queryset()
-        return queryset.filter(tenant=self.request.user.tenant)
-
     def get(self, request, *args, **kwargs):
         logger.info("Going to Item List page")
         return super().get(request, *args, **kwargs)
 
 
-class ItemDetailView(LoginRequiredMixin, PermissionRequiredMixin, DetailView):
+class ItemDetailView(LoginRequiredMixin, TenantPermissionRequiredMixin, DetailView):
     model = Item
+    read_from_replica = True  # see mp_monitor.db_router
     permission_required = ["view_item"]
     template_name = "main/item_detail.html"
     context_object_name = "item"
@@ -134,9 +135,9 @@ class ItemDetailView(LoginRequiredMixin, PermissionRequiredMixin, DetailView):
         item_updated_at = self.object.updated_at
         price_created_at = self.object.prices.latest("created_at")
 
-        tenant_quota = billing.get_user_quota(self.request.user)
+        tenant_quota = self.request.tenant_ctx.quota
         time_since_user_created = timezone.now() - self.request.user.created_at
-        if billing.get_user_quota(self.request.user) is not None:
+        if tenant_quota is not None:
             remaining_time = timedelta(hours=tenant_quota.total_hours_allowed) - time_since_user_created
             remaining_hours = remaining_time.seconds // 3600
             remaining_minutes = (remaining_time.seconds % 3600) // 60
@@ -149,6 +150,8 @@ class ItemDetailView(LoginRequiredMixin, PermissionRequiredMixin, DetailView):
         context["item_updated_at"] = item_updated_at
         context["price_created_at"] = price_created_at
         context["tenant_quota"] = tenant_quota
+        if tenant_quota is not None:
+            context["quota_counter"] = billing.get_quota_counter(self.request.tenant_ctx.tenant)
         context["demo_user_lifetime_hours"] = int(config.DEMO_USER_HOURS_ALLOWED)
         context["demo_max_allowed_skus"] = int(config.DEMO_USER_MAX_ALLOWED_SKUS)
         context["demo_allowed_parse_units"] = int(config.DEMO_USER_ALLOWED_PARSE_UNITS)
@@ -157,10 +160,6 @@ class ItemDetailView(LoginRequiredMixin, PermissionRequiredMixin, DetailView):
         context["active_price_alerts"] = PriceAlert.objects.filter(items=self.object, is_active=True)
         return context
 
-    def get_queryset(self) -> QuerySet[Item]:
-        queryset = super().get_queryset()
-        return queryset.filter(tenant=self.request.user.tenant)
-
     def get(self, request, *args, **kwargs):
         logger.info(
             "Going to Details Page for item SKU '%s' (%s)",
@@ -171,6 +170,7 @@ class ItemDetailView(LoginRequiredMixin, PermissionRequiredMixin, DetailView):
 
 
 @login_required
+@read_from_replica
 def load_chart(request, sku: str) -> HttpResponse:
     """
     Load and return a Plotly chart for a specific item's price history.
@@ -201,7 +201,7 @@ def load_chart(request, sku: str) -> HttpResponse:
 # TODO: consider renaming this function to add_new_items or something similar
 @login_required
 def scrape_items(request: WSGIRequest, skus: str) -> HttpResponse | HttpResponseRedirect:
-    """Scrapes items from the given SKUs taken from the form data"""
+    """Queues a scrape job for the SKUs taken from the form data. Progress is shown in the item list."""
     if is_ratelimited(request, group="scrape_items", key="user_or_ip", method="POST", rate="10/m", increment=True):
         messages.error(request, "Вы сделали слишком много запросов на парсинг товаров. Попробуйте позже.")
         logger.error("Request limit exceeded for scrape_items, user: %s", request.user)
@@ -212,25 +212,26 @@ def scrape_items(request: WSGIRequest, skus: str) -> HttpResponse | HttpResponse
         if form.is_valid():
             skus = form.cleaned_data["skus"]
 
+            skus_list = marketplace.split_skus(skus)
+            reserved = 0
             if billing.get_user_quota(request.user) is not None:
                 try:
-                    logger.info("Trying to update user quota for max allowed skus...")
-                    billing.update_tenant_quota_for_max_allowed_sku(request, skus)
-                    billing.update_user_quota_for_allowed_parse_units(request.user, skus)
+                    logger.info("Trying to reserve user quota for %s SKUs...", len(skus_list))
+                    billing.reserve_quota(request.user.tenant, skus=len(skus_list), parse_units=len(skus_list))
+                    reserved = len(skus_list)
                 except QuotaExceededException as e:
                     logger.warning(e.message)
                     messages.error(request, "Превышен лимит парсинга товаров для данного тарифа.")
                     return redirect("item_list")
 
-            logger.info("Scraping items with SKUs: %s", skus)
-            items_data, invalid_skus = marketplace.scrape_items_from_skus(skus)
-            items.update_or_create_items(request, items_data)
-
-            notifications.process_price_change_notifications(request.user.tenant, items_data)
-            notifications.show_successful_scrape_message(request, items_data)
-
-            if invalid_skus:
-                notifications.show_invalid_skus_message(request, invalid_skus)  # pragma: no cover
+            logger.info("Queueing scrape job for SKUs: %s", skus)
+            task_utils.start_scrape_job(
+                request.user.tenant,
+                skus_list,
+                kind=ScrapeJob.Kind.SCRAPE,
+                reserved_skus=reserved,
+                reserved_parse_units=reserved,
+            )
 
             return redirect("item_list")
     else:
@@ -242,7 +243,7 @@ def scrape_items(request: WSGIRequest, skus: str) -> HttpResponse | HttpResponse
 
 @login_required
 def update_items(request: WSGIRequest) -> HttpResponse | HttpResponseRedirect:
-    """Scrapes items selected in the checkboxes"""
+    """Queues a scrape job for the items selected in the checkboxes. Progress is shown in the item list."""
 
     if is_ratelimited(request, group="update_items", key="user_or_ip", method="POST", rate="10/m", increment=True):
         messages.error(request, "Слишком много запросов на обновление товаров. Попробуйте позже.")
@@ -260,20 +261,20 @@ def update_items(request: WSGIRequest) -> HttpResponse | HttpResponseRedirect:
             if not items.is_at_least_one_item_selected(request, skus):
                 return redirect("item_list")
 
+            skus_list = marketplace.split_skus(skus)
+            reserved = 0
             #  needs to be placed after is_at_least_one_item_selected check to avoid updating quota despite the error
             if billing.get_user_quota(request.user) is not None:
                 try:
-                    billing.update_user_quota_for_allowed_parse_units(request.user, skus)
+                    billing.reserve_quota(request.user.tenant, parse_units=len(skus_list))
+                    reserved = len(skus_list)
                 except QuotaExceededException as e:
                     messages.error(request, e.message)
                     return redirect("item_list")
 
-            # scrape_items_from_skus returns a tuple, but only the first part is needed for update_or_create_items
-            items_data, _ = marketplace.scrape_items_from_skus(skus)
-            items.update_or_create_items(request, items_data)
-
-            notifications.process_price_change_notifications(request.user.tenant, items_data)
-            notifications.show_successful_scrape_message(request, items_data)
+            task_utils.start_scrape_job(
+                request.user.tenant, skus_list, kind=ScrapeJob.Kind.UPDATE, reserved_parse_units=reserved
+            )
 
             return redirect("item_list")
         else:
@@ -288,13 +289,53 @@ def update_items(request: WSGIRequest) -> HttpResponse | HttpResponseRedirect:
     return render(request, "main/item_list.html", {"update_items_form": form})
 
 
+@login_required
+def scrape_job_progress(request: WSGIRequest, job_id: int) -> HttpResponse:
+    """
+    Returns the progress of a ScrapeJob as an HTMX partial that keeps polling itself until the job is finished.
+
+    Once the job is finished, the success and invalid SKU messages are added and the client is redirected to
+    the item list, so that the messages and the updated items are shown.
+    """
+    job = get_object_or_404(ScrapeJob, id=job_id, tenant=request.user.tenant)
+
+    if job.is_finished:
+        if not job.is_reported:
+            if job.status == ScrapeJob.Status.FAILED:
+                messages.error(request, "Что-то пошло не так. Попробуйте еще раз или обратитесь к администратору.")
+            else:
+                notifications.show_successful_scrape_message(request, job.items_data)
+                if job.invalid_skus:
+                    notifications.show_invalid_skus_message(request, job.invalid_skus)
+            job.is_reported = True
+            job.save(update_fields=["is_reported"])
+
+        if request.htmx:
+            return HttpResponseClientRedirect(reverse("item_list"))
+        return redirect("item_list")
+
+    return render(request, "main/partials/scrape_job_progress.html", {"job": job})
+
+
+def _get_schedule_form_error(interval: int | None, period: str) -> str | None:
+    """Returns the error message for an incomplete schedule form, if any."""
+    # This occurs when no interval value is set in the form
+    if not interval:
+        return "Ошибка создания расписания. Убедитесь, что поле интервала заполнено."
+    # This occurs when no time unit is selected (e.g. minutes, hours, days).
+    if not period:
+        return "Ошибка создания расписания. Убедитесь, что выбрана единица времени (например, часы, дни)."
+    return None
+
+
 @login_required
 def create_scrape_interval_task(
     request: WSGIRequest,
 ) -> HttpResponse | HttpResponseRedirect:
-    """Takes interval from the form data (in seconds) and triggers main.tasks.scrape_interval_task
+    """Creates (or replaces) the scrape schedule of user's tenant from the form data
+    and puts the selected items on it.
 
-    The task itself prints all items belonging to this tenant every {{ interval }} seconds.
+    The items are then picked up by main.tasks.dispatch_due_items_task every {{ interval }} {{ period }}.
     """
 
     if request.method == "POST":
@@ -313,88 +354,49 @@ def create_scrape_interval_task(
 
             items.uncheck_all_boxes(request)
 
-            # Convert the list of stringified numbers to a list of integers to avoid the following error:
-            # json.decoder.JSONDecodeError: Expecting value: line 1 column 6 (char 5)
-            # selected_item_ids = [int(item) for item in selected_item_ids]
             skus_list = skus.split(" ")
             skus_list = [int(sku) for sku in skus_list]
 
             interval = scrape_interval_form.cleaned_data["interval_value"]
             period = scrape_interval_form.cleaned_data["period"]
 
-            try:
-                task_utils.check_plan_schedule_limitations(request.user.tenant, period, interval)
-                schedule, created = IntervalSchedule.objects.get_or_create(
-                    every=interval,
-                    period=getattr(IntervalSchedule, period.upper()),  # IntervalSchedule.SECONDS, MINUTES, HOURS, etc
-                )
-            # This occurs when no interval value is set in the form
-            except IntegrityError:
-                messages.error(
-                    request,
-                    "Ошибка создания расписания. Убедитесь, что поле интервала заполнено.",
-                )
-                return redirect("item_list")
-
-            # This occurs when no time unit is selected (e.g. minutes, hours, days).
-            except AttributeError:
-                messages.error(
-                    request,
-                    "Ошибка создания расписания. Убедитесь, что выбрана единица времени (например, часы, дни).",
-                )
+            schedule_error = _get_schedule_form_error(interval, period)
+            if schedule_error:
+                messages.error(request, schedule_error)
                 return redirect("item_list")
 
+            try:
+                task_utils.check_plan_schedule_limitations(request.user.tenant, period, interval)
             except PlanScheduleLimitationException as e:
                 messages.error(request, e.message)
                 return redirect("item_list")
 
-            if created:
-                logger.info(
-                    "Interval created with schedule: every %s %s",
-                    schedule.every,
-                    schedule.period,
-                )
-            else:
-                logger.info(
-                    "Existing Interval started: every %s %s",
-                    schedule.every,
-                    schedule.period,
-                )
-
             #  needs to be placed after all form checks to avoid updating quota despite the error
             if billing.get_user_quota(request.user) is not None:
                 try:
-                    billing.update_user_quota_for_allowed_parse_units(request.user, skus)
+                    billing.reserve_quota(request.user.tenant, parse_units=len(skus_list))
                 except QuotaExceededException as e:
                     messages.error(request, e.message)
                     return redirect("item_list")
 
-            scrape_interval_task, created = PeriodicTask.objects.update_or_create(
-                name=task_utils.task_name(request.user),
+            schedule, created = Schedule.objects.update_or_create(
+                tenant=request.user.tenant,
                 defaults={
-                    "interval": schedule,
-                    "task": "main.tasks.update_or_create_items_task",
-                    # "start_time": timezone.now(),
-                    "last_run_at": timezone.now(),
-                    "args": [request.user.tenant.id, skus_list],
+                    "interval_value": interval,
+                    "period": period,
+                    "is_adaptive": scrape_interval_form.cleaned_data["is_adaptive"],
                 },
             )
-            if created:
-                logger.info(
-                    "Interval task '%s' was successfully created for '%s'\nargs: %s",
-                    scrape_interval_task.name,
-                    request.user,
-                    scrape_interval_task.args,
-                )
-            else:
-                logger.info(
-                    "Interval task '%s' was successfully updated for '%s'\nargs: %s",
-                    scrape_interval_task.name,
-                    request.user,
-                    scrape_interval_task.args,
-                )
+            logger.info(
+                "Schedule %s for '%s': every %s %s",
+                "created" if created else "updated",
+                request.user,
+                schedule.interval_value,
+                schedule.period,
+            )
 
             items.activate_parsing_for_selected_items(request, skus_list)
+            task_utils.reschedule_items(schedule)
 
             return redirect("item_list")
 
@@ -423,9 +425,14 @@ def update_scrape_interval(request: WSGIRequest) -> HttpResponse:
         - Redirects to item list on success.
         - Shows error message and re-renders form on failure.
     """
-    existing_task = get_object_or_404(PeriodicTask, name=task_utils.task_name(request.user))
+    schedule = get_object_or_404(Schedule, tenant=request.user.tenant)
     if request.method == "POST":
-        form = ScrapeIntervalForm(request.POST or None, instance=existing_task, user=request.user)
+        # the update form only lists the items, so the current interval is kept unless a new one is posted
+        data = request.POST.copy()
+        data.setdefault("interval_value", schedule.interval_value)
+        data.setdefault("period", schedule.period)
+        data.setdefault("is_adaptive", "true" if schedule.is_adaptive else "false")
+        form = ScrapeIntervalForm(data, instance=schedule, user=request.user)
 
         if form.is_valid():
             skus = request.POST.getlist("selected_items")
@@ -437,14 +444,28 @@ def update_scrape_interval(request: WSGIRequest) -> HttpResponse:
                 return redirect("item_list")
             skus_list = [int(sku) for sku in skus]
 
+            interval = form.cleaned_data["interval_value"]
+            period = form.cleaned_data["period"]
+            schedule_error = _get_schedule_form_error(interval, period)
+            if schedule_error:
+                messages.error(request, schedule_error)
+                return redirect("item_list")
+            try:
+                task_utils.check_plan_schedule_limitations(request.user.tenant, period, interval)
+            except PlanScheduleLimitationException as e:
+                messages.error(request, e.message)
+                return redirect("item_list")
+
             items.uncheck_all_boxes(request)
 
-            logger.info("Updating the checked items list for existing task...")
-            existing_task.args = [request.user.tenant.id, skus_list]
-            existing_task.save()
-            form.save()
+            logger.info("Updating the checked items list for existing schedule...")
+            # only the form's fields: the run lock columns may have been taken by the scheduler since the schedule
+            # was loaded, saving all the columns would release it
+            schedule = form.save(commit=False)
+            schedule.save(update_fields=ScrapeIntervalForm.Meta.fields)
 
             items.activate_parsing_for_selected_items(request, skus_list)
+            task_utils.reschedule_items(schedule)
 
             return redirect("item_list")
         else:
@@ -461,19 +482,25 @@ def update_scrape_interval(request: WSGIRequest) -> HttpResponse:
 
 
 @login_required
-@user_passes_test(task_utils.periodic_task_exists, redirect_field_name=None)
+@user_passes_test(task_utils.schedule_exists, redirect_field_name=None)
 def destroy_scrape_interval_task(request: WSGIRequest) -> HttpResponseRedirect:
     items.uncheck_all_boxes(request)
 
-    periodic_task = PeriodicTask.objects.get(
-        name=task_utils.task_name(request.user),
-    )
-    periodic_task.delete()
-    print(f"{periodic_task} has been deleted!")
+    Schedule.objects.filter(tenant=request.user.tenant).delete()
+    Item.objects.filter(tenant=request.user.tenant).update(next_run_at=None)
+    logger.info("Schedule of tenant %s has been deleted", request.user.tenant.id)
 
     return redirect("item_list")
 
 
+@login_required
+@user_passes_test(lambda u: u.is_superuser)
+def scheduler_capacity(request: WSGIRequest) -> HttpResponse:
+    """For superusers only. Shows the expected load of all scrape schedules, so that it can be flattened."""
+    context = {"capacity": task_utils.get_scheduler_capacity()}
+    return render(request, "main/scheduler_capacity.html", context)
+
+
 def oferta_view(request: WSGIRequest) -> HttpResponse:
     return render(request, "main/oferta.html")
 
@@ -741,31 +768,35 @@ def switch_plan_modal(request):
 
 @login_required
 def switch_plan(request: WSGIRequest) -> HttpResponse:
-    tenant = request.user.tenant
     minimum_days_covered = 3
 
     if request.method == "POST":
         form = SwitchPlanForm(request.POST)
         if form.is_valid():
             new_plan = form.cleaned_data["plan"]
-            can_switch, message = payment.user_is_allowed_to_switch_plan(tenant, new_plan, minimum_days_covered)
-            if not can_switch:
-                messages.error(request, message)
-                return redirect("billing")
-
-            logger.info("Creating order for switching plan...")
-            Order.objects.create(
-                tenant=tenant,
-                order_id=payment.create_unique_order_id(tenant_id=tenant.id),
-                amount=0,
-                order_intent=Order.OrderIntent.SWITCH_PLAN,
-                status=Order.OrderStatus.COMPLETED,
-                description=f"Switch plan from {tenant.payment_plan.get_name_display()} to {new_plan.get_name_display()}",
-            )
-            logger.info("Order created successfully.")
-            logger.info("Switching plan...")
-            tenant.switch_plan(new_plan.name)
-            logger.info("Plan switched successfully.")
+            with transaction.atomic():
+                # not request.user.tenant: it comes from the tenant context cache and its balance may be outdated
+                tenant = Tenant.objects.select_for_update().get(id=request.user.tenant_id)
+                can_switch, message = payment.user_is_allowed_to_switch_plan(tenant, new_plan, minimum_days_covered)
+                if not can_switch:
+                    messages.error(request, message)
+                    return redirect("billing")
+
+                logger.info("Creating order for switching plan...")
+                Order.objects.create(
+                    tenant=tenant,
+                    order_id=payment.create_unique_order_id(tenant_id=tenant.id),
+                    amount=0,
+                    order_intent=Order.OrderIntent.SWITCH_PLAN,
+                    status=Order.OrderStatus.COMPLETED,
+                    description=(
+                        f"Switch plan from {tenant.payment_plan.get_name_display()} to {new_plan.get_name_display()}"
+                    ),
+                )
+                logger.info("Order created successfully.")
+                logger.info("Switching plan...")
+                tenant.switch_plan(new_plan.name)
+                logger.info("Plan switched successfully.")
             messages.success(request, message)
             return redirect("billing")
     else:
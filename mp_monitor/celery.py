@@ -2,6 +2,7 @@ import os
 from datetime import timedelta
 
 from celery import Celery
+from celery.signals import celeryd_init
 
 # Set the default Django settings module for the 'celery' program.
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "mp_monitor.settings")
@@ -18,71 +19,70 @@ app.config_from_object("django.conf:settings", namespace="CELERY")
 app.autodiscover_tasks()
 
 
+@celeryd_init.connect
+def setup_queue_concurrency(sender, instance, conf, options, **kwargs):  # pylint: disable=unused-argument
+    """
+    Applies the per-queue concurrency from settings.SCRAPE_QUEUE_CONCURRENCY to a worker that consumes a single
+    scrape queue (e.g. `celery -A mp_monitor worker -Q interactive`).
+    An explicit --concurrency always takes precedence.
+    """
+    from django.conf import settings
+
+    queues = options.get("queues") or []
+    if isinstance(queues, str):
+        queues = queues.split(",")
+    if options.get("concurrency") or len(queues) != 1:
+        return
+
+    concurrency = settings.SCRAPE_QUEUE_CONCURRENCY.get(queues[0])
+    if concurrency:
+        conf.worker_concurrency = concurrency
+
+
 # https://docs.celeryq.dev/en/stable/userguide/periodic-tasks.html#entries
 @app.on_after_configure.connect
 def setup_periodic_tasks(sender, **kwargs):
+    import config
+
     # Calls the function every 1 hour
     sender.add_periodic_task(timedelta(hours=1), check_expired_demo_users, name="Check expired demo users")
+    # Central scheduler for the tenants' scheduled updates, see main.tasks.dispatch_due_items_task
+    sender.add_periodic_task(
+        timedelta(seconds=config.SCHEDULER_TICK_SECONDS),
+        sender.signature("main.tasks.dispatch_due_items_task"),
+        name="Dispatch due scheduled updates",
+    )
+    # Tops up the demo pool in case the refills triggered by demo_view failed
+    sender.add_periodic_task(
+        timedelta(minutes=10),
+        sender.signature("main.tasks.refill_demo_pool_task"),
+        name="Refill demo pool",
+    )
+    sender.add_periodic_task(
+        timedelta(hours=1),
+        sender.signature("main.tasks.purge_expired_results_task"),
+        name="Purge expired task results",
+    )
+    # Price change emails are coalesced per tenant, see utils.notifications.flush_notification_digests
+    sender.add_periodic_task(
+        timedelta(minutes=1),
+        sender.signature("main.tasks.flush_notification_digests_task"),
+        name="Flush notification digests",
+    )
 
 
 # Setting this to no cover because accounts.views.check_expired_demo_users is a mirror of this task
 # and is covered by tests
-@app.task
+@app.task(ignore_result=True)
 def check_expired_demo_users():  # pragma: no cover
     """
-    Checks if any demo users are expired and deletes the corresponding periodic tasks, deactivates the user and
+    Checks if any demo users are expired and deletes the corresponding scrape schedules, deactivates the user and
     the parser for all items belonging to the user.
-    Duplicate of accounts.views.check_expired_demo_users
+    Mirrored by accounts.views.check_expired_demo_users, see utils.demo.deactivate_expired_demo_users
     """
-    import logging
-    from django_celery_beat.models import PeriodicTask
-    from django.contrib.auth import get_user_model
-    from main.models import Item
-    from utils.task_utils import task_name
-    from django.db import transaction
-
-    logger = logging.getLogger(__name__)
-    user = get_user_model()
-
-    print("Checking expired demo users...")
-    users_to_check = user.objects.filter(is_demo_user=True).filter(is_active=True).select_related("tenant")
-    logger.info("Found %s active demo users", users_to_check.count())
-    periodic_tasks_to_check = PeriodicTask.objects.filter(name__startswith="task_tenant_")
-    users_to_update = []
-    tenant_ids_for_items_deletion = []
-    periodic_tasks_to_delete = []
-
-    for user_to_check in users_to_check:
-        if not user_to_check.is_active_demo_user:
-            print(f"Checking if user {user_to_check} has an active periodic task...")
-
-            # look for matching periodic task without querying the database
-            matching_task = [task for task in periodic_tasks_to_check if task.name == task_name(user_to_check)]
-            if matching_task:
-                tenant_ids_for_items_deletion.append(user_to_check.tenant.id)
-                periodic_tasks_to_delete.append(matching_task[0].id)
-
-            # Update user status in memory
-            logger.info("Preparing to deactivate user %s", user_to_check)
-            user_to_check.is_demo_active = False
-            user_to_check.is_active = False
-            users_to_update.append(user_to_check)
-        else:
-            print(f"Demo not yet expired for {user_to_check} (id={user_to_check.id})")
-
-    with transaction.atomic():
-        # Perform bulk delete for items
-        if tenant_ids_for_items_deletion:
-            Item.objects.filter(tenant_id__in=tenant_ids_for_items_deletion).delete()
-
-        # Perform bulk delete for periodic tasks
-        if periodic_tasks_to_delete:
-            PeriodicTask.objects.filter(id__in=periodic_tasks_to_delete).delete()
-
-        # Perform bulk update for users
-        if users_to_update:
-            user.objects.bulk_update(users_to_update, ["is_demo_active", "is_active"])
-    logger.info("Bulk update completed for expired demo users.")
+    from utils import demo
+
+    demo.deactivate_expired_demo_users()
 
 
 @app.task(bind=True, ignore_result=True)
@@ -0,0 +1,130 @@
+"""
+Routing of the read-heavy pages to the read replica.
+
+The item pages and the admin lists only read, but they share the primary database with the scrapes that write
+to it all the time. Their queries go to the `replica` database instead, with two exceptions:
+
+- the session is sticky: after a request that wrote to the database, the session reads from the primary
+  for config.DB_REPLICA_STICKY_SECONDS, so that users see their own changes even if the replica is behind.
+- the primary is used when the replica is disabled (settings.DB_REPLICA_ENABLED), not configured, unreachable
+  or lagging by more than config.DB_REPLICA_MAX_LAG_SECONDS.
+
+Locally the replica is a second connection to the SQLite database (separate databases in the tests).
+"""
+
+import logging
+import time
+from contextvars import ContextVar
+from typing import Callable
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections
+from django.http import HttpRequest, HttpResponse
+
+import config
+
+logger = logging.getLogger(__name__)
+
+REPLICA_DB_ALIAS = "replica"
+STICKY_SESSION_KEY = "db_primary_until"
+REPLICA_AVAILABLE_CACHE_KEY = "db_replica_available"
+
+# set per request by ReplicaMiddleware
+_read_from_replica: ContextVar[bool] = ContextVar("read_from_replica", default=False)
+_pinned_to_primary: ContextVar[bool] = ContextVar("pinned_to_primary", default=False)
+_wrote_to_primary: ContextVar[bool] = ContextVar("wrote_to_primary", default=False)
+
+
+def read_from_replica(view: Callable) -> Callable:
+    """Marks a function view whose GET requests read from the replica, see ReplicaMiddleware.
+
+    Class-based views set `read_from_replica = True` instead.
+    """
+    view.read_from_replica = True
+    return view
+
+
+def get_replica_lag() -> float | None:
+    """How many seconds the replica is behind the primary, or None if it can't be reached."""
+    connection = connections[REPLICA_DB_ALIAS]
+    try:
+        with connection.cursor() as cursor:
+            if connection.vendor == "postgresql":
+                # NULL on a server that is not a standby, i.e. there is no lag
+                cursor.execute("SELECT COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)")
+            else:
+                cursor.execute("SELECT 0")
+            return float(cursor.fetchone()[0])
+    except DatabaseError as e:
+        logger.warning("Read replica is unreachable: %s", e)
+        return None
+
+
+def is_replica_available() -> bool:
+    """Whether the reads can go to the replica. The check is cached for config.DB_REPLICA_CHECK_SECONDS."""
+    if not settings.DB_REPLICA_ENABLED or REPLICA_DB_ALIAS not in settings.DATABASES:
+        return False
+    available = cache.get(REPLICA_AVAILABLE_CACHE_KEY)
+    if available is None:
+        lag = get_replica_lag()
+        available = lag is not None and lag <= config.DB_REPLICA_MAX_LAG_SECONDS
+        if lag is not None and not available:
+            logger.warning("Read replica is %.1fs behind, reading from the primary", lag)
+        cache.set(REPLICA_AVAILABLE_CACHE_KEY, available, config.DB_REPLICA_CHECK_SECONDS)
+    return available
+
+
+class ReplicaRouter:
+    """Sends the reads of the views marked by ReplicaMiddleware to the replica and everything else to the primary."""
+
+    def db_for_read(self, model, **hints) -> str | None:
+        if _read_from_replica.get() and not _pinned_to_primary.get() and not _wrote_to_primary.get():
+            return REPLICA_DB_ALIAS
+        return None
+
+    def db_for_write(self, model, **hints) -> str:
+        # the rest of the request (and of the sticky session) reads its own writes from the primary
+        _wrote_to_primary.set(True)
+        # explicitly: with None, Django writes objects read from the replica back to the replica
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints) -> bool | None:
+        # the replica holds the same rows as the primary
+        if {obj1._state.db, obj2._state.db} <= {DEFAULT_DB_ALIAS, REPLICA_DB_ALIAS}:
+            return True
+        return None
+
+
+class ReplicaMiddleware:
+    """Reads from the replica in the GET requests of the marked views and of the admin lists.
+
+    Must come after SessionMiddleware. Covers the rendering of the template responses too,
+    as that is where the querysets of the lists are evaluated.
+    """
+
+    def __init__(self, get_response: Callable[[HttpRequest], HttpResponse]) -> None:
+        self.get_response = get_response
+
+    def __call__(self, request: HttpRequest) -> HttpResponse:
+        read_token = _read_from_replica.set(False)
+        pinned_token = _pinned_to_primary.set(request.session.get(STICKY_SESSION_KEY, 0) > time.time())
+        wrote_token = _wrote_to_primary.set(False)
+        try:
+            response = self.get_response(request)
+            if _wrote_to_primary.get():
+                request.session[STICKY_SESSION_KEY] = time.time() + config.DB_REPLICA_STICKY_SECONDS
+        finally:
+            _read_from_replica.reset(read_token)
+            _pinned_to_primary.reset(pinned_token)
+            _wrote_to_primary.reset(wrote_token)
+        return response
+
+    def process_view(self, request: HttpRequest, view_func: Callable, view_args, view_kwargs) -> None:
+        if request.method not in ("GET", "HEAD") or _pinned_to_primary.get():
+            return
+        view = getattr(view_func, "view_class", view_func)
+        match = request.resolver_match
+        is_admin_list = match.namespace == "admin" and (match.url_name or "").endswith("_changelist")
+        if (is_admin_list or getattr(view, "read_from_replica", False)) and is_replica_available():
+            _read_from_replica.set(True)
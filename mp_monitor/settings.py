@@ -1,4 +1,5 @@
 import os
+from datetime import timedelta
 from pathlib import Path
 
 import certifi
@@ -19,6 +20,10 @@ env = environ.Env(
     SECURE_SSL_REDIRECT=(bool, True),
     SESSION_COOKIE_SECURE=(bool, True),
     SENTRY_ENABLED=(bool, True),
+    TELEGRAM_BOT_TOKEN=(str, ""),
+    TELEGRAM_API_URL=(str, "https://api.telegram.org"),
+    DB_REPLICA_ENABLED=(bool, False),
+    CACHE_URL=(str, ""),
 )
 environ.Env.read_env(BASE_DIR / ".env")
 
@@ -68,6 +73,8 @@ MIDDLEWARE = [
     "debug_toolbar.middleware.DebugToolbarMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
     "django.contrib.auth.middleware.AuthenticationMiddleware",
+    "accounts.middleware.TenantContextMiddleware",
+    "mp_monitor.db_router.ReplicaMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
     "allauth.account.middleware.AccountMiddleware",
@@ -109,6 +116,8 @@ if LOCAL_DEVELOPMENT:
             },
         }
     }
+    # a second connection to the same file stands in for the read replica (the tests create separate databases)
+    DATABASES["replica"] = {**DATABASES["default"]}
 else:
     DATABASES = {
         "default": {
@@ -121,6 +130,12 @@ else:
             "PORT": "5432",
         },
     }
+    if os.environ.get("DBREPLICAHOST"):
+        DATABASES["replica"] = {**DATABASES["default"], "HOST": os.environ["DBREPLICAHOST"]}
+
+# read-heavy pages read from the "replica" database if it is enabled, see mp_monitor.db_router
+DB_REPLICA_ENABLED = env("DB_REPLICA_ENABLED")
+DATABASE_ROUTERS = ["mp_monitor.db_router.ReplicaRouter"]
 
 # Password validation
 # https://docs.djangoproject.com/en/3.2/ref/settings/#auth-password-validators
@@ -183,6 +198,10 @@ EMAIL_HOST_PASSWORD = env("EMAIL_HOST_PASSWORD")
 EMAIL_PORT = env("EMAIL_PORT")
 DEFAULT_FROM_EMAIL = env("DEFAULT_FROM_EMAIL")
 
+# Telegram bot of the price change notifications (notifier.dispatch.TelegramChannel), disabled without a token
+TELEGRAM_BOT_TOKEN = env("TELEGRAM_BOT_TOKEN")
+TELEGRAM_API_URL = env("TELEGRAM_API_URL")
+
 
 # LOGGING
 
@@ -281,7 +300,7 @@ ACCOUNT_LOGOUT_REDIRECT = "item_list"
 AUTHENTICATION_BACKENDS = (
     "django.contrib.auth.backends.ModelBackend",
     "allauth.account.auth_backends.AuthenticationBackend",
-    "guardian.backends.ObjectPermissionBackend",
+    "accounts.backends.TenantPermissionBackend",
 )
 
 if LOCAL_DEVELOPMENT:
@@ -305,15 +324,54 @@ else:
     CELERY_BROKER_URL = "redis://localhost:6379"
     CELERY_RESULT_BACKEND = "django-db"
 
+# In production the cache is shared by all the web and Celery processes (e.g. redis://localhost:6379/1),
+# so that cache invalidations (e.g. of accounts.tenant_context) reach every one of them.
+# Local development, CI and the tests use a local memory cache and don't need Redis for it.
+CACHE_URL = env("CACHE_URL")
+if LOCAL_DEVELOPMENT or not CACHE_URL:
+    CACHES = {"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
+else:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": CACHE_URL,
+        }
+    }
+
 CELERY_TIMEZONE = "Europe/Moscow"
 CELERY_BROKER_TRANSPORT_OPTIONS = {"visibility_timout": 3600}
 CELERY_ACCEPT_CONTENT = ["application/json"]
 CELERY_TASK_SERIALIZER = "json"
 CELERY_RESULT_SERIALIZER = "json"
+# Most tasks are fire-and-forget (ignore_result=True), the rest only need their results briefly (e.g. chord headers).
+# Expired results are purged by main.tasks.purge_expired_results_task
+CELERY_RESULT_EXPIRES = timedelta(hours=24)
 
 # let celery know to use our new scheduler when running celery beat
 CELERY_BEAT_SCHEDULER = "django_celery_beat.schedulers:DatabaseScheduler"
 
+# Priority lanes: scrapes triggered by a user in the UI go to their own queue, so they never wait behind
+# scheduled bulk refreshes. Run a dedicated worker per queue, e.g.:
+#   celery -A mp_monitor worker -Q interactive
+#   celery -A mp_monitor worker -Q scheduled
+# Anything not routed below (e.g. demo users cleanup) goes to the default "celery" queue.
+SCRAPE_QUEUE_INTERACTIVE = "interactive"
+SCRAPE_QUEUE_SCHEDULED = "scheduled"
+CELERY_TASK_DEFAULT_QUEUE = "celery"
+CELERY_TASK_ROUTES = {
+    "main.tasks.scrape_job_task": {"queue": SCRAPE_QUEUE_INTERACTIVE},
+    "main.tasks.update_or_create_items_task": {"queue": SCRAPE_QUEUE_SCHEDULED},
+    "main.tasks.update_or_create_items_chunk_task": {"queue": SCRAPE_QUEUE_SCHEDULED},
+    "main.tasks.process_scheduled_price_changes_task": {"queue": SCRAPE_QUEUE_SCHEDULED},
+}
+# Concurrency of a worker consuming a single queue, unless --concurrency is passed explicitly (see mp_monitor/celery.py)
+SCRAPE_QUEUE_CONCURRENCY = {
+    SCRAPE_QUEUE_INTERACTIVE: env.int("CELERY_INTERACTIVE_CONCURRENCY", default=4),
+    SCRAPE_QUEUE_SCHEDULED: env.int("CELERY_SCHEDULED_CONCURRENCY", default=2),
+}
+# Scrape tasks are long, don't let a worker reserve tasks it cannot start right away
+CELERY_WORKER_PREFETCH_MULTIPLIER = 1
+
 # django-anymail
 ANYMAIL = {
     "SENDGRID_API_KEY": env("SENDGRID_API_KEY"),
@@ -329,7 +387,12 @@ SECURE_SSL_REDIRECT = env("SECURE_SSL_REDIRECT")
 SESSION_COOKIE_SECURE = env("SESSION_COOKIE_SECURE")
 
 #  django deploy check is not recognizing the correct SECRET_KEY from .env, silencing this warning
-SILENCED_SYSTEM_CHECKS: list[str] = ["security.W009"]
+SILENCED_SYSTEM_CHECKS: list[str] = [
+    "security.W009",
+    # guardian's object permissions are replaced by accounts.backends.TenantPermissionBackend,
+    # the app is only kept installed for its existing tables
+    "guardian.W001",
+]
 
 # sentry-sdk
 SENTRY_ENABLED = env.bool("SENTRY_ENABLED", default=False)
@@ -1,6 +1,6 @@
 from django.contrib import admin
 
-from notifier.models import PriceAlert
+from notifier.models import DeadLetterNotification, NotificationChannel, NotificationOutbox, PriceAlert
 
 
 @admin.register(PriceAlert)
@@ -12,3 +12,24 @@ class PriceAlertAdmin(admin.ModelAdmin):
     @admin.display(description="items")
     def get_items(self, obj) -> str:
         return ", ".join([item.name for item in obj.items.all()])
+
+
+@admin.register(NotificationOutbox)
+class NotificationOutboxAdmin(admin.ModelAdmin):
+    list_display = ("tenant", "item", "created_at")
+    list_filter = ("tenant",)
+    raw_id_fields = ("tenant", "item")
+
+
+@admin.register(NotificationChannel)
+class NotificationChannelAdmin(admin.ModelAdmin):
+    list_display = ("tenant", "kind", "target", "is_active")
+    list_filter = ("kind", "is_active")
+    raw_id_fields = ("tenant",)
+
+
+@admin.register(DeadLetterNotification)
+class DeadLetterNotificationAdmin(admin.ModelAdmin):
+    list_display = ("tenant", "channel", "target", "attempts", "created_at")
+    list_filter = ("channel",)
+    raw_id_fields = ("tenant",)
@@ -0,0 +1,266 @@
+"""
+Fan-out of notifications to the channels they are sent through (email, webhooks, Telegram).
+
+Each channel has its own bounded queue, a fixed number of workers (its concurrency limit), retries with exponential
+backoff and dead letters for the notifications that still fail after the last attempt. The channels run concurrently
+on one event loop, so a slow or failing channel only delays its own notifications.
+Notifications are dispatched by the periodic digest flush (see utils.notifications.flush_notification_digests),
+never by the scrape itself.
+"""
+
+import asyncio
+import logging
+from abc import ABC, abstractmethod
+from collections import Counter, defaultdict
+from dataclasses import dataclass, field
+
+import httpx
+from django.conf import settings
+from django.core.mail import EmailMessage
+
+import config
+from notifier.email import send_in_batches
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class Notification:
+    """A digest of the tenant's price changes, to be sent through one channel."""
+
+    tenant_id: int
+    channel: str
+    subject: str
+    text: str
+    item_ids: list[int]
+    # webhook URL or Telegram chat ID, the email channel sends `message` to its recipients instead
+    target: str = ""
+    message: EmailMessage | None = None
+    attempts: int = 0
+
+    def to_payload(self) -> dict:
+        return {"tenant_id": self.tenant_id, "subject": self.subject, "text": self.text, "item_ids": self.item_ids}
+
+
+@dataclass
+class DispatchResult:
+    delivered: Counter = field(default_factory=Counter)  # channel name -> number of delivered notifications
+    dead_letters: list[tuple[Notification, str]] = field(default_factory=list)  # notifications with their errors
+
+
+class Channel(ABC):
+    """Base class of the channels.
+
+    Subclasses set `name` (the Notification.channel they send) as a class attribute and implement deliver_one,
+    which sends a single notification. Workers call deliver with a batch of `batch_size` notifications.
+    EmailChannel overrides deliver instead, to send the batch over shared SMTP connections,
+    and its deliver_one goes through it.
+    """
+
+    concurrency: int = 1
+    batch_size: int = 1  # notifications taken from the queue by a worker at once
+
+    def __init__(
+        self,
+        concurrency: int | None = None,
+        queue_size: int = config.NOTIFIER_QUEUE_SIZE,
+        max_attempts: int = config.NOTIFIER_MAX_ATTEMPTS,
+        retry_backoff: float = config.NOTIFIER_RETRY_BACKOFF_SECONDS,
+    ) -> None:
+        self.concurrency = concurrency or self.concurrency
+        self.queue_size = queue_size
+        self.max_attempts = max_attempts
+        self.retry_backoff = retry_backoff
+
+    @property
+    @abstractmethod
+    def name(self) -> str:
+        """Name of the channel, set by the subclasses as a class attribute."""
+
+    async def deliver(self, notifications: list[Notification], client: httpx.AsyncClient) -> list[Exception | None]:
+        """Send the notifications.
+
+        Returns:
+            The error of each notification (None if it was delivered), in the order of `notifications`.
+        """
+        errors = []
+        for notification in notifications:
+            try:
+                await self.deliver_one(notification, client)
+            except Exception as e:
+                errors.append(e)
+            else:
+                errors.append(None)
+        return errors
+
+    @abstractmethod
+    async def deliver_one(self, notification: Notification, client: httpx.AsyncClient) -> None:
+        """Send the notification, raise if it was not delivered."""
+
+
+class EmailChannel(Channel):
+    """Sends the emails over shared SMTP connections (see notifier.email.send_in_batches) in a thread."""
+
+    name = "email"
+    concurrency = 2
+
+    def __init__(self, messages_per_connection: int = config.EMAIL_MESSAGES_PER_CONNECTION, **kwargs) -> None:
+        super().__init__(**kwargs)
+        self.batch_size = messages_per_connection
+
+    async def deliver(self, notifications: list[Notification], client: httpx.AsyncClient) -> list[Exception | None]:
+        messages = [notification.message for notification in notifications]
+        sent = await asyncio.to_thread(send_in_batches, messages, self.batch_size)
+        return [None if is_sent else ConnectionError("Email was not sent") for is_sent in sent]
+
+    async def deliver_one(self, notification: Notification, client: httpx.AsyncClient) -> None:
+        [error] = await self.deliver([notification], client)
+        if error is not None:
+            raise error
+
+
+class WebhookChannel(Channel):
+    """POSTs the notification as JSON to the tenant's URL."""
+
+    name = "webhook"
+    concurrency = 10
+
+    async def deliver_one(self, notification: Notification, client: httpx.AsyncClient) -> None:
+        response = await client.post(notification.target, json=notification.to_payload())
+        response.raise_for_status()
+
+
+class TelegramChannel(Channel):
+    """Sends the notification text to the tenant's chat with the Bot API `sendMessage` method."""
+
+    name = "telegram"
+    concurrency = 5
+
+    def __init__(self, bot_token: str, api_url: str = "https://api.telegram.org", **kwargs) -> None:
+        super().__init__(**kwargs)
+        self.url = f"{api_url.rstrip('/')}/bot{bot_token}/sendMessage"
+
+    async def deliver_one(self, notification: Notification, client: httpx.AsyncClient) -> None:
+        response = await client.post(
+            self.url, json={"chat_id": notification.target, "text": f"{notification.subject}\n\n{notification.text}"}
+        )
+        response.raise_for_status()
+        if not response.json().get("ok"):
+            raise ValueError(f"Telegram rejected the message: {response.text}")
+
+
+class Dispatcher:
+    """Sends notifications through their channels.
+
+    Usage:
+        result = Dispatcher([EmailChannel(), WebhookChannel()]).dispatch(notifications)
+    """
+
+    def __init__(self, channels: list[Channel], transport: httpx.AsyncBaseTransport | None = None) -> None:
+        self.channels = {channel.name: channel for channel in channels}
+        self.transport = transport
+
+    def dispatch(self, notifications: list[Notification]) -> DispatchResult:
+        """Send the notifications and wait until each of them is delivered or dead-lettered."""
+        result = DispatchResult()
+        by_channel = defaultdict(list)
+        for notification in notifications:
+            if notification.channel in self.channels:
+                by_channel[notification.channel].append(notification)
+            else:
+                result.dead_letters.append((notification, f"Channel {notification.channel} is not configured"))
+        if by_channel:
+            asyncio.run(self._dispatch(by_channel, result))
+        logger.info("Delivered notifications: %s, dead-lettered: %s", dict(result.delivered), len(result.dead_letters))
+        return result
+
+    async def _dispatch(self, by_channel: dict[str, list[Notification]], result: DispatchResult) -> None:
+        timeout = httpx.Timeout(config.NOTIFIER_HTTP_TIMEOUT_SECONDS)
+        async with httpx.AsyncClient(timeout=timeout, transport=self.transport) as client:
+            await asyncio.gather(
+                *(
+                    self._run_channel(self.channels[name], notifications, client, result)
+                    for name, notifications in by_channel.items()
+                )
+            )
+
+    async def _run_channel(
+        self,
+        channel: Channel,
+        notifications: list[Notification],
+        client: httpx.AsyncClient,
+        result: DispatchResult,
+    ) -> None:
+        queue = asyncio.Queue(maxsize=channel.queue_size)
+        retries = set()
+        workers = [
+            asyncio.create_task(self._work(channel, queue, client, result, retries)) for _ in range(channel.concurrency)
+        ]
+        # waits for the workers when the queue is full (backpressure), this only holds up this channel
+        for notification in notifications:
+            await queue.put(notification)
+        await queue.join()
+        for worker in workers:
+            worker.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
+
+    async def _work(
+        self,
+        channel: Channel,
+        queue: asyncio.Queue,
+        client: httpx.AsyncClient,
+        result: DispatchResult,
+        retries: set[asyncio.Task],
+    ) -> None:
+        while True:
+            batch = [await queue.get()]
+            while len(batch) < channel.batch_size and not queue.empty():
+                batch.append(queue.get_nowait())
+
+            try:
+                errors = await channel.deliver(batch, client)
+            except Exception as e:
+                errors = [e] * len(batch)
+
+            for notification, error in zip(batch, errors):
+                notification.attempts += 1
+                if error is None:
+                    result.delivered[channel.name] += 1
+                    queue.task_done()
+                elif notification.attempts >= channel.max_attempts:
+                    logger.error(
+                        "Failed to send %s notification of tenant %s after %s attempts: %r",
+                        channel.name,
+                        notification.tenant_id,
+                        notification.attempts,
+                        error,
+                    )
+                    result.dead_letters.append((notification, repr(error)))
+                    queue.task_done()
+                else:
+                    delay = channel.retry_backoff * 2 ** (notification.attempts - 1)
+                    logger.warning(
+                        "Failed to send %s notification of tenant %s, retrying in %ss: %r",
+                        channel.name,
+                        notification.tenant_id,
+                        delay,
+                        error,
+                    )
+                    task = asyncio.create_task(self._retry_later(queue, notification, delay))
+                    retries.add(task)
+                    task.add_done_callback(retries.discard)
+
+    @staticmethod
+    async def _retry_later(queue: asyncio.Queue, notification: Notification, delay: float) -> None:
+        await asyncio.sleep(delay)
+        await queue.put(notification)
+        # the notification counts as unfinished until it is back in the queue, so that queue.join() waits for it
+        queue.task_done()
+
+
+def get_dispatcher(**email_options) -> Dispatcher:
+    """The dispatcher with all the configured channels. Telegram is only available if a bot token is set."""
+    channels = [EmailChannel(**email_options), WebhookChannel()]
+    if settings.TELEGRAM_BOT_TOKEN:
+        channels.append(TelegramChannel(settings.TELEGRAM_BOT_TOKEN, settings.TELEGRAM_API_URL))
+    return Dispatcher(channels)
@@ -9,11 +9,18 @@ WARNING! This disables hostname verification, which is a security risk. Avoid us
 
 """
 
+import logging
 import ssl
+from typing import Sequence
 
+from django.core.mail import EmailMessage, get_connection
 from django.core.mail.backends.smtp import EmailBackend as SMTPBackend
 from django.utils.functional import cached_property
 
+import config
+
+logger = logging.getLogger(__name__)
+
 
 class EmailBackend(SMTPBackend):
     @cached_property
@@ -27,3 +34,35 @@ class EmailBackend(SMTPBackend):
             ssl_context.check_hostname = False
             ssl_context.verify_mode = ssl.CERT_NONE
             return ssl_context
+
+
+def send_in_batches(
+    messages: Sequence[EmailMessage],
+    messages_per_connection: int = config.EMAIL_MESSAGES_PER_CONNECTION,
+) -> list[bool]:
+    """Send the emails over shared connections, opening one connection per `messages_per_connection` emails.
+
+    msg.send() opens a new connection (TCP + TLS handshake + login) for every email, which limits the throughput
+    to a few emails per second. The number of emails per connection is bounded, because SMTP servers
+    usually close connections that send too much.
+    The emails of a batch are sent one at a time on its connection, so that the emails accepted before a failure
+    are reported as sent and are not sent again when the rest is retried. A failure ends its batch (the connection
+    is likely broken), but doesn't stop the batches after it.
+
+    Returns:
+        Whether each email was sent, in the order of `messages`.
+    """
+    sent = [False] * len(messages)
+    for start in range(0, len(messages), messages_per_connection):
+        batch = messages[start : start + messages_per_connection]
+        try:
+            with get_connection() as connection:
+                for i, msg in enumerate(batch, start):
+                    connection.send_messages([msg])
+                    sent[i] = True
+        except Exception:
+            logger.exception(
+                "Failed to send %s of %s emails", sent[start : start + len(batch)].count(False), len(batch)
+            )
+    logger.info("Sent %s of %s emails", sum(sent), len(messages))
+    return sent
@@ -0,0 +1,65 @@
+# Generated by Django 5.1.4 on 2026-10-19 02:09
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("accounts", "0004_tenant_quota_counter"),
+        ("main", "0013_price_item_created_index"),
+        ("notifier", "0002_pricealert_target_price_direction"),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name="pricealert",
+            options={
+                "ordering": ["-is_active"],
+                "verbose_name": "Price Alert",
+                "verbose_name_plural": "Price Alerts",
+            },
+        ),
+        migrations.AlterField(
+            model_name="pricealert",
+            name="is_active",
+            field=models.BooleanField(default=True, verbose_name="Включено"),
+        ),
+        migrations.CreateModel(
+            name="NotificationOutbox",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                (
+                    "item",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="+",
+                        to="main.item",
+                    ),
+                ),
+                (
+                    "tenant",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="notification_outbox",
+                        to="accounts.tenant",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Уведомление в очереди",
+                "verbose_name_plural": "Очередь уведомлений",
+                "indexes": [models.Index(fields=["created_at"], name="notifier_no_created_02babc_idx")],
+                "constraints": [models.UniqueConstraint(fields=("tenant", "item"), name="unique_outbox_item")],
+            },
+        ),
+    ]
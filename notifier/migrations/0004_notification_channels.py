@@ -0,0 +1,88 @@
+# Generated by Django 5.1.4 on 2026-10-19 02:29
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("accounts", "0004_tenant_quota_counter"),
+        ("notifier", "0003_notification_outbox"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="DeadLetterNotification",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("channel", models.CharField(max_length=20)),
+                ("target", models.CharField(blank=True, max_length=255)),
+                ("payload", models.JSONField()),
+                ("error", models.TextField()),
+                ("attempts", models.PositiveSmallIntegerField(default=0)),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                (
+                    "tenant",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="dead_letter_notifications",
+                        to="accounts.tenant",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Неотправленное уведомление",
+                "verbose_name_plural": "Неотправленные уведомления",
+            },
+        ),
+        migrations.CreateModel(
+            name="NotificationChannel",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "kind",
+                    models.CharField(
+                        choices=[("webhook", "Webhook"), ("telegram", "Telegram")],
+                        max_length=20,
+                    ),
+                ),
+                (
+                    "target",
+                    models.CharField(help_text="URL вебхука или ID чата Telegram", max_length=255),
+                ),
+                (
+                    "is_active",
+                    models.BooleanField(default=True, verbose_name="Включено"),
+                ),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                (
+                    "tenant",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="notification_channels",
+                        to="accounts.tenant",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Канал уведомлений",
+                "verbose_name_plural": "Каналы уведомлений",
+            },
+        ),
+    ]
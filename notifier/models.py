@@ -36,3 +36,74 @@ class PriceAlert(models.Model):
 
     def __str__(self):
         return f"Price Alert for {self.tenant} #{self.pk}"
+
+
+class NotificationOutbox(models.Model):
+    """
+    An item whose price alert triggered, waiting to be sent in the tenant's next digest email.
+    The items triggered within config.NOTIFICATION_DIGEST_WINDOW_MINUTES are merged into one email,
+    see utils.notifications.flush_notification_digests.
+    """
+
+    tenant = models.ForeignKey(Tenant, on_delete=models.CASCADE, related_name="notification_outbox")
+    item = models.ForeignKey(Item, on_delete=models.CASCADE, related_name="+")
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = "Уведомление в очереди"
+        verbose_name_plural = "Очередь уведомлений"
+        constraints = [
+            # an item triggered again before the digest is sent is only listed once
+            models.UniqueConstraint(fields=["tenant", "item"], name="unique_outbox_item"),
+        ]
+        indexes = [
+            models.Index(fields=["created_at"]),
+        ]
+
+    def __str__(self):
+        return f"Notification of {self.tenant} about item #{self.item_id}"
+
+
+class NotificationChannel(models.Model):
+    """
+    Where the tenant's price change digests are sent besides the email of its users, see notifier.dispatch.
+    """
+
+    class Kind(models.TextChoices):
+        WEBHOOK = "webhook", "Webhook"
+        TELEGRAM = "telegram", "Telegram"
+
+    tenant = models.ForeignKey(Tenant, on_delete=models.CASCADE, related_name="notification_channels")
+    kind = models.CharField(max_length=20, choices=Kind.choices)
+    target = models.CharField(max_length=255, help_text="URL вебхука или ID чата Telegram")
+    is_active = models.BooleanField(default=True, verbose_name="Включено")
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = "Канал уведомлений"
+        verbose_name_plural = "Каналы уведомлений"
+
+    def __str__(self):
+        return f"{self.get_kind_display()} of {self.tenant}: {self.target}"
+
+
+class DeadLetterNotification(models.Model):
+    """
+    A notification that its channel failed to send even after all the retries.
+    Kept with its payload so that it can be looked into and resent.
+    """
+
+    tenant = models.ForeignKey(Tenant, on_delete=models.CASCADE, related_name="dead_letter_notifications")
+    channel = models.CharField(max_length=20)
+    target = models.CharField(max_length=255, blank=True)
+    payload = models.JSONField()
+    error = models.TextField()
+    attempts = models.PositiveSmallIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = "Неотправленное уведомление"
+        verbose_name_plural = "Неотправленные уведомления"
+
+    def __str__(self):
+        return f"{self.channel} notification of {self.tenant} #{self.pk}"
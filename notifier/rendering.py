@@ -0,0 +1,127 @@
+"""
+Building and rendering of the price change emails.
+
+A digest is assembled from rows rendered per item. The rows are cached by item and price, so a notification wave
+renders every changed item once per format, no matter how many digests (and retries of failed digests) list it.
+The compiled templates themselves are cached by Django's cached template loader.
+"""
+
+import logging
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.mail import EmailMultiAlternatives
+from django.db.models import OuterRef, Subquery
+from django.template.loader import get_template
+from django.utils.safestring import mark_safe
+
+import config
+from main.models import Item, Price
+
+logger = logging.getLogger(__name__)
+User = get_user_model()
+
+FORMATS = {
+    # format: (digest template, row template)
+    "txt": ("notifier/emails/price_change_notification.txt", "notifier/emails/price_change_row.txt"),
+    "html": ("notifier/emails/price_change_notification.html", "notifier/emails/price_change_row.html"),
+}
+
+
+def _get_row_cache_key(item: Item, fmt: str) -> str:
+    # the previous price is part of the row too: the same price can be reached from different previous prices
+    return f"price_change_row:{fmt}:{item.id}:{item.price}:{item.previous_price_value}"
+
+
+def render_item_rows(items: list[Item], fmt: str) -> list[str]:
+    """Render the rows of the items in the given format, reusing the cached rows.
+
+    Args:
+        items: Items annotated with previous_price_value and price_change_percent,
+            see build_price_change_email.
+        fmt: "txt" or "html".
+
+    Returns:
+        Rendered rows in the order of `items`.
+    """
+    keys = [_get_row_cache_key(item, fmt) for item in items]
+    rows = cache.get_many(keys)
+    missing = {}
+    row_template = get_template(FORMATS[fmt][1])
+    for key, item in zip(keys, items):
+        if key not in rows:
+            rows[key] = missing[key] = row_template.render({"item": item})
+    if missing:
+        cache.set_many(missing, timeout=config.NOTIFICATION_ROW_CACHE_SECONDS)
+    # the rows are already escaped when rendered
+    return [mark_safe(rows[key]) for key in keys]
+
+
+def render_price_change_email(user_name: str, items: list[Item]) -> tuple[str, str]:
+    """Render the text and the HTML body of the price change email.
+
+    Returns:
+        Text content and HTML content.
+    """
+    text_template, html_template = get_template(FORMATS["txt"][0]), get_template(FORMATS["html"][0])
+    text_content = text_template.render({"user_name": user_name, "rows": render_item_rows(items, "txt")})
+    html_content = html_template.render({"user_name": user_name, "rows": render_item_rows(items, "html")})
+    return text_content, html_content
+
+
+def build_price_change_email(tenant_id: int, item_ids: list[int]) -> EmailMultiAlternatives | None:
+    """
+    Build the email notification about the price change of the tenant's items, without sending it.
+
+    The items are loaded with their previous prices in a single query.
+
+    Args:
+        tenant_id (int): ID of the tenant.
+        item_ids (list): IDs of the tenant's items that have changed their prices.
+
+    Returns:
+        The email to all users of the tenant, or None if there is nothing to send.
+    """
+    logger.info("Building price change email to users...")
+    if not item_ids:
+        logger.info("No items have active notifiers. Exiting.")
+        return None
+
+    previous_prices = Price.objects.filter(item=OuterRef("pk")).order_by("-created_at", "-id").values("value")[1:2]
+    items = list(
+        Item.objects.filter(id__in=item_ids, tenant_id=tenant_id)
+        .annotate(previous_price_value=Subquery(previous_prices))
+        .order_by("id")
+    )
+    if not items:
+        logger.info("Items %s of tenant %s no longer exist. Exiting.", item_ids, tenant_id)
+        return None
+    for item in items:
+        item.price_change_percent = _get_percent_change(item.previous_price_value, item.price)
+
+    users = list(User.objects.filter(tenant_id=tenant_id).select_related("profile").order_by("id"))
+    if not users:
+        logger.info("Tenant %s has no users to notify. Exiting.", tenant_id)
+        return None
+    email_subject = f"Цена товаров ({len(items)}) изменилась"
+    email_recipients = [user.email for user in users]
+
+    text_content, html_content = render_price_change_email(users[0].profile.name, items)
+
+    logger.info("Built email to %s with subject '%s'", email_recipients, email_subject)
+    msg = EmailMultiAlternatives(
+        email_subject,
+        text_content,
+        "info@mpmonitor.ru",
+        email_recipients,
+    )
+
+    msg.attach_alternative(html_content, "text/html")
+    return msg
+
+
+def _get_percent_change(previous_price: Decimal | None, price: Decimal | None) -> float:
+    if not previous_price or price is None:
+        return 0.0
+    return round(float((price - previous_price) / previous_price * 100), 2)
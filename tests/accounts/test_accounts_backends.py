@@ -0,0 +1,56 @@
+import pytest
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import AnonymousUser
+from guardian.models import GroupObjectPermission
+
+from accounts.backends import TenantPermissionBackend, get_user_tenant_ids
+from accounts.models import TenantStatus
+from factories import ItemFactory, UserFactory
+from main.models import Item
+
+User = get_user_model()
+
+
+class TestTenantPermissionBackend:
+    @pytest.fixture
+    def user(self) -> User:
+        return UserFactory()
+
+    @pytest.fixture
+    def item(self, user: User) -> Item:
+        return ItemFactory(tenant=user.tenant)
+
+    @pytest.mark.parametrize("perm", ["view_item", "main.view_item", "main.change_item"])
+    def test_users_of_tenant_have_perms_on_its_objects(self, user: User, item: Item, perm: str) -> None:
+        assert user.has_perm(perm, item)
+
+    def test_users_of_other_tenants_have_no_perms(self, item: Item) -> None:
+        assert not UserFactory().has_perm("main.view_item", item)
+
+    @pytest.mark.parametrize("perm", ["notifier.view_item", "main.view_price", "main.publish_item"])
+    def test_perms_of_other_models_not_granted(self, user: User, item: Item, perm: str) -> None:
+        assert not TenantPermissionBackend().has_perm(user, perm, item)
+
+    def test_no_model_level_perms(self, user: User) -> None:
+        assert not user.has_perm("main.view_item")
+
+    def test_inactive_and_anonymous_users_have_no_perms(self, user: User, item: Item) -> None:
+        user.is_active = False
+
+        assert not TenantPermissionBackend().has_perm(user, "main.view_item", item)
+        assert not TenantPermissionBackend().has_perm(AnonymousUser(), "main.view_item", item)
+
+    def test_deleted_tenant_has_no_members(self, user: User) -> None:
+        user.tenant.status = TenantStatus.DELETED
+        user.tenant.save()
+
+        assert get_user_tenant_ids(user) == frozenset()
+
+    def test_tenant_membership_cached_on_user(self, user: User, item: Item, django_assert_num_queries) -> None:
+        user.has_perm("main.view_item", item)
+
+        with django_assert_num_queries(0):
+            assert user.has_perm("main.change_item", item)
+
+    def test_no_object_permission_rows_for_new_items(self, item: Item) -> None:
+        assert not GroupObjectPermission.objects.exists()
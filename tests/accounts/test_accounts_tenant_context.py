@@ -0,0 +1,80 @@
+from decimal import Decimal
+
+import pytest
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import AnonymousUser
+from django.urls import reverse
+
+from accounts.models import PaymentPlan
+from accounts.tenant_context import get_tenant_context
+from factories import UserFactory
+
+User = get_user_model()
+
+
+class TestTenantContext:
+    @pytest.fixture
+    def user(self) -> User:
+        user = UserFactory()
+        # a fresh instance without the tenant cached by the factory
+        return User.objects.get(id=user.id)
+
+    def test_tenant_plan_and_quota_loaded_in_one_query(self, user: User, django_assert_num_queries) -> None:
+        with django_assert_num_queries(1):
+            tenant_ctx = get_tenant_context(user)
+            assert tenant_ctx.payment_plan == tenant_ctx.tenant.payment_plan
+            assert tenant_ctx.quota is not None
+            assert user.tenant.quota == tenant_ctx.quota
+
+    def test_context_shared_between_requests(self, user: User, django_assert_num_queries) -> None:
+        get_tenant_context(user)
+        user_of_next_request = User.objects.get(id=user.id)
+
+        with django_assert_num_queries(0):
+            tenant_ctx = get_tenant_context(user_of_next_request)
+            assert user_of_next_request.tenant.quota == tenant_ctx.quota
+
+    def test_anonymous_user_has_no_tenant(self) -> None:
+        tenant_ctx = get_tenant_context(AnonymousUser())
+
+        assert tenant_ctx.tenant is None
+        assert tenant_ctx.quota is None
+
+    def test_invalidated_on_plan_switch(self, user: User) -> None:
+        get_tenant_context(user)
+        PaymentPlan.objects.create(name=PaymentPlan.PlanName.BUSINESS)
+        user.tenant.switch_plan(PaymentPlan.PlanName.BUSINESS)
+
+        tenant_ctx = get_tenant_context(User.objects.get(id=user.id))
+
+        assert tenant_ctx.payment_plan.name == PaymentPlan.PlanName.BUSINESS
+        assert tenant_ctx.quota.name == PaymentPlan.PlanName.BUSINESS
+
+    def test_invalidated_on_balance_change(self, user: User) -> None:
+        get_tenant_context(user).tenant.add_to_balance(Decimal("100"))
+
+        assert get_tenant_context(User.objects.get(id=user.id)).tenant.balance == Decimal("100")
+
+    def test_cache_outage_does_not_fail_save(self, user: User, mocker) -> None:
+        mocker.patch("accounts.tenant_context.cache.delete_many", side_effect=ConnectionError)
+
+        user.tenant.add_to_balance(Decimal("100"))
+
+        user.tenant.refresh_from_db()
+        assert user.tenant.balance == Decimal("100")
+
+    def test_invalidated_on_quota_update(self, user: User) -> None:
+        quota = get_tenant_context(user).quota
+        quota.total_hours_allowed += 1
+        quota.save()
+
+        tenant_ctx = get_tenant_context(User.objects.get(id=user.id))
+
+        assert tenant_ctx.quota.total_hours_allowed == quota.total_hours_allowed
+
+    def test_middleware_sets_tenant_ctx(self, client, user: User) -> None:
+        client.force_login(user)
+
+        response = client.get(reverse("item_list"))
+
+        assert response.wsgi_request.tenant_ctx.tenant.id == user.tenant_id
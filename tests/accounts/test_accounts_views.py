@@ -6,12 +6,12 @@ from django.contrib.auth import get_user_model
 from django.test import Client
 from django.urls import reverse
 from django.utils import timezone
-from django_celery_beat.models import PeriodicTask
 
 import config
 from accounts.forms import EmailChangeForm
-from main.models import Item
-from tests.factories import UserFactory, PeriodicTaskFactory
+from main.models import Item, Schedule
+from tests.factories import UserFactory, ScheduleFactory
+from utils import demo
 
 logger = logging.getLogger(__name__)
 
@@ -80,6 +80,18 @@ class TestDemoView:
         user = User.objects.get(username__startswith="demo-user")
         assert user.is_authenticated
 
+    def test_demo_user_claimed_from_pool(self, client, django_capture_on_commit_callbacks, mocker):
+        refill = mocker.patch("main.tasks.refill_demo_pool_task.delay")
+        pool_user = demo.provision_demo_user(is_demo_active=False)
+
+        with django_capture_on_commit_callbacks(execute=True):
+            client.get(reverse("demo"))
+
+        pool_user.refresh_from_db()
+        assert pool_user.is_demo_active
+        assert int(client.session["_auth_user_id"]) == pool_user.id
+        refill.assert_called_once()
+
     def test_demo_user_quota(self, client):
         """
         Checks if the demo user has the correct quota.
@@ -88,7 +100,8 @@ class TestDemoView:
         user = User.objects.get(username__startswith="demo-user")
         items = Item.objects.filter(tenant=user.tenant)
         assert user.tenant.quota.total_hours_allowed == config.DEMO_USER_HOURS_ALLOWED
-        assert user.tenant.quota.skus_limit == config.DEMO_USER_MAX_ALLOWED_SKUS - len(items)
+        assert user.tenant.quota.skus_limit == config.DEMO_USER_MAX_ALLOWED_SKUS
+        assert user.tenant.quota_counter.skus_remaining == config.DEMO_USER_MAX_ALLOWED_SKUS - len(items)
 
 
 @pytest.mark.demo_user
@@ -149,24 +162,22 @@ class TestCheckExpiredDemoUsers:
         assert not demo_user.is_active
         assert not demo_user.is_demo_active
 
-    def test_periodic_task_is_deleted_for_expired_demo_user(
-        self, client: Client, create_expired_demo_user: User
-    ) -> None:
+    def test_schedule_is_deleted_for_expired_demo_user(self, client: Client, create_expired_demo_user: User) -> None:
         superuser = UserFactory(username="superuser")
         superuser.is_superuser = True
         superuser.save()
         demo_user = create_expired_demo_user
-        logger.info("Creating periodic task for demo user...")
-        PeriodicTaskFactory(name=f"task_tenant_{demo_user.tenant.id}")
+        logger.info("Creating scrape schedule for demo user...")
+        ScheduleFactory(tenant=demo_user.tenant)
 
         client.force_login(superuser)
-        logger.info("Checking periodic task was created...")
-        assert PeriodicTask.objects.count() == 1
+        logger.info("Checking scrape schedule was created...")
+        assert Schedule.objects.count() == 1
 
         client.post(reverse("check_expired_demo_users"))
-        logger.info("Checking periodic task was deleted after demo user was deactivated...")
-        assert PeriodicTask.objects.count() == 0, (
-            f"Demo user should have 0 periodic tasks, but has {PeriodicTask.objects.count()}"
+        logger.info("Checking scrape schedule was deleted after demo user was deactivated...")
+        assert Schedule.objects.count() == 0, (
+            f"Demo user should have 0 scrape schedules, but has {Schedule.objects.count()}"
         )
 
     def test_no_modification_made_to_active_demo_user(self, client: Client, create_active_demo_user: User) -> None:
@@ -174,20 +185,20 @@ class TestCheckExpiredDemoUsers:
         superuser.is_superuser = True
         superuser.save()
         demo_user = create_active_demo_user
-        logger.info("Creating periodic task for demo user...")
-        PeriodicTaskFactory(name=f"task_tenant_{demo_user.tenant.id}")
+        logger.info("Creating scrape schedule for demo user...")
+        ScheduleFactory(tenant=demo_user.tenant)
 
         client.force_login(superuser)
-        logger.info("Checking periodic task was created...")
-        assert PeriodicTask.objects.count() == 1
+        logger.info("Checking scrape schedule was created...")
+        assert Schedule.objects.count() == 1
 
         client.post(reverse("check_expired_demo_users"))
 
         assert demo_user.is_active
         assert demo_user.is_demo_active
-        logger.info("Checking periodic task was not deleted for active demo user...")
-        assert PeriodicTask.objects.count() == 1, (
-            f"Demo user should have 0 periodic tasks, but has {PeriodicTask.objects.count()}"
+        logger.info("Checking scrape schedule was not deleted for active demo user...")
+        assert Schedule.objects.count() == 1, (
+            f"Demo user should have 0 scrape schedules, but has {Schedule.objects.count()}"
         )
 
 
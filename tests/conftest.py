@@ -1,7 +1,45 @@
 import pytest
+from django.conf import settings
+from django.core.cache import cache
+
+from mp_monitor.celery import app as celery_app
+from smtp_server import LocalSMTPServer
+
+
+def pytest_configure(config):
+    """The tests don't need a Redis server for the cache (settings.CACHES)."""
+    settings.CACHES = {"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
 
 
 @pytest.fixture(autouse=True)
 # using aaa in name to make sure this fixture always runs first due to some alphabetical order in certain cases
 def aaa_db(db):
     pass
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    """Objects cached by one test (e.g. accounts.tenant_context) must not leak into the next one."""
+    yield
+    cache.clear()
+
+
+@pytest.fixture(autouse=True)
+def celery_eager():
+    """Run Celery tasks in-process so that views queueing tasks can be tested without a broker."""
+    celery_app.conf.task_always_eager = True
+    celery_app.conf.task_eager_propagates = True
+
+
+@pytest.fixture
+def smtp_server(settings):
+    """Send the emails over SMTP to a local server instead of the in-memory outbox."""
+    with LocalSMTPServer() as server:
+        settings.EMAIL_BACKEND = "django.core.mail.backends.smtp.EmailBackend"
+        settings.EMAIL_HOST = "127.0.0.1"
+        settings.EMAIL_PORT = server.port
+        settings.EMAIL_USE_TLS = False
+        settings.EMAIL_USE_SSL = False
+        settings.EMAIL_HOST_USER = ""
+        settings.EMAIL_HOST_PASSWORD = ""
+        yield server
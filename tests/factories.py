@@ -4,7 +4,7 @@ from factory.django import DjangoModelFactory
 
 from accounts.models import Tenant, TenantQuota, PaymentPlan, Profile
 from config import DEFAULT_QUOTAS, PlanType
-from main.models import Item
+from main.models import Item, Schedule
 from mp_monitor import settings
 from notifier.models import PriceAlert
 
@@ -56,6 +56,15 @@ class PeriodicTaskFactory(DjangoModelFactory):
     args = ["test_arg_1", "test_arg_2"]
 
 
+class ScheduleFactory(DjangoModelFactory):
+    class Meta:
+        model = Schedule
+
+    tenant = factory.SubFactory(TenantFactory)
+    interval_value = 24
+    period = Schedule.Period.HOURS
+
+
 class ItemFactory(DjangoModelFactory):
     class Meta:
         model = Item
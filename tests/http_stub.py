@@ -0,0 +1,62 @@
+"""
+Local stand-in for the HTTP services the notifications are sent to: webhooks and a Telegram-style Bot API.
+
+Plugged into httpx as a transport (see notifier.dispatch.Dispatcher), so no requests leave the process.
+Responses can be delayed and the first requests can be made to fail, to test retries and slow channels.
+"""
+
+import asyncio
+import json
+import time
+
+import httpx
+
+
+class HTTPStub:
+    """Records the requests and answers them like the Bot API (`sendMessage`) or a webhook receiver.
+
+    Usage:
+        stub = HTTPStub(latency=0.1, failures=2)
+        Dispatcher(channels, transport=stub.transport).dispatch(notifications)
+        assert stub.telegram_messages == [...]
+    """
+
+    def __init__(
+        self, latency: float = 0.0, failures: int = 0, latency_by_host: dict[str, float] | None = None
+    ) -> None:
+        self.latency = latency
+        self.latency_by_host = latency_by_host or {}
+        self.failures = failures  # number of the first requests answered with 500
+        self.requests: list[tuple[float, httpx.Request]] = []  # with the time they were answered
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    @property
+    def transport(self) -> httpx.MockTransport:
+        return httpx.MockTransport(self.handle)
+
+    @property
+    def telegram_messages(self) -> list[dict]:
+        return [
+            json.loads(request.content) for _, request in self.requests if request.url.path.endswith("/sendMessage")
+        ]
+
+    @property
+    def webhook_payloads(self) -> list[dict]:
+        return [json.loads(request.content) for _, request in self.requests if "/bot" not in request.url.path]
+
+    async def handle(self, request: httpx.Request) -> httpx.Response:
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(self.latency_by_host.get(request.url.host, self.latency))
+        finally:
+            self.in_flight -= 1
+
+        if self.failures:
+            self.failures -= 1
+            return httpx.Response(500)
+        self.requests.append((time.monotonic(), request))
+        if request.url.path.endswith("/sendMessage"):
+            return httpx.Response(200, json={"ok": True, "result": {"message_id": len(self.requests)}})
+        return httpx.Response(204)
@@ -0,0 +1,171 @@
+import time
+
+import pytest
+from django.contrib.sessions.middleware import SessionMiddleware
+from django.db import connections
+from django.http import HttpRequest, HttpResponse
+from django.test import Client, RequestFactory
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from accounts.models import PaymentPlan, Tenant, TenantQuota, TenantQuotaCounter, User
+from factories import ItemFactory, UserFactory
+from main.models import Item, Price
+from mp_monitor.db_router import STICKY_SESSION_KEY, ReplicaMiddleware, ReplicaRouter, _read_from_replica
+from utils import billing
+
+pytestmark = pytest.mark.django_db(databases=["default", "replica"])
+
+
+def replicate(*models) -> None:
+    """Copy the rows of the models from the primary to the replica, like the replication would."""
+    for model in models:
+        model.objects.using("replica").bulk_create(model.objects.using("default").all())
+
+
+class TestReplicaRouting:
+    @pytest.fixture(autouse=True)
+    def replica_enabled(self, settings) -> None:
+        settings.DB_REPLICA_ENABLED = True
+
+    @pytest.fixture
+    def user(self) -> User:
+        return UserFactory()
+
+    @pytest.fixture
+    def item(self, user: User) -> Item:
+        item = ItemFactory(tenant=user.tenant, name="Replicated name")
+        billing.get_quota_counter(user.tenant)
+        replicate(TenantQuota, PaymentPlan, Tenant, TenantQuotaCounter, User, Item, Price)
+        # the replica has not caught up with this change yet
+        Item.objects.filter(id=item.id).update(name="Primary name")
+        return item
+
+    @pytest.fixture
+    def client(self, user: User) -> Client:
+        client = Client()
+        client.force_login(user)
+        return client
+
+    def test_item_list_read_from_replica(self, client: Client, item: Item) -> None:
+        response = client.get(reverse("item_list"))
+
+        assert "Replicated name" in response.content.decode()
+
+    def test_item_detail_read_from_replica(self, client: Client, item: Item) -> None:
+        response = client.get(reverse("item_detail", args=[item.sku]))
+
+        assert "Replicated name" in response.content.decode()
+
+    def test_chart_read_from_replica(self, client: Client, item: Item) -> None:
+        with CaptureQueriesContext(connections["replica"]) as replica_queries:
+            response = client.get(reverse("load_chart", args=[item.sku]))
+
+        assert response.status_code == 200
+        assert len(replica_queries) > 0
+
+    def test_admin_list_read_from_replica(self, item: Item) -> None:
+        admin = UserFactory(is_staff=True, is_superuser=True)
+        client = Client()
+        client.force_login(admin)
+
+        response = client.get(reverse("admin:main_item_changelist"))
+
+        assert "Replicated name" in response.content.decode()
+
+    def test_other_views_read_from_primary(self, client: Client, item: Item) -> None:
+        with CaptureQueriesContext(connections["replica"]) as replica_queries:
+            client.get(reverse("profile"))
+
+        assert len(replica_queries) == 0
+
+    def test_sticky_session_reads_from_primary(self, client: Client, item: Item) -> None:
+        session = client.session
+        session[STICKY_SESSION_KEY] = time.time() + 30
+        session.save()
+
+        response = client.get(reverse("item_list"))
+
+        assert "Primary name" in response.content.decode()
+
+    def test_expired_sticky_session_reads_from_replica(self, client: Client, item: Item) -> None:
+        session = client.session
+        session[STICKY_SESSION_KEY] = time.time() - 1
+        session.save()
+
+        response = client.get(reverse("item_list"))
+
+        assert "Replicated name" in response.content.decode()
+
+    def test_disabled_replica_not_read(self, client: Client, item: Item, settings) -> None:
+        settings.DB_REPLICA_ENABLED = False
+
+        response = client.get(reverse("item_list"))
+
+        assert "Primary name" in response.content.decode()
+
+    def test_object_read_from_replica_saved_to_primary(self, item: Item) -> None:
+        def view(request) -> HttpResponse:
+            _read_from_replica.set(True)
+            replica_item = Item.objects.get(id=item.id)
+            replica_item.name = "Saved name"
+            replica_item.save()
+            return HttpResponse(replica_item._state.db)
+
+        request = RequestFactory().get("/")
+        SessionMiddleware(lambda r: HttpResponse()).process_request(request)
+        response = ReplicaMiddleware(view)(request)
+
+        assert response.content == b"default"
+        assert Item.objects.using("default").get(id=item.id).name == "Saved name"
+        assert Item.objects.using("replica").get(id=item.id).name == "Replicated name"
+
+    @pytest.mark.parametrize("lag", [60.0, None], ids=["lagging", "unreachable"])
+    def test_unavailable_replica_not_read(self, client: Client, item: Item, lag: float | None, mocker) -> None:
+        mocker.patch("mp_monitor.db_router.get_replica_lag", return_value=lag)
+
+        response = client.get(reverse("item_list"))
+
+        assert "Primary name" in response.content.decode()
+
+
+class TestReplicaMiddleware:
+    def get_request(self) -> HttpRequest:
+        request = RequestFactory().get("/")
+        SessionMiddleware(lambda r: HttpResponse()).process_request(request)
+        return request
+
+    def test_write_pins_session_to_primary(self) -> None:
+        def view(request) -> HttpResponse:
+            ItemFactory()
+            return HttpResponse()
+
+        request = self.get_request()
+        ReplicaMiddleware(view)(request)
+
+        assert request.session[STICKY_SESSION_KEY] > time.time()
+
+    def test_read_does_not_pin_session(self) -> None:
+        def view(request) -> HttpResponse:
+            list(Item.objects.all())
+            return HttpResponse()
+
+        request = self.get_request()
+        ReplicaMiddleware(view)(request)
+
+        assert STICKY_SESSION_KEY not in request.session
+
+    def test_reads_after_write_in_same_request_go_to_primary(self, settings) -> None:
+        settings.DB_REPLICA_ENABLED = True
+        routed = []
+
+        def view(request) -> HttpResponse:
+            _read_from_replica.set(True)
+            routed.append(ReplicaRouter().db_for_read(Item))
+            Item.objects.filter(id=0).update(name="")
+            routed.append(ReplicaRouter().db_for_read(Item))
+            return HttpResponse()
+
+        ReplicaMiddleware(view)(self.get_request())
+
+        assert routed == ["replica", None]
@@ -1,17 +1,16 @@
 import logging
+from datetime import timedelta
 
 import pytest
 from django.contrib.auth import get_user_model
-from django.contrib.auth.models import Group
 from django.core.exceptions import ObjectDoesNotExist
 from django.db import IntegrityError
 from django.urls import reverse
 from django.utils import timezone
-from guardian.shortcuts import assign_perm, get_perms
 
 from accounts.models import Tenant, TenantStatus
-from main.models import Item, Price
-from tests.factories import UserFactory, TenantFactory
+from main.models import Item, Price, Schedule
+from tests.factories import ScheduleFactory, UserFactory, TenantFactory
 
 logger = logging.getLogger(__name__)
 
@@ -152,53 +151,6 @@ class TestItemModel:
         assert Price.objects.filter(item=item).count() == 1
 
 
-class TestAddPermsToGroupSignal:
-    @pytest.fixture
-    def item_group(self) -> Group:
-        group = Group.objects.create(name="Test Group")
-        return group
-
-    @pytest.fixture
-    def tenant(self) -> Tenant:
-        tenant = Tenant.objects.create(name="Test Group")
-        return tenant
-
-    def test_creating_item_adds_view_item_permission(self, item_group: Group, tenant: Tenant) -> None:
-        item = Item.objects.create(
-            tenant=tenant,
-            name="Sample Item",
-            sku="12345",
-            price=100,
-        )
-        logger.info(
-            "Checking if the 'view_item' permission is assigned to the group '%s'",
-            item_group.name,
-        )
-        assert "view_item" in get_perms(item_group, item), (
-            f"Expected 'view_item' permission to be assigned to the group '{item_group.name}' but it wasn't"
-        )
-
-    def test_manual_add_perm_does_not_create_duplicate_perm(self, item_group: Group, tenant: Tenant) -> None:
-        item = Item.objects.create(
-            tenant=tenant,
-            name="Sample Item",
-            sku="12345",
-            price=100,
-        )
-
-        logger.info(
-            "Manually adding the 'view_item' permission for item '%s' to group '%s'",
-            item.name,
-            item_group,
-        )
-        assign_perm("main.view_item", item_group, item)
-
-        logger.info("Checking that the signal does not add a duplicate permission to group")
-        assert len(get_perms(item_group, item)) == 1, (
-            f"Group '{item_group}' should have only 1 permission, but it has {len(get_perms(item_group, item))}"
-        )
-
-
 class TestPriceModel:
     @pytest.fixture
     def tenant(self) -> Tenant:
@@ -244,3 +196,26 @@ class TestPriceModel:
                 "no_negative_price_value CHECK constraint..."
             )
             Price.objects.create(item=item, value=-100, created_at=timezone.now())
+
+
+class TestScheduleModel:
+    def test_phase_offset_is_deterministic_and_within_interval(self) -> None:
+        schedule = ScheduleFactory(interval_value=1, period="hours")
+        same_tenant_schedule = Schedule(tenant_id=schedule.tenant_id, interval_value=1, period="hours")
+
+        assert schedule.phase_offset == same_tenant_schedule.phase_offset
+        assert timedelta(0) <= schedule.phase_offset < timedelta(hours=1)
+
+    def test_tenants_with_same_interval_get_different_phases(self) -> None:
+        offsets = {ScheduleFactory(interval_value=1, period="hours").phase_offset for _ in range(5)}
+        assert len(offsets) > 1
+
+    def test_next_run_at_is_aligned_to_phase(self) -> None:
+        schedule = ScheduleFactory(interval_value=1, period="hours")
+        now = timezone.now()
+
+        next_run_at = schedule.get_next_run_at(now)
+
+        assert now < next_run_at <= now + timedelta(hours=1)
+        assert timedelta(seconds=next_run_at.timestamp() % 3600) == schedule.phase_offset
+        assert schedule.get_next_run_at(next_run_at) == next_run_at + timedelta(hours=1)
@@ -1,6 +1,7 @@
 import pytest
 from django.utils import timezone
 
+from accounts.models import Tenant
 from factories import TenantFactory, PaymentPlanFactory
 from main.models import Order
 from utils.payment import update_payment_records
@@ -80,3 +81,12 @@ class TestUpdatePaymentRecords:
     # test balance is updated and plan not switched if order intent is ADD_TO_BALANCE
     # test plan is switched if order intent is SWITCH_PLAN
     # test billing_start_date is updated if order intent is SWITCH_PLAN
+
+    def test_balance_added_to_current_balance(self, payment_data: dict, order: Order, tenant) -> None:
+        # topped up since the order was loaded
+        Tenant.objects.filter(id=tenant.id).update(balance=100)
+
+        update_payment_records(payment_data, order)
+
+        tenant.refresh_from_db()
+        assert tenant.balance == 100 + 11990
@@ -1,12 +1,29 @@
 import logging
+from datetime import timedelta
 
 import httpx
 import pytest
+from django.conf import settings
 from django.contrib.auth import get_user_model
-
-from accounts.models import Tenant
-from main.models import Item
-from main.tasks import scrape_interval_task
+from django.utils import timezone
+from django_celery_results.models import TaskResult
+
+import config
+from accounts.models import Tenant, TenantQuotaCounter
+from factories import ItemFactory, ScheduleFactory
+from main.exceptions import InvalidSKUException
+from main.models import Item, Price, Schedule, ScheduledRun, ScrapeJob
+from main.tasks import (
+    dispatch_due_items_task,
+    purge_expired_results_task,
+    scrape_interval_task,
+    scrape_job_task,
+    update_or_create_items_chunk_task,
+    update_or_create_items_task,
+)
+from mp_monitor.celery import app as celery_app, setup_queue_concurrency
+from utils import billing, run_locks
+from utils.items import PriceChange
 
 logger = logging.getLogger(__name__)
 
@@ -212,3 +229,405 @@ class TestScrapeIntervalTask:
             invalid_tenant_id,
         )
         Tenant.objects.get.assert_called_once_with(id=invalid_tenant_id)  # type: ignore
+
+
+class TestScrapeJobTask:
+    @pytest.fixture
+    def tenant(self) -> Tenant:
+        user = User.objects.create_user(username="testuser", email="testuser@test.com", password="testpassword")
+        return user.tenant
+
+    @pytest.fixture
+    def scrape_item(self, mocker):
+        def _scrape_item(sku: str) -> dict:
+            if sku == "99999":
+                raise InvalidSKUException(message="Request returned no item for SKU.", sku=sku)
+            return {"sku": sku, "name": f"Item {sku}", "price": 100, "is_in_stock": True}
+
+        return mocker.patch("utils.marketplace.scrape_item", side_effect=_scrape_item)
+
+    def test_job_completes_with_progress_and_partial_results(self, tenant: Tenant, scrape_item, mocker) -> None:
+        mocker.patch("utils.notifications.process_price_change_notifications")
+        job = ScrapeJob.objects.create(tenant=tenant, skus=["12345", "99999"], total=2)
+
+        scrape_job_task(job.id)
+
+        job.refresh_from_db()
+        assert job.status == ScrapeJob.Status.COMPLETED
+        assert job.processed == 2
+        assert job.progress_percent == 100
+        assert [item["sku"] for item in job.items_data] == ["12345"]
+        assert job.invalid_skus == ["99999"]
+        assert job.finished_at is not None
+        assert Item.objects.filter(tenant=tenant, sku="12345").exists()
+
+    def test_only_scraped_skus_charged(self, tenant: Tenant, scrape_item, mocker) -> None:
+        mocker.patch("utils.notifications.process_price_change_notifications")
+        counter = billing.get_quota_counter(tenant)
+        billing.reserve_quota(tenant, skus=2, parse_units=2)
+        job = ScrapeJob.objects.create(
+            tenant=tenant, skus=["12345", "99999"], total=2, reserved_skus=2, reserved_parse_units=2
+        )
+
+        scrape_job_task(job.id)
+
+        charged = TenantQuotaCounter.objects.get(id=counter.id)
+        assert charged.skus_remaining == counter.skus_remaining - 1
+        assert charged.parse_units_remaining == counter.parse_units_remaining - 1
+
+    def test_notifications_processed_once_with_price_changes(self, tenant: Tenant, scrape_item, mocker) -> None:
+        process_notifications = mocker.patch("utils.notifications.process_price_change_notifications")
+        changed_item = ItemFactory(tenant=tenant, sku="12345", price=50)
+        ItemFactory(tenant=tenant, sku="67890", price=100)
+        job = ScrapeJob.objects.create(tenant=tenant, skus=["12345", "67890", "11111"], total=3)
+
+        scrape_job_task(job.id)
+
+        process_notifications.assert_called_once()
+        assert process_notifications.call_args.args[1] == [PriceChange(changed_item.id, 50, 100)]
+
+    def test_only_displayed_fields_of_items_stored(self, tenant: Tenant, mocker) -> None:
+        mocker.patch("utils.notifications.process_price_change_notifications")
+        mocker.patch(
+            "utils.marketplace.scrape_item",
+            return_value={"sku": "12345", "name": "Item", "price": 100, "is_in_stock": True, "brand": "Brand"},
+        )
+        job = ScrapeJob.objects.create(tenant=tenant, skus=["12345"], total=1)
+
+        scrape_job_task(job.id)
+
+        job.refresh_from_db()
+        assert job.items_data == [{"sku": "12345", "name": "Item", "price": 100, "is_in_stock": True}]
+
+    def test_job_marked_failed_on_unexpected_error(self, tenant: Tenant, mocker) -> None:
+        mocker.patch("utils.marketplace.scrape_item", side_effect=RuntimeError("WB is down"))
+        job = ScrapeJob.objects.create(tenant=tenant, skus=["12345"], total=1)
+
+        with pytest.raises(RuntimeError):
+            scrape_job_task(job.id)
+
+        job.refresh_from_db()
+        assert job.status == ScrapeJob.Status.FAILED
+        assert job.is_finished
+
+
+class TestUpdateOrCreateItemsTask:
+    @pytest.fixture
+    def tenant(self) -> Tenant:
+        user = User.objects.create_user(username="testuser", email="testuser@test.com", password="testpassword")
+        ScheduleFactory(tenant=user.tenant)
+        return user.tenant
+
+    @pytest.fixture
+    def lock_token(self, tenant: Tenant) -> str:
+        run_locks.acquire_run_lock(tenant.id, "run-token")
+        return "run-token"
+
+    def create_due_items(self, tenant: Tenant, skus: list[str]) -> list[Item]:
+        now = timezone.now()
+        return [
+            ItemFactory(
+                tenant=tenant, sku=sku, is_parser_active=True, next_run_at=now - timedelta(minutes=len(skus) - i)
+            )
+            for i, sku in enumerate(skus)
+        ]
+
+    def test_due_skus_streamed_in_chunks(self, tenant: Tenant, lock_token: str, mocker) -> None:
+        mocker.patch("config.SCHEDULED_SCRAPE_CHUNK_SIZE", 2)
+        chord = mocker.patch("main.tasks.chord")
+        self.create_due_items(tenant, ["11111", "22222", "33333", "44444", "55555"])
+        ItemFactory(tenant=tenant, sku="66666", is_parser_active=True, next_run_at=timezone.now() + timedelta(hours=1))
+
+        update_or_create_items_task(tenant.id, lock_token)
+
+        header = chord.call_args.args[0]
+        assert [signature.args for signature in header] == [
+            (tenant.id, ["11111", "22222"]),
+            (tenant.id, ["33333", "44444"]),
+            (tenant.id, ["55555"]),
+        ]
+        callback = chord.return_value.call_args.args[0]
+        assert callback.task == "main.tasks.process_scheduled_price_changes_task"
+        assert callback.args == (tenant.id,)
+        assert callback.kwargs["sku_count"] == 5
+
+    def test_chunks_jittered_within_window(self, tenant: Tenant, lock_token: str, mocker) -> None:
+        mocker.patch("config.SCHEDULED_SCRAPE_CHUNK_SIZE", 1)
+        chord = mocker.patch("main.tasks.chord")
+        self.create_due_items(tenant, ["11111", "22222", "33333"])
+
+        update_or_create_items_task(tenant.id, lock_token, jitter_seconds=30)
+
+        countdowns = [signature.options["countdown"] for signature in chord.call_args.args[0]]
+        assert len(countdowns) == 3
+        assert all(0 <= countdown <= 30 for countdown in countdowns)
+
+    def test_next_run_at_moved_to_next_phased_run(self, tenant: Tenant, lock_token: str, mocker) -> None:
+        mocker.patch("main.tasks.chord")
+        schedule = Schedule.objects.get(tenant=tenant)
+        (item,) = self.create_due_items(tenant, ["11111"])
+
+        update_or_create_items_task(tenant.id, lock_token)
+
+        item.refresh_from_db()
+        assert timezone.now() < item.next_run_at <= timezone.now() + schedule.run_every
+        assert item.next_run_at == schedule.get_next_run_at(item.next_run_at - schedule.run_every)
+
+    def test_adaptive_schedule_polls_stable_items_less_often(self, tenant: Tenant, lock_token: str, mocker) -> None:
+        mocker.patch("main.tasks.chord")
+        Schedule.objects.filter(tenant=tenant).update(is_adaptive=True)
+        (item,) = self.create_due_items(tenant, ["11111"])
+        for _ in range(3):
+            Price.objects.create(item=item, value=item.price)
+        started_at = timezone.now()
+
+        update_or_create_items_task(tenant.id, lock_token)
+
+        item.refresh_from_db()
+        slowed_down = timedelta(hours=24 * config.ADAPTIVE_POLLING_MAX_SLOWDOWN)
+        assert started_at + slowed_down <= item.next_run_at <= timezone.now() + slowed_down
+
+    def test_notifications_processed_once_per_run(self, tenant: Tenant, lock_token: str, mocker) -> None:
+        mocker.patch("config.SCHEDULED_SCRAPE_CHUNK_SIZE", 1)
+        mocker.patch(
+            "utils.marketplace.scrape_items_from_skus",
+            side_effect=lambda skus, is_parser_active: ([{"sku": skus, "name": f"Item {skus}", "price": 100}], []),
+        )
+        process_notifications = mocker.patch("utils.notifications.process_price_change_notifications")
+        due_items = self.create_due_items(tenant, ["11111", "22222"])
+        Item.objects.filter(tenant=tenant).update(price=50)
+
+        update_or_create_items_task(tenant.id, lock_token)
+
+        assert Item.objects.filter(tenant=tenant).count() == 2
+        process_notifications.assert_called_once()
+        assert sorted(process_notifications.call_args.args[1]) == [PriceChange(item.id, 50, 100) for item in due_items]
+
+    def test_completed_run_releases_lock_and_is_recorded(self, tenant: Tenant, lock_token: str, mocker) -> None:
+        mocker.patch("utils.marketplace.scrape_items_from_skus", return_value=([], []))
+        mocker.patch("utils.notifications.process_price_change_notifications")
+        self.create_due_items(tenant, ["11111", "22222"])
+
+        update_or_create_items_task(tenant.id, lock_token)
+
+        run = ScheduledRun.objects.get(tenant=tenant)
+        assert run.status == ScheduledRun.Status.COMPLETED
+        assert run.sku_count == 2
+        assert run.duration is not None
+        assert run.lock_wait >= timedelta(0)
+        assert Schedule.objects.get(tenant=tenant).locked_until is None
+
+    def test_skus_not_scraped_recorded_as_failures(self, tenant: Tenant, lock_token: str, mocker) -> None:
+        mocker.patch(
+            "utils.marketplace.scrape_items_from_skus",
+            return_value=([{"sku": "11111", "name": "Item 1", "price": 100}], ["22222"]),
+        )
+        mocker.patch("utils.notifications.process_price_change_notifications")
+        self.create_due_items(tenant, ["11111", "22222"])
+
+        update_or_create_items_task(tenant.id, lock_token)
+
+        run = ScheduledRun.objects.get(tenant=tenant)
+        assert run.sku_count == 2
+        assert run.failures == 1
+
+    def test_demo_user_charged_only_for_scraped_skus(self, tenant: Tenant, lock_token: str, mocker) -> None:
+        mocker.patch(
+            "utils.marketplace.scrape_items_from_skus",
+            return_value=([{"sku": "11111", "name": "Item 1", "price": 100}], ["22222"]),
+        )
+        mocker.patch("utils.notifications.process_price_change_notifications")
+        User.objects.filter(tenant=tenant).update(is_demo_user=True)
+        self.create_due_items(tenant, ["11111", "22222"])
+        parse_units = billing.get_quota_counter(tenant).parse_units_remaining
+
+        update_or_create_items_task(tenant.id, lock_token)
+
+        assert billing.get_quota_counter(tenant).parse_units_remaining == parse_units - 1
+
+    def test_demo_user_out_of_quota_skipped_until_next_run(self, tenant: Tenant, lock_token: str, mocker) -> None:
+        chord = mocker.patch("main.tasks.chord")
+        User.objects.filter(tenant=tenant).update(is_demo_user=True)
+        (item,) = self.create_due_items(tenant, ["11111"])
+        billing.get_quota_counter(tenant)
+        TenantQuotaCounter.objects.filter(tenant=tenant).update(parse_units_remaining=0)
+
+        update_or_create_items_task(tenant.id, lock_token)
+
+        chord.assert_not_called()
+        run = ScheduledRun.objects.get(tenant=tenant)
+        assert run.status == ScheduledRun.Status.SKIPPED
+        assert run.failures == run.sku_count == 1
+        assert Schedule.objects.get(tenant=tenant).locked_until is None
+        item.refresh_from_db()
+        assert item.next_run_at > timezone.now()
+
+    def test_run_without_due_items_releases_lock(self, tenant: Tenant, lock_token: str, mocker) -> None:
+        chord = mocker.patch("main.tasks.chord")
+
+        update_or_create_items_task(tenant.id, lock_token)
+
+        chord.assert_not_called()
+        assert ScheduledRun.objects.get(tenant=tenant).sku_count == 0
+        assert Schedule.objects.get(tenant=tenant).locked_until is None
+
+    def test_run_that_lost_its_lock_skipped(self, tenant: Tenant, lock_token: str, mocker) -> None:
+        chord = mocker.patch("main.tasks.chord")
+        (item,) = self.create_due_items(tenant, ["11111"])
+        Schedule.objects.filter(tenant=tenant).update(lock_token="another-run")
+
+        update_or_create_items_task(tenant.id, lock_token)
+
+        chord.assert_not_called()
+        assert ScheduledRun.objects.get(tenant=tenant).status == ScheduledRun.Status.SKIPPED
+        item.refresh_from_db()
+        assert item.next_run_at <= timezone.now()
+
+    def test_chunk_task_persists_items(self, tenant: Tenant, mocker) -> None:
+        mocker.patch(
+            "utils.marketplace.scrape_items_from_skus",
+            return_value=([{"sku": "11111", "name": "Item 1", "price": 100, "is_parser_active": True}], []),
+        )
+
+        update_or_create_items_chunk_task(tenant.id, [11111])
+
+        assert Item.objects.get(tenant=tenant, sku="11111").is_parser_active
+
+    def test_failed_chunk_is_retried_on_its_own(self, tenant: Tenant, mocker) -> None:
+        scrape = mocker.patch(
+            "utils.marketplace.scrape_items_from_skus",
+            side_effect=[RuntimeError("WB is down"), ([{"sku": "11111", "name": "Item 1", "price": 100}], [])],
+        )
+
+        result = update_or_create_items_chunk_task.apply(args=(tenant.id, [11111]), throw=False).get()
+
+        assert scrape.call_count == 2
+        assert result["scraped"] == 1
+
+    def test_chunk_returns_no_items_when_retries_exhausted(self, tenant: Tenant, mocker) -> None:
+        mocker.patch("utils.marketplace.scrape_items_from_skus", side_effect=RuntimeError("WB is down"))
+        mocker.patch.object(update_or_create_items_chunk_task, "max_retries", 0)
+
+        result = update_or_create_items_chunk_task.apply(args=(tenant.id, [11111]), throw=False).get()
+
+        assert result == {"scraped": 0, "price_changes": []}
+
+
+class TestDispatchDueItemsTask:
+    @pytest.fixture
+    def apply_async(self, mocker):
+        return mocker.patch("main.tasks.update_or_create_items_task.apply_async")
+
+    def test_only_tenants_with_due_active_items_are_dispatched(self, apply_async) -> None:
+        schedule = ScheduleFactory(interval_value=2, period="hours")
+        now = timezone.now()
+        ItemFactory(tenant=schedule.tenant, is_parser_active=True, next_run_at=now - timedelta(minutes=1))
+        ItemFactory(tenant=schedule.tenant, is_parser_active=True, next_run_at=now - timedelta(minutes=2))
+        not_due = ScheduleFactory()
+        ItemFactory(tenant=not_due.tenant, is_parser_active=True, next_run_at=now + timedelta(minutes=5))
+        ItemFactory(tenant=not_due.tenant, is_parser_active=False, next_run_at=now - timedelta(minutes=1))
+
+        dispatch_due_items_task()
+
+        apply_async.assert_called_once()
+        tenant_id, lock_token = apply_async.call_args.args[0]
+        assert tenant_id == schedule.tenant_id
+        schedule.refresh_from_db()
+        assert schedule.lock_token == lock_token
+        assert schedule.last_run_at is not None
+
+    def test_tenants_with_run_in_progress_are_held_back(self, apply_async) -> None:
+        schedule = ScheduleFactory()
+        item = ItemFactory(tenant=schedule.tenant, is_parser_active=True, next_run_at=timezone.now())
+        run_locks.acquire_run_lock(schedule.tenant_id, "running")
+
+        dispatch_due_items_task()
+
+        apply_async.assert_not_called()
+        item.refresh_from_db()
+        assert item.next_run_at <= timezone.now()
+
+    def test_tenants_spread_evenly_over_the_tick(self, apply_async, mocker) -> None:
+        mocker.patch("config.SCHEDULER_TICK_SECONDS", 60)
+        for _ in range(3):
+            schedule = ScheduleFactory()
+            ItemFactory(tenant=schedule.tenant, is_parser_active=True, next_run_at=timezone.now())
+
+        dispatch_due_items_task()
+
+        countdowns = [call.kwargs["countdown"] for call in apply_async.call_args_list]
+        assert countdowns == [0, 20, 40]
+
+    def test_items_without_schedule_are_unscheduled(self, apply_async) -> None:
+        item = ItemFactory(is_parser_active=True, next_run_at=timezone.now())
+
+        dispatch_due_items_task()
+
+        item.refresh_from_db()
+        apply_async.assert_not_called()
+        assert item.next_run_at is None
+        assert not Schedule.objects.exists()
+
+
+class TestPurgeExpiredResultsTask:
+    def test_expired_results_and_old_finished_jobs_purged(self, mocker) -> None:
+        mocker.patch.object(settings, "CELERY_RESULT_BACKEND", "django-db")
+        expired = TaskResult.objects.create(task_id="expired", status="SUCCESS")
+        TaskResult.objects.filter(id=expired.id).update(date_done=timezone.now() - timedelta(days=2))
+        TaskResult.objects.create(task_id="recent", status="SUCCESS")
+        tenant = ScheduleFactory().tenant
+        old_job = ScrapeJob.objects.create(tenant=tenant, finished_at=timezone.now() - timedelta(days=30))
+        running_job = ScrapeJob.objects.create(tenant=tenant)
+
+        purge_expired_results_task()
+
+        assert list(TaskResult.objects.values_list("task_id", flat=True)) == ["recent"]
+        assert list(ScrapeJob.objects.all()) == [running_job]
+        assert not ScrapeJob.objects.filter(id=old_job.id).exists()
+
+    @pytest.mark.parametrize(
+        "task_name",
+        [
+            "main.tasks.dispatch_due_items_task",
+            "main.tasks.update_or_create_items_task",
+            "main.tasks.process_scheduled_price_changes_task",
+            "main.tasks.scrape_job_task",
+            "main.tasks.purge_expired_results_task",
+            "main.tasks.flush_notification_digests_task",
+            "mp_monitor.celery.check_expired_demo_users",
+        ],
+    )
+    def test_fire_and_forget_tasks_store_no_results(self, task_name: str) -> None:
+        assert celery_app.tasks[task_name].ignore_result
+
+
+class TestQueueRouting:
+    @pytest.mark.parametrize(
+        "task_name, queue",
+        [
+            ("main.tasks.scrape_job_task", settings.SCRAPE_QUEUE_INTERACTIVE),
+            ("main.tasks.update_or_create_items_task", settings.SCRAPE_QUEUE_SCHEDULED),
+            ("main.tasks.update_or_create_items_chunk_task", settings.SCRAPE_QUEUE_SCHEDULED),
+            ("main.tasks.process_scheduled_price_changes_task", settings.SCRAPE_QUEUE_SCHEDULED),
+        ],
+    )
+    def test_scrape_tasks_routed_to_their_queue(self, task_name: str, queue: str) -> None:
+        route = celery_app.amqp.router.route({}, task_name)
+        assert route["queue"].name == queue
+
+    @pytest.mark.parametrize(
+        "options, expected_concurrency",
+        [
+            ({"queues": [settings.SCRAPE_QUEUE_INTERACTIVE]}, 4),
+            ({"queues": [settings.SCRAPE_QUEUE_SCHEDULED], "concurrency": 8}, None),
+            ({"queues": [settings.SCRAPE_QUEUE_INTERACTIVE, settings.SCRAPE_QUEUE_SCHEDULED]}, None),
+        ],
+        ids=["single_queue", "explicit_concurrency", "several_queues"],
+    )
+    def test_worker_concurrency_taken_from_settings(self, options: dict, expected_concurrency, mocker) -> None:
+        mocker.patch.dict(settings.SCRAPE_QUEUE_CONCURRENCY, {settings.SCRAPE_QUEUE_INTERACTIVE: 4})
+        conf = mocker.Mock(worker_concurrency=None)
+
+        setup_queue_concurrency(sender="worker", instance=None, conf=conf, options=options)
+
+        assert conf.worker_concurrency == expected_concurrency
@@ -1,4 +1,5 @@
 import logging
+from datetime import timedelta
 from unittest.mock import Mock
 
 import httpx
@@ -7,17 +8,17 @@ from django.contrib import messages
 from django.contrib.auth import get_user_model
 from django.http import HttpRequest
 from django.test import RequestFactory
+from django.utils import timezone
 from django.utils.safestring import mark_safe
 from pytest_mock import MockerFixture
 
 import config
 from accounts.models import Tenant
-from factories import ItemFactory, UserFactory, PeriodicTaskFactory, IntervalScheduleFactory, TenantFactory
+from factories import ItemFactory, UserFactory, ScheduleFactory, TenantFactory
 from main.exceptions import InvalidSKUException, PlanScheduleLimitationException
 from main.models import Item
 from utils.items import (
     uncheck_all_boxes,
-    update_or_create_items,
     is_at_least_one_item_selected,
     activate_parsing_for_selected_items,
 )
@@ -30,7 +31,7 @@ from utils.notifications import (
     show_successful_scrape_message,
     show_invalid_skus_message,
 )
-from utils.task_utils import check_plan_schedule_limitations
+from utils.task_utils import check_plan_schedule_limitations, get_scheduler_capacity
 from utils.task_utils import get_interval_russian_translation
 
 logger = logging.getLogger(__name__)
@@ -480,57 +481,6 @@ class TestScrapeItemsFromSKUs:
         )
 
 
-class TestUpdateOrCreateItems:
-    @pytest.fixture
-    def user(self):
-        user = User.objects.create(username="test_user", email="test_email@test.com")
-        return user
-
-    @pytest.fixture
-    def tenant(self, user) -> Tenant:
-        tenant = Tenant.objects.get(name__startswith=user.email)
-        return tenant
-
-    def test_existing_item_updated_and_not_created(self, request, user, tenant):
-        request.user = user
-        item_data = {"sku": "123", "name": "Test Item"}
-        Item.objects.create(tenant=tenant, sku="123", name="Original Item")
-
-        logger.info("Calling update_or_create_items() with a mock item_data dictionary")
-        update_or_create_items(request, [item_data])
-
-        item = Item.objects.get(sku="123")
-        assert item.name == "Test Item"
-
-    def test_new_item_created(self, request, user):
-        request.user = user
-        item_data = {"sku": "456", "name": "New Item"}
-        update_or_create_items(request, [item_data])
-
-        item = Item.objects.get(sku="456")
-        assert item.name == "New Item"
-
-    def test_update_or_create_multiple_items(self, request, user):
-        request.user = user
-        Item.objects.create(tenant=user.tenant, sku="111", name="Original 1")
-
-        item_data = [
-            {"sku": "111", "name": "Item 1"},
-            {"sku": "222", "name": "Item 2"},
-        ]
-        update_or_create_items(request, item_data)
-
-        item1 = Item.objects.get(sku="111")
-        item2 = Item.objects.get(sku="222")
-
-        logger.info("Checking that the original item was updated")
-        assert item1.name != "Original 1"
-        assert item1.name == "Item 1"
-
-        logger.info("Checking that a new item was created")
-        assert item2.name == "Item 2"
-
-
 class TestActivateParsingForSelectedItems:
     def test_only_affected_items_updated(self):
         user = UserFactory()
@@ -588,8 +538,8 @@ class TestGetIntervalRussianTranslation:
         ],
     )
     def test_get_interval_russian_translation(self, every, period, expected):
-        task = PeriodicTaskFactory(interval=IntervalScheduleFactory(every=every, period=period))
-        result = get_interval_russian_translation(task)
+        schedule = ScheduleFactory(interval_value=every, period=period)
+        result = get_interval_russian_translation(schedule)
         assert result == expected
 
 
@@ -615,6 +565,36 @@ class TestCheckPlanLimitations:
             assert False, f"Plan limitation exception raised, but it should not have: {e}"
 
 
+class TestGetSchedulerCapacity:
+    def test_average_requests_per_minute(self) -> None:
+        every_10_minutes = ScheduleFactory(interval_value=10, period="minutes")
+        ItemFactory.create_batch(5, tenant=every_10_minutes.tenant, is_parser_active=True)
+        ItemFactory(tenant=every_10_minutes.tenant, is_parser_active=False)
+        hourly = ScheduleFactory(interval_value=1, period="hours")
+        ItemFactory.create_batch(6, tenant=hourly.tenant, is_parser_active=True)
+
+        capacity = get_scheduler_capacity()
+
+        assert capacity["average_rpm"] == 0.6
+        assert [(schedule, rpm) for schedule, _, rpm in capacity["schedules"]] == [
+            (every_10_minutes, 0.5),
+            (hourly, 0.1),
+        ]
+
+    def test_requests_bucketed_per_minute(self, mocker: MockerFixture) -> None:
+        now = mocker.patch("django.utils.timezone.now", return_value=timezone.now()).return_value
+        schedule = ScheduleFactory()
+        next_minute = now.replace(second=0, microsecond=0) + timedelta(minutes=1)
+        ItemFactory.create_batch(3, tenant=schedule.tenant, is_parser_active=True, next_run_at=next_minute)
+        ItemFactory(tenant=schedule.tenant, is_parser_active=True, next_run_at=next_minute - timedelta(hours=1))
+
+        capacity = get_scheduler_capacity(window_minutes=5)
+
+        assert [requests for _, requests in capacity["per_minute"]] == [0, 3, 0, 0, 0]
+        assert capacity["peak_rpm"] == 3
+        assert capacity["overdue"] == 1
+
+
 # TODO: scheduled updates quota will be removed in the near future
 # class TestUpdateTenantQuotaForScheduledUpdates:
 #     def test_exception_raised_if_no_quota(self):
@@ -1,24 +1,29 @@
 import logging
-from datetime import datetime
+from datetime import timedelta
 from typing import Type, Any
 
 import httpx
 import pytest
-import pytz
 from django.contrib.auth import get_user_model
 from django.core.handlers.wsgi import WSGIRequest
 from django.http import Http404
 from django.test import RequestFactory, Client
 from django.urls import reverse
 from django.utils import timezone
-from django_celery_beat.models import PeriodicTask
 
-from accounts.models import TenantQuota
+from accounts.models import Tenant, TenantQuota, TenantQuotaCounter
+from accounts.tenant_context import get_tenant_context
 from config import DEFAULT_QUOTAS, PlanType
-from factories import IntervalScheduleFactory, PeriodicTaskFactory, UserFactory
+from factories import (
+    IntervalScheduleFactory,
+    ItemFactory,
+    PaymentPlanFactory,
+    PeriodicTaskFactory,
+    ScheduleFactory,
+    UserFactory,
+)
 from main.forms import ScrapeForm, ScrapeIntervalForm
-from main.models import Item
-from utils.task_utils import task_name
+from main.models import Item, Schedule, ScrapeJob
 from main.views import (
     ItemListView,
     ItemDetailView,
@@ -28,6 +33,7 @@ from main.views import (
     update_scrape_interval,
 )
 from tests.factories import TenantQuotaFactory
+from utils import run_locks
 
 logger = logging.getLogger(__name__)
 
@@ -77,6 +83,7 @@ class TestItemListView:
         request = factory.get(url)
         request.user = user
         request.session = {}
+        request.tenant_ctx = get_tenant_context(user)
 
         return request
 
@@ -104,12 +111,7 @@ class TestItemListView:
         user = request_with_user.user
         expected_context_items = ["scrape_interval_task", "next_interval_run_at"]
 
-        PeriodicTaskFactory(
-            name=task_name(user),
-            interval=IntervalScheduleFactory(every=10, period="minutes"),
-            args=["arg1", 1],
-            last_run_at=timezone.now(),
-        )
+        ScheduleFactory(tenant=user.tenant, interval_value=10, period="minutes")
 
         request = request_with_user
         view = ItemListView()
@@ -129,52 +131,24 @@ class TestItemListView:
 
     def test_next_interval_run_is_calculated_correctly_in_context(self, request_with_user: WSGIRequest) -> None:
         """
-        Tests that the `next_interval_run_at` value in the view context is calculated correctly for periodic tasks
-        with a previously run time (`last_run_at` not None).
-
-        This test simulates a scenario where a view (`ItemListView` in this case) has a periodic task associated with it.
-        It verifies that the calculated `next_interval_run_at` based on the task's schedule (`run_every` and `period`)
-        matches the corresponding value stored in the view's context data.
-
-        **Key points:**
-
-        - The test creates a sample periodic task with a schedule and sets its `last_run_at` to the current time.
-        - It retrieves the context data from the view after setting up the object list.
-        - Both the calculated `next_interval_run_at` and the one from the context are converted to UTC and adjusted
-          to remove seconds and microseconds for tolerance in the assertion (1-minute tolerance).
-        - Finally, the test asserts that the two `next_interval_run_at` values are equal.
+        Tests that the `next_interval_run_at` value in the view context is the earliest due time
+        of the tenant's scheduled items. Inactive items are not taken into account.
         """
         user = request_with_user.user
+        ScheduleFactory(tenant=user.tenant, interval_value=10, period="minutes")
+        now = timezone.now()
+        ItemFactory(tenant=user.tenant, is_parser_active=True, next_run_at=now + timedelta(minutes=7))
+        ItemFactory(tenant=user.tenant, is_parser_active=True, next_run_at=now + timedelta(minutes=3))
+        ItemFactory(tenant=user.tenant, is_parser_active=False, next_run_at=now + timedelta(minutes=1))
 
-        task = PeriodicTaskFactory(
-            name=task_name(user),
-            interval=IntervalScheduleFactory(every=10, period="minutes"),
-            args=["arg1", 1],
-            last_run_at=timezone.now(),
-        )
-
-        task.last_run_at = datetime.now()
         request = request_with_user
         view = ItemListView()
         view.setup(request)
-
-        logger.info(
-            "Initializing 'object_list' attribute for '%s' view to access its get_context_data()",
-            view.__class__.__name__,
-        )
         view.object_list = view.get_queryset()
-        logger.debug("view.object_list = %s", view.object_list)
 
         context = view.get_context_data()
 
-        next_interval_run_at = task.last_run_at + task.schedule.run_every
-        logger.info("Removing seconds and microseconds to establish assert tolerance to minutes...")
-        next_interval_run_at = next_interval_run_at.astimezone(pytz.utc).replace(microsecond=0).replace(second=0)
-        context_next_interval_run_at = (
-            context["next_interval_run_at"].astimezone(pytz.utc).replace(microsecond=0).replace(second=0)
-        )
-
-        assert next_interval_run_at == context_next_interval_run_at
+        assert context["next_interval_run_at"] == now + timedelta(minutes=3)
 
     # https://docs.djangoproject.com/en/4.2/topics/testing/advanced/#example
     def test_item_list_page_renders_correctly(self, request_with_user: WSGIRequest) -> None:
@@ -220,6 +194,7 @@ class TestItemDetailView:
         request = factory.get(url)
         request.user = user
         request.session = {}
+        request.tenant_ctx = get_tenant_context(user)
 
         return request
 
@@ -275,6 +250,13 @@ class TestItemDetailView:
         response = client.get(valid_url)
         assert response.status_code != 404, f"Expected status code not 404 but got {response.status_code}"
 
+    def test_items_of_other_tenants_not_found(self, client: Client, logged_in_user: User) -> None:
+        other_item = ItemFactory()
+
+        response = client.get(reverse("item_detail", kwargs={"slug": other_item.sku}))
+
+        assert response.status_code == 404
+
 
 class TestScrapeItemsView:
     @pytest.fixture(autouse=True)
@@ -456,7 +438,7 @@ class TestScrapeItemsView:
         logger.info("Checking if the error message was displayed to the user...")
         assert error_message.call_count == 1
 
-        new_user_quota = request.user.tenant.quota.skus_limit
+        new_user_quota = TenantQuotaCounter.objects.get(tenant=request.user.tenant).skus_remaining
         logger.info("Checking if the max allowed skus were not changed after the error...")
         assert new_user_quota == old_user_quota
 
@@ -482,7 +464,7 @@ class TestScrapeItemsView:
         logger.info("Checking that no error message was displayed to the user...")
         assert error_message.call_count == 0
 
-        new_user_quota = request.user.tenant.quota.skus_limit
+        new_user_quota = TenantQuotaCounter.objects.get(tenant=request.user.tenant).skus_remaining
         logger.info("Checking if the max allowed skus was changed by the number of skus sent...")
         assert new_user_quota == old_user_quota - len(skus)
 
@@ -561,7 +543,7 @@ class TestScrapeItemsView:
         logger.info("Checking if the error message was displayed to the user...")
         assert error_message.call_count == 1
 
-        new_user_quota = request.user.tenant.quota.parse_units_limit
+        new_user_quota = TenantQuotaCounter.objects.get(tenant=request.user.tenant).parse_units_remaining
         logger.info("Checking if the allowed parse units were not changed after the error...")
         assert new_user_quota == old_user_quota
 
@@ -591,9 +573,9 @@ class TestScrapeItemsView:
         logger.info("Checking if the error message was displayed to the user...")
         assert error_message.call_count == 0
 
-        new_user_quota = request.user.tenant.quota.parse_units_limit
-        logger.info("Checking if the allowed parse units were not changed after the error...")
-        assert new_user_quota != old_user_quota
+        new_user_quota = TenantQuotaCounter.objects.get(tenant=request.user.tenant).parse_units_remaining
+        logger.info("Checking if the allowed parse units were charged for the scraped SKUs...")
+        assert new_user_quota == old_user_quota - len(skus)
 
 
 class TestCreateScrapeIntervalTaskView:
@@ -684,8 +666,8 @@ class TestCreateScrapeIntervalTaskView:
     def test_task_created(self, client: Client, logged_in_user: User, valid_form_data: dict, mocker):
         mocker.patch("django.contrib.messages.error")
         client.post(reverse("create_scrape_interval"), data=valid_form_data)
-        assert PeriodicTask.objects.all().count() == 1, (
-            f"Expected no periodic tasks to be created, but got {PeriodicTask.objects.all().count()}"
+        assert Schedule.objects.all().count() == 1, (
+            f"Expected no schedules to be created, but got {Schedule.objects.all().count()}"
         )
 
     def test_redirect_if_valid_form_data(self, client: Client, logged_in_user: User, valid_form_data: dict) -> None:
@@ -731,11 +713,28 @@ class TestCreateScrapeIntervalTaskView:
         logger.info("Sending a POST request to the view with invalid form data and expecting error")
         client.post(reverse("create_scrape_interval"), data=invalid_form_data)
 
-        logger.debug("Periodic tasks: %s", PeriodicTask.objects.all())
-        assert PeriodicTask.objects.all().count() == 0, (
-            f"Expected no periodic tasks to be created, but got {PeriodicTask.objects.all().count()}"
+        logger.debug("Schedules: %s", Schedule.objects.all())
+        assert Schedule.objects.all().count() == 0, (
+            f"Expected no schedules to be created, but got {Schedule.objects.all().count()}"
+        )
+
+    def test_schedule_created_and_selected_items_scheduled(self, client: Client, logged_in_user: User) -> None:
+        selected_item = ItemFactory(tenant=logged_in_user.tenant)
+        other_item = ItemFactory(tenant=logged_in_user.tenant)
+
+        client.post(
+            reverse("create_scrape_interval"),
+            data={"interval_value": 2, "period": "days", "selected_items": [selected_item.sku]},
         )
 
+        schedule = Schedule.objects.get(tenant=logged_in_user.tenant)
+        assert (schedule.interval_value, schedule.period) == (2, "days")
+        selected_item.refresh_from_db()
+        other_item.refresh_from_db()
+        assert selected_item.is_parser_active
+        assert timezone.now() < selected_item.next_run_at <= timezone.now() + timedelta(days=2)
+        assert other_item.next_run_at is None
+
     @pytest.mark.skip(reason="Skip until adjusted to the new interval behavior")
     def test_no_items_selected_does_not_create_task(self, client, logged_in_user, mocker):
         mocker.patch("django.contrib.messages.error")
@@ -744,8 +743,8 @@ class TestCreateScrapeIntervalTaskView:
             "selected_items": [],
         }
         client.post(reverse("create_scrape_interval"), data=no_items_selected)
-        assert PeriodicTask.objects.all().count() == 0, (
-            f"Expected no periodic tasks to be created, but got {PeriodicTask.objects.all().count()}"
+        assert Schedule.objects.all().count() == 0, (
+            f"Expected no schedules to be created, but got {Schedule.objects.all().count()}"
         )
 
     def test_interval_created(self):
@@ -779,9 +778,7 @@ class TestUpdateScrapeInterval:
 
     def test_update_scrape_interval_post_success(self):
         user = UserFactory()
-        PeriodicTaskFactory(
-            name=task_name(user),
-        )
+        ScheduleFactory(tenant=user.tenant)
         data = {"selected_items": ["1", "2"]}
         request = RequestFactory().post(reverse("update_scrape_interval"), data)
         request.user = user
@@ -794,7 +791,7 @@ class TestUpdateScrapeInterval:
     def test_invalid_form_invokes_error_message(self, mocker):
         message = mocker.patch("django.contrib.messages.error")
         user = UserFactory()
-        PeriodicTaskFactory(name=task_name(user))
+        ScheduleFactory(tenant=user.tenant)
         request = RequestFactory().post(reverse("update_scrape_interval"), {"invalid_key": "invalid_value"})
         request.user = user
 
@@ -804,6 +801,52 @@ class TestUpdateScrapeInterval:
         )
         assert response.status_code == 302
 
+    def test_shorter_interval_reschedules_items(self):
+        user = UserFactory()
+        schedule = ScheduleFactory(tenant=user.tenant, interval_value=5, period="days")
+        item = ItemFactory(tenant=user.tenant, is_parser_active=True, next_run_at=timezone.now() + timedelta(days=5))
+        data = {"interval_value": 1, "period": "days", "selected_items": [item.sku]}
+        request = RequestFactory().post(reverse("update_scrape_interval"), data)
+        request.user = user
+
+        update_scrape_interval(request)
+
+        schedule.refresh_from_db()
+        item.refresh_from_db()
+        assert schedule.interval_value == 1
+        assert item.next_run_at <= timezone.now() + timedelta(days=1)
+
+    def test_run_lock_taken_during_update_kept(self, mocker):
+        user = UserFactory()
+        ScheduleFactory(tenant=user.tenant)
+        item = ItemFactory(tenant=user.tenant)
+        # the scheduler locks the tenant after the view has loaded its schedule
+        mocker.patch(
+            "utils.task_utils.check_plan_schedule_limitations",
+            side_effect=lambda *args: run_locks.acquire_run_lock(user.tenant_id, "run-token"),
+        )
+        request = RequestFactory().post(reverse("update_scrape_interval"), {"selected_items": [item.sku]})
+        request.user = user
+
+        update_scrape_interval(request)
+
+        assert Schedule.objects.get(tenant=user.tenant).lock_token == "run-token"
+
+    def test_current_interval_kept_when_not_posted(self):
+        user = UserFactory()
+        schedule = ScheduleFactory(tenant=user.tenant, interval_value=3, period="days")
+        item = ItemFactory(tenant=user.tenant)
+        request = RequestFactory().post(reverse("update_scrape_interval"), {"selected_items": [item.sku]})
+        request.user = user
+
+        update_scrape_interval(request)
+
+        schedule.refresh_from_db()
+        item.refresh_from_db()
+        assert (schedule.interval_value, schedule.period) == (3, "days")
+        assert item.is_parser_active
+        assert item.next_run_at is not None
+
     def test_update_scrape_interval_no_task_found(self):
         user = UserFactory()
         request = RequestFactory().post(reverse("update_scrape_interval"), {})
@@ -871,9 +914,130 @@ class TestDestroyScrapeIntervalTaskView:
         )
         logger.debug("Interval task was successfully deleted (%s)", task_info)
 
+    def test_schedule_deleted_and_items_unscheduled(self, client: Client, post_request_with_user: WSGIRequest) -> None:
+        tenant = post_request_with_user.user.tenant
+        ScheduleFactory(tenant=tenant)
+        item = ItemFactory(tenant=tenant, is_parser_active=True, next_run_at=timezone.now())
+
+        client.post(reverse("destroy_scrape_interval"))
+
+        item.refresh_from_db()
+        assert not Schedule.objects.filter(tenant=tenant).exists()
+        assert not item.is_parser_active
+        assert item.next_run_at is None
+
     def test_redirect_when_deleting_non_existing_task(
         self, client: Client, post_request_with_user: WSGIRequest
     ) -> None:
         # pylint: disable=unused-argument
         response = client.post(reverse("destroy_scrape_interval"))
         assert response.status_code == 302
+
+
+class TestSchedulerCapacity:
+    def test_superuser_sees_capacity(self, client: Client) -> None:
+        superuser = UserFactory(is_superuser=True)
+        client.force_login(superuser)
+
+        response = client.get(reverse("scheduler_capacity"))
+
+        assert response.status_code == 200
+        assert "capacity" in response.context
+
+    def test_regular_user_redirected(self, client: Client) -> None:
+        client.force_login(UserFactory())
+
+        response = client.get(reverse("scheduler_capacity"))
+
+        assert response.status_code == 302
+
+
+class TestScrapeJobProgress:
+    @pytest.fixture
+    def user(self) -> User:
+        return UserFactory()
+
+    @pytest.fixture
+    def logged_in_client(self, client: Client, user: User) -> Client:
+        client.force_login(user)
+        return client
+
+    def test_scrape_items_queues_job(self, user: User, mocker) -> None:
+        start_scrape_job = mocker.patch("utils.task_utils.start_scrape_job")
+        request = RequestFactory().post(reverse("scrape_item", kwargs={"skus": "12345"}), {"skus": "12345, 67890"})
+        request.user = user
+
+        response = scrape_items(request, "12345, 67890")
+
+        assert response.status_code == 302
+        start_scrape_job.assert_called_once_with(
+            user.tenant, ["12345", "67890"], kind=ScrapeJob.Kind.SCRAPE, reserved_skus=2, reserved_parse_units=2
+        )
+
+    def test_running_job_renders_progress(self, logged_in_client: Client, user: User) -> None:
+        job = ScrapeJob.objects.create(
+            tenant=user.tenant,
+            status=ScrapeJob.Status.RUNNING,
+            skus=["12345", "67890"],
+            total=2,
+            processed=1,
+            items_data=[{"sku": "12345", "name": "Test Item 1", "price": 100, "is_in_stock": True}],
+        )
+
+        response = logged_in_client.get(reverse("scrape_job_progress", kwargs={"job_id": job.id}))
+
+        assert response.status_code == 200
+        assert "main/partials/scrape_job_progress.html" in [t.name for t in response.templates]
+        assert "Test Item 1" in response.content.decode()
+        job.refresh_from_db()
+        assert not job.is_reported
+
+    def test_finished_job_shows_messages_once(self, logged_in_client: Client, user: User, mocker) -> None:
+        success_message = mocker.patch("utils.notifications.show_successful_scrape_message")
+        invalid_skus_message = mocker.patch("utils.notifications.show_invalid_skus_message")
+        job = ScrapeJob.objects.create(
+            tenant=user.tenant,
+            status=ScrapeJob.Status.COMPLETED,
+            skus=["12345", "99999"],
+            total=2,
+            processed=2,
+            items_data=[{"sku": "12345", "name": "Test Item 1"}],
+            invalid_skus=["99999"],
+        )
+        url = reverse("scrape_job_progress", kwargs={"job_id": job.id})
+
+        response = logged_in_client.get(url, HTTP_HX_REQUEST="true")
+        assert response.status_code == 200
+        assert response["HX-Redirect"] == reverse("item_list")
+        logged_in_client.get(url, HTTP_HX_REQUEST="true")
+
+        job.refresh_from_db()
+        assert job.is_reported
+        assert success_message.call_count == 1
+        assert invalid_skus_message.call_count == 1
+
+    def test_job_of_another_tenant_not_found(self, logged_in_client: Client) -> None:
+        job = ScrapeJob.objects.create(tenant=UserFactory().tenant, skus=["12345"], total=1)
+
+        response = logged_in_client.get(reverse("scrape_job_progress", kwargs={"job_id": job.id}))
+
+        assert response.status_code == 404
+
+
+class TestSwitchPlan:
+    @pytest.fixture
+    def user(self) -> User:
+        return UserFactory()
+
+    def test_balance_topped_up_by_another_process_not_overwritten(self, client: Client, user: User) -> None:
+        plan = PaymentPlanFactory()
+        client.force_login(user)
+        client.get(reverse("item_list"))  # caches the tenant context with the old balance
+        # a payment processed by another process, its invalidation of the cached context doesn't reach this one
+        Tenant.objects.filter(id=user.tenant_id).update(balance=plan.price)
+
+        client.post(reverse("switch_plan"), {"plan": plan.name})
+
+        tenant = Tenant.objects.get(id=user.tenant_id)
+        assert tenant.payment_plan == plan
+        assert tenant.balance == plan.price
@@ -0,0 +1,146 @@
+import time
+
+import httpx
+import pytest
+from django.core import mail
+from django.core.mail import EmailMessage
+
+from http_stub import HTTPStub
+from notifier.dispatch import (
+    Channel,
+    Dispatcher,
+    EmailChannel,
+    Notification,
+    TelegramChannel,
+    WebhookChannel,
+    get_dispatcher,
+)
+
+
+def make_notification(channel: str, tenant_id: int = 1, target: str = "") -> Notification:
+    notification = Notification(tenant_id, channel, "Цена товаров (1) изменилась", "Text", [1], target=target)
+    if channel == EmailChannel.name:
+        notification.message = EmailMessage(notification.subject, notification.text, to=["user@example.com"])
+    return notification
+
+
+def make_dispatcher(stub: HTTPStub, **channel_options) -> Dispatcher:
+    options = {"retry_backoff": 0, **channel_options}
+    channels = [
+        EmailChannel(**options),
+        WebhookChannel(**options),
+        TelegramChannel("token", "https://telegram.test", **options),
+    ]
+    return Dispatcher(channels, transport=stub.transport)
+
+
+class TestDispatcher:
+    def test_notifications_sent_through_their_channels(self) -> None:
+        stub = HTTPStub()
+        notifications = [
+            make_notification("email"),
+            make_notification("webhook", target="https://example.com/hook"),
+            make_notification("telegram", target="42"),
+        ]
+
+        result = make_dispatcher(stub).dispatch(notifications)
+
+        assert result.delivered == {"email": 1, "webhook": 1, "telegram": 1}
+        assert not result.dead_letters
+        assert len(mail.outbox) == 1
+        assert stub.webhook_payloads == [notifications[1].to_payload()]
+        assert stub.telegram_messages == [{"chat_id": "42", "text": "Цена товаров (1) изменилась\n\nText"}]
+
+    def test_failed_notification_retried(self) -> None:
+        stub = HTTPStub(failures=2)
+
+        result = make_dispatcher(stub, max_attempts=3).dispatch([make_notification("webhook", target="https://a.b")])
+
+        assert result.delivered == {"webhook": 1}
+        assert len(stub.webhook_payloads) == 1
+
+    def test_notification_dead_lettered_after_last_attempt(self) -> None:
+        stub = HTTPStub(failures=3)
+        notification = make_notification("webhook", target="https://a.b")
+
+        result = make_dispatcher(stub, max_attempts=3).dispatch([notification])
+
+        [(dead_letter, error)] = result.dead_letters
+        assert not result.delivered
+        assert dead_letter is notification
+        assert dead_letter.attempts == 3
+        assert "500" in error
+
+    def test_only_unsent_emails_retried(self, mocker) -> None:
+        send_messages = mocker.patch(
+            "django.core.mail.backends.locmem.EmailBackend.send_messages", side_effect=[1, ConnectionError, 1]
+        )
+
+        result = make_dispatcher(HTTPStub(), max_attempts=2).dispatch([make_notification("email") for _ in range(2)])
+
+        assert result.delivered == {"email": 2}
+        assert send_messages.call_count == 3
+
+    def test_telegram_rejection_dead_lettered(self) -> None:
+        transport = httpx.MockTransport(lambda request: httpx.Response(200, json={"ok": False}))
+        dispatcher = Dispatcher([TelegramChannel("token", max_attempts=1)], transport=transport)
+
+        result = dispatcher.dispatch([make_notification("telegram", target="42")])
+
+        assert "rejected" in result.dead_letters[0][1]
+
+    def test_unknown_channel_dead_lettered(self) -> None:
+        result = Dispatcher([EmailChannel()]).dispatch([make_notification("webhook", target="https://a.b")])
+
+        assert result.dead_letters[0][1] == "Channel webhook is not configured"
+
+    @pytest.mark.parametrize("concurrency", [1, 3])
+    def test_concurrency_limited(self, concurrency: int) -> None:
+        stub = HTTPStub(latency=0.02)
+        notifications = [make_notification("webhook", target=f"https://a.b/{i}") for i in range(10)]
+
+        result = make_dispatcher(stub, concurrency=concurrency).dispatch(notifications)
+
+        assert result.delivered == {"webhook": 10}
+        assert stub.max_in_flight == concurrency
+
+    def test_bounded_queue_drained_with_retries(self) -> None:
+        stub = HTTPStub(failures=5)
+        notifications = [make_notification("webhook", target=f"https://a.b/{i}") for i in range(20)]
+
+        result = make_dispatcher(stub, queue_size=1, concurrency=1).dispatch(notifications)
+
+        assert result.delivered == {"webhook": 20}
+
+    def test_slow_channel_does_not_hold_up_others(self) -> None:
+        stub = HTTPStub(latency_by_host={"telegram.test": 0.1})
+        notifications = [make_notification("telegram", target="42") for _ in range(5)]
+        notifications += [make_notification("webhook", target="https://a.b") for _ in range(5)]
+
+        started = time.monotonic()
+        make_dispatcher(stub, concurrency=1).dispatch(notifications)
+
+        webhooks_done = max(answered for answered, request in stub.requests if request.url.host == "a.b")
+        assert webhooks_done - started < 0.1
+        assert time.monotonic() - started >= 0.5
+
+
+def test_telegram_enabled_by_bot_token(settings) -> None:
+    settings.TELEGRAM_BOT_TOKEN = ""
+    assert set(get_dispatcher().channels) == {"email", "webhook"}
+
+    settings.TELEGRAM_BOT_TOKEN = "token"
+    assert set(get_dispatcher().channels) == {"email", "webhook", "telegram"}
+
+
+def test_channel_requires_name_and_deliver_one() -> None:
+    class UnnamedChannel(Channel):
+        async def deliver_one(self, notification, client) -> None:
+            pass
+
+    class IncompleteChannel(Channel):
+        name = "incomplete"
+
+    for channel_class in (Channel, UnnamedChannel, IncompleteChannel):
+        with pytest.raises(TypeError):
+            channel_class()
@@ -0,0 +1,77 @@
+import os
+import time
+
+import pytest
+from django.core.mail import EmailMessage
+
+from notifier.email import send_in_batches
+
+
+def make_messages(count: int) -> list[EmailMessage]:
+    return [EmailMessage(f"Subject {i}", "Body", "info@mpmonitor.ru", [f"user{i}@example.com"]) for i in range(count)]
+
+
+class TestSendInBatches:
+    def test_messages_share_connection(self, smtp_server) -> None:
+        sent = send_in_batches(make_messages(5), messages_per_connection=10)
+
+        assert sent == [True] * 5
+        assert smtp_server.connections == 1
+        assert len(smtp_server.messages) == 5
+
+    @pytest.mark.parametrize("count, messages_per_connection, connections", [(10, 5, 2), (11, 5, 3), (1, 5, 1)])
+    def test_messages_per_connection_bounded(
+        self, smtp_server, count: int, messages_per_connection: int, connections: int
+    ) -> None:
+        send_in_batches(make_messages(count), messages_per_connection=messages_per_connection)
+
+        assert smtp_server.connections == connections
+        assert len(smtp_server.messages) == count
+
+    def test_no_messages_no_connection(self, smtp_server) -> None:
+        assert send_in_batches([]) == []
+        assert smtp_server.connections == 0
+
+    def test_failed_batch_does_not_stop_others(self, smtp_server, mocker) -> None:
+        send_messages = mocker.patch(
+            "django.core.mail.backends.smtp.EmailBackend.send_messages", side_effect=[ConnectionError, 1, 1]
+        )
+
+        sent = send_in_batches(make_messages(4), messages_per_connection=2)
+
+        assert sent == [False, False, True, True]
+        assert send_messages.call_count == 3
+
+    def test_messages_sent_before_failure_reported_as_sent(self, smtp_server, mocker) -> None:
+        mocker.patch("django.core.mail.backends.smtp.EmailBackend.send_messages", side_effect=[1, ConnectionError, 1])
+
+        sent = send_in_batches(make_messages(3), messages_per_connection=3)
+
+        assert sent == [True, False, False]
+
+
+@pytest.mark.benchmark
+@pytest.mark.skipif(not os.environ.get("RUN_BENCHMARKS"), reason="Set RUN_BENCHMARKS=1 to run benchmarks")
+def test_benchmark_send_500_emails(smtp_server) -> None:
+    """Compares the throughput of shared connections with one connection per email."""
+    messages = make_messages(500)
+    # a new connection to a remote server takes several round trips (TCP, TLS, login), every command takes one
+    smtp_server.connect_latency = 0.02
+    smtp_server.latency = 0.001
+
+    started = time.perf_counter()
+    for msg in messages:
+        msg.send()
+    one_per_email = time.perf_counter() - started
+
+    started = time.perf_counter()
+    sent = send_in_batches(messages, messages_per_connection=50)
+    shared = time.perf_counter() - started
+
+    print(
+        f"\n{len(messages)} emails: {len(messages) / one_per_email:.0f}/s with one connection per email, "
+        f"{len(messages) / shared:.0f}/s with 50 emails per connection"
+    )
+    assert all(sent)
+    assert smtp_server.connections == len(messages) + len(messages) // 50
+    assert shared < one_per_email
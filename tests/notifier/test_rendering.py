@@ -0,0 +1,125 @@
+from decimal import Decimal
+
+import pytest
+from django.template.backends.django import Template
+
+from accounts.models import Tenant
+from factories import ItemFactory, UserFactory
+from main.models import Item
+from notifier.rendering import build_price_change_email, render_item_rows, render_price_change_email
+
+
+def make_item(name: str = "Item", price: int = 90, previous_price: int = 100) -> Item:
+    item = ItemFactory(name=name, price=Decimal(price))
+    item.previous_price_value = Decimal(previous_price)
+    item.price_change_percent = round((price - previous_price) / previous_price * 100, 2)
+    return item
+
+
+class TestRenderItemRows:
+    @pytest.mark.parametrize("fmt", ["txt", "html"])
+    def test_row_rendered_once_per_item_and_price(self, fmt: str, mocker) -> None:
+        item = make_item()
+        render_item_rows([item], fmt)
+        render = mocker.spy(Template, "render")
+
+        rows = render_item_rows([item], fmt)
+
+        assert render.call_count == 0
+        assert "Item" in rows[0]
+
+    def test_new_price_rendered_again(self) -> None:
+        item = make_item(price=90)
+        render_item_rows([item], "txt")
+
+        item.price, item.price_change_percent = Decimal(80), -20.0
+
+        assert "80" in render_item_rows([item], "txt")[0]
+
+    def test_new_previous_price_rendered_again(self) -> None:
+        item = make_item(price=90, previous_price=100)
+        render_item_rows([item], "txt")
+
+        item.previous_price_value = Decimal(80)
+
+        assert "80" in render_item_rows([item], "txt")[0]
+
+    def test_rows_in_order_of_items(self) -> None:
+        items = [make_item(name=f"Item {i}") for i in range(3)]
+        render_item_rows(items[1:2], "txt")
+
+        rows = render_item_rows(items, "txt")
+
+        assert [f"Item {i}" in row for i, row in enumerate(rows)] == [True, True, True]
+
+
+class TestRenderPriceChangeEmail:
+    def test_rows_assembled_into_email(self) -> None:
+        items = [make_item(name="First"), make_item(name="Second")]
+
+        text_content, html_content = render_price_change_email("Ivan", items)
+
+        assert "Здравствуйте, Ivan!" in text_content
+        assert text_content.index("First") < text_content.index("Second")
+        assert html_content.count("<tr>") == 3  # the header and the items
+
+    def test_item_names_escaped_once(self) -> None:
+        item = make_item(name="Tom & Jerry")
+        render_price_change_email("Ivan", [item])
+
+        _, html_content = render_price_change_email("Ivan", [item])
+
+        assert "Tom &amp; Jerry" in html_content
+
+
+class TestBuildPriceChangeEmail:
+    @pytest.fixture
+    def tenant(self) -> Tenant:
+        user = UserFactory()
+        return user.tenant
+
+    @pytest.fixture
+    def items(self, tenant: Tenant) -> list:
+        return [
+            ItemFactory(tenant=tenant, is_notifier_active=True),
+            ItemFactory(tenant=tenant, is_notifier_active=False),
+        ]
+
+    @pytest.fixture
+    def item_ids(self, items: list) -> list[int]:
+        return [item.id for item in items]
+
+    def test_email_recipient_and_subject(self, tenant: Tenant, item_ids: list) -> None:
+        msg = build_price_change_email(tenant.id, item_ids)
+
+        assert msg.to == [tenant.users.first().email]
+        assert msg.subject == "Цена товаров (2) изменилась"
+
+    def test_email_body(self, tenant: Tenant, items: list, item_ids: list) -> None:
+        msg = build_price_change_email(tenant.id, item_ids)
+
+        assert all(item.name in msg.body for item in items)
+
+    def test_email_alternative_is_attached(self, tenant: Tenant, item_ids: list) -> None:
+        msg = build_price_change_email(tenant.id, item_ids)
+
+        assert msg.alternatives[0][1] == "text/html"
+
+    def test_no_items(self, tenant: Tenant) -> None:
+        assert build_price_change_email(tenant.id, []) is None
+
+    def test_previous_prices_loaded_with_items(
+        self, tenant: Tenant, items: list, item_ids: list, django_assert_num_queries
+    ) -> None:
+        item = items[0]
+        previous_price = item.price
+        item.price = previous_price // 2
+        item.save()
+
+        with django_assert_num_queries(2):
+            msg = build_price_change_email(tenant.id, item_ids)
+
+        assert f"{previous_price} → {item.price} (-50,0%)" in msg.body
+
+    def test_items_of_other_tenants_not_sent(self, tenant: Tenant) -> None:
+        assert build_price_change_email(tenant.id, [ItemFactory().id]) is None
@@ -0,0 +1,83 @@
+"""
+Local SMTP server for tests and benchmarks of the code that sends emails over real SMTP connections.
+
+Speaks just enough SMTP for smtplib (no TLS, no auth) and records the connections and the messages it receives.
+Responses can be delayed to mimic a remote server: `connect_latency` stands for the TCP and TLS handshakes
+and the login of a new connection, `latency` for the round trip of every command.
+"""
+
+import socketserver
+import threading
+import time
+
+
+class _SMTPHandler(socketserver.StreamRequestHandler):
+    server: "LocalSMTPServer"
+
+    def reply(self, line: str) -> None:
+        if self.server.latency:
+            time.sleep(self.server.latency)
+        self.wfile.write(f"{line}\r\n".encode())
+
+    def handle(self) -> None:
+        with self.server.lock:
+            self.server.connections += 1
+        time.sleep(self.server.connect_latency)
+        self.reply("220 localhost SMTP")
+        data = None
+        while line := self.rfile.readline():
+            if data is not None:
+                if line.rstrip(b"\r\n") == b".":
+                    with self.server.lock:
+                        self.server.messages.append(b"".join(data))
+                    data = None
+                    self.reply("250 OK")
+                else:
+                    data.append(line[1:] if line.startswith(b"..") else line)
+                continue
+
+            command = line.split(b" ", 1)[0].strip().upper()
+            if command == b"EHLO":
+                self.reply("250 localhost")
+            elif command == b"DATA":
+                data = []
+                self.reply("354 End data with <CR><LF>.<CR><LF>")
+            elif command == b"QUIT":
+                self.reply("221 Bye")
+                return
+            else:  # HELO, MAIL, RCPT, RSET, NOOP
+                self.reply("250 OK")
+
+
+class LocalSMTPServer(socketserver.ThreadingTCPServer):
+    """Listens on a free localhost port in a background thread while used as a context manager.
+
+    Usage:
+        with LocalSMTPServer() as server:
+            settings.EMAIL_PORT = server.port
+            ...
+        assert server.connections == 1
+    """
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, latency: float = 0.0, connect_latency: float = 0.0) -> None:
+        super().__init__(("127.0.0.1", 0), _SMTPHandler)
+        self.latency = latency
+        self.connect_latency = connect_latency
+        self.lock = threading.Lock()
+        self.connections = 0
+        self.messages: list[bytes] = []
+
+    @property
+    def port(self) -> int:
+        return self.server_address[1]
+
+    def __enter__(self) -> "LocalSMTPServer":
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.shutdown()
+        self.server_close()
@@ -0,0 +1,98 @@
+from datetime import timedelta
+
+import pytest
+from django.utils import timezone
+
+from accounts.models import PaymentPlan
+from factories import ItemFactory, PaymentPlanFactory, ScheduleFactory
+from main.models import Price, Schedule
+from utils import adaptive_polling
+
+
+def create_price_history(item, values: list[int]) -> None:
+    for value in values:
+        Price.objects.create(item=item, value=value)
+
+
+class TestGetChangeRates:
+    def test_share_of_scrapes_with_price_change(self) -> None:
+        item = ItemFactory(price=100)
+        create_price_history(item, [100, 120, 130])
+
+        assert adaptive_polling.get_change_rates([item.id]) == {item.id: pytest.approx(2 / 3)}
+
+    def test_item_without_history_left_out(self) -> None:
+        item = ItemFactory(price=100)
+
+        assert adaptive_polling.get_change_rates([item.id]) == {}
+
+    def test_prices_outside_window_ignored(self) -> None:
+        item = ItemFactory(price=100)
+        create_price_history(item, [200, 100])
+        Price.objects.filter(item=item).exclude(value=200).update(created_at=timezone.now() - timedelta(days=30))
+
+        assert adaptive_polling.get_change_rates([item.id]) == {}
+
+
+class TestGetAdaptiveInterval:
+    base = timedelta(hours=4)
+
+    @pytest.mark.parametrize(
+        "change_rate, expected",
+        [
+            (None, timedelta(hours=4)),
+            (0.5, timedelta(hours=4)),
+            (1.0, timedelta(hours=1)),
+            (0.0, timedelta(hours=16)),
+        ],
+    )
+    def test_interval_scaled_by_change_rate(self, change_rate: float | None, expected: timedelta) -> None:
+        interval = adaptive_polling.get_adaptive_interval(self.base, change_rate, timedelta(0), timedelta(days=30))
+        assert interval == expected
+
+    def test_interval_within_bounds(self) -> None:
+        min_interval, max_interval = timedelta(hours=3), timedelta(hours=6)
+
+        assert adaptive_polling.get_adaptive_interval(self.base, 1.0, min_interval, max_interval) == min_interval
+        assert adaptive_polling.get_adaptive_interval(self.base, 0.0, min_interval, max_interval) == max_interval
+
+
+class TestGetAdaptiveNextRunAts:
+    @pytest.fixture
+    def pro_schedule(self) -> Schedule:
+        schedule = ScheduleFactory(interval_value=4, period="hours")
+        schedule.tenant.payment_plan = PaymentPlanFactory(name=PaymentPlan.PlanName.PRO)
+        schedule.tenant.save()
+        return schedule
+
+    def test_volatile_item_polled_sooner_than_stable_one(self, pro_schedule: Schedule) -> None:
+        volatile = ItemFactory(tenant=pro_schedule.tenant, price=100)
+        create_price_history(volatile, [110, 120, 130])
+        stable = ItemFactory(tenant=pro_schedule.tenant, price=100)
+        create_price_history(stable, [100, 100, 100])
+        now = timezone.now()
+
+        next_run_ats = adaptive_polling.get_adaptive_next_run_ats(pro_schedule, [volatile.id, stable.id], now)
+
+        assert next_run_ats[volatile.id] < now + pro_schedule.run_every < next_run_ats[stable.id]
+
+    def test_not_polled_more_than_fixed_schedule(self, pro_schedule: Schedule) -> None:
+        items = ItemFactory.create_batch(3, tenant=pro_schedule.tenant, price=100)
+        for item in items:
+            create_price_history(item, [110, 120, 130])
+        now = timezone.now()
+
+        next_run_ats = adaptive_polling.get_adaptive_next_run_ats(pro_schedule, [item.id for item in items], now)
+
+        polls = sum(pro_schedule.run_every / (next_run_at - now) for next_run_at in next_run_ats.values())
+        assert polls <= len(items) + 1e-9
+
+    def test_plan_minimum_interval_respected(self) -> None:
+        schedule = ScheduleFactory(interval_value=24, period="hours")  # FREE plan, minimum is 24 hours
+        item = ItemFactory(tenant=schedule.tenant, price=100)
+        create_price_history(item, [110, 120, 130])
+        now = timezone.now()
+
+        next_run_ats = adaptive_polling.get_adaptive_next_run_ats(schedule, [item.id], now)
+
+        assert next_run_ats[item.id] == now + timedelta(hours=24)
@@ -0,0 +1,80 @@
+import pytest
+
+from accounts.models import PaymentPlan, Tenant, TenantQuotaCounter
+from factories import TenantFactory, TenantQuotaFactory
+from main.exceptions import QuotaExceededException
+from utils import billing
+
+
+class TestQuotaCounter:
+    @pytest.fixture
+    def tenant(self) -> Tenant:
+        tenant = TenantFactory()
+        # the default quota is assigned on creation (accounts.signals.assign_default_plan_quota)
+        tenant.quota = TenantQuotaFactory(skus_limit=5, parse_units_limit=10)
+        tenant.save()
+        return tenant
+
+    def _get_counter(self, tenant: Tenant) -> TenantQuotaCounter:
+        return TenantQuotaCounter.objects.get(tenant=tenant)
+
+    def test_counter_created_from_quota_limits(self, tenant: Tenant) -> None:
+        counter = billing.get_quota_counter(tenant)
+
+        assert counter.skus_remaining == 5
+        assert counter.parse_units_remaining == 10
+
+    def test_tenants_sharing_quota_are_charged_separately(self, tenant: Tenant) -> None:
+        other_tenant = TenantFactory()
+        other_tenant.quota = tenant.quota
+        other_tenant.save()
+
+        billing.reserve_quota(tenant, skus=5, parse_units=10)
+
+        assert billing.get_quota_counter(other_tenant).skus_remaining == 5
+        tenant.quota.refresh_from_db()
+        assert tenant.quota.skus_limit == 5
+
+    def test_reservations_are_not_lost(self, tenant: Tenant) -> None:
+        # both reservations are applied in the database, not to a value read before them
+        billing.get_quota_counter(tenant)
+        billing.reserve_quota(tenant, skus=2, parse_units=3)
+        billing.reserve_quota(tenant, skus=2, parse_units=3)
+
+        counter = self._get_counter(tenant)
+        assert counter.skus_remaining == 1
+        assert counter.parse_units_remaining == 4
+
+    @pytest.mark.parametrize(
+        "skus, parse_units, quota_type",
+        [(6, 1, "max_allowed_skus"), (1, 11, "allowed_parse_units")],
+        ids=["skus", "parse_units"],
+    )
+    def test_exceeded_reservation_charges_nothing(
+        self, tenant: Tenant, skus: int, parse_units: int, quota_type: str
+    ) -> None:
+        with pytest.raises(QuotaExceededException) as exc_info:
+            billing.reserve_quota(tenant, skus=skus, parse_units=parse_units)
+
+        assert exc_info.value.quota_type == quota_type
+        counter = self._get_counter(tenant)
+        assert counter.skus_remaining == 5
+        assert counter.parse_units_remaining == 10
+
+    def test_commit_refunds_unused_reservation(self, tenant: Tenant) -> None:
+        billing.reserve_quota(tenant, skus=4, parse_units=4)
+
+        billing.commit_quota(tenant.id, reserved_skus=4, used_skus=1, reserved_parse_units=4, used_parse_units=1)
+
+        counter = self._get_counter(tenant)
+        assert counter.skus_remaining == 4
+        assert counter.parse_units_remaining == 9
+
+    def test_counter_reset_on_plan_switch(self, tenant: Tenant) -> None:
+        billing.reserve_quota(tenant, skus=5)
+        PaymentPlan.objects.create(name=PaymentPlan.PlanName.BUSINESS)
+
+        tenant.switch_plan(PaymentPlan.PlanName.BUSINESS)
+
+        counter = billing.get_quota_counter(tenant)
+        assert counter.skus_remaining == tenant.quota.skus_limit
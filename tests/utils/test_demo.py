@@ -0,0 +1,121 @@
+import logging
+import os
+import time
+from datetime import timedelta
+
+import pytest
+from django.contrib.auth import get_user_model
+from django.utils import timezone
+
+import config
+from factories import ItemFactory, ScheduleFactory, UserFactory
+from main.models import Item, Schedule
+from utils import demo
+
+logger = logging.getLogger(__name__)
+User = get_user_model()
+
+
+def expire(*users: User) -> None:
+    expired_at = timezone.now() - timedelta(hours=config.DEMO_USER_HOURS_ALLOWED + 1)
+    User.objects.filter(id__in=[user.id for user in users]).update(created_at=expired_at)
+
+
+@pytest.mark.demo_user
+class TestDeactivateExpiredDemoUsers:
+    def test_only_expired_demo_users_deactivated(self) -> None:
+        expired = UserFactory(is_demo_user=True, is_demo_active=True)
+        active = UserFactory(is_demo_user=True, is_demo_active=True)
+        regular = UserFactory()
+        expire(expired, regular)
+
+        assert demo.deactivate_expired_demo_users() == 1
+
+        assert not User.objects.get(id=expired.id).is_active
+        assert User.objects.get(id=active.id).is_active
+        assert User.objects.get(id=regular.id).is_active
+
+    def test_schedules_and_items_of_expired_users_deleted(self) -> None:
+        expired = UserFactory(is_demo_user=True, is_demo_active=True)
+        active = UserFactory(is_demo_user=True, is_demo_active=True)
+        expire(expired)
+        for demo_user in (expired, active):
+            ScheduleFactory(tenant=demo_user.tenant)
+            ItemFactory(tenant=demo_user.tenant)
+
+        demo.deactivate_expired_demo_users()
+
+        assert list(Schedule.objects.values_list("tenant_id", flat=True)) == [active.tenant_id]
+        assert list(Item.objects.values_list("tenant_id", flat=True)) == [active.tenant_id]
+
+    def test_users_processed_in_chunks(self, django_assert_max_num_queries) -> None:
+        users = [UserFactory(is_demo_user=True, is_demo_active=True) for _ in range(3)]
+        expire(*users)
+
+        with django_assert_max_num_queries(30):
+            assert demo.deactivate_expired_demo_users(chunk_size=2) == 3
+
+        assert not User.objects.filter(is_active=True, is_demo_user=True).exists()
+
+
+@pytest.mark.demo_user
+class TestDemoPool:
+    def test_refill_tops_up_pool(self) -> None:
+        demo.provision_demo_user(is_demo_active=False)
+
+        assert demo.refill_demo_pool(size=3) == 2
+        assert demo.get_demo_pool().count() == 3
+        assert demo.refill_demo_pool(size=3) == 0
+
+    def test_pool_users_are_provisioned_with_items(self) -> None:
+        demo.refill_demo_pool(size=1)
+
+        pool_user = demo.get_demo_pool().get()
+        assert Item.objects.filter(tenant=pool_user.tenant).count() == 2
+        assert pool_user.tenant.quota.total_hours_allowed == config.DEMO_USER_HOURS_ALLOWED
+
+    def test_claimed_user_leaves_pool_and_demo_starts(self) -> None:
+        pool_user = demo.provision_demo_user(is_demo_active=False)
+        User.objects.filter(id=pool_user.id).update(created_at=timezone.now() - timedelta(days=30))
+
+        claimed = demo.claim_demo_user()
+
+        assert claimed == pool_user
+        assert claimed.is_active_demo_user
+        assert not demo.get_demo_pool().exists()
+
+    def test_claim_from_empty_pool(self) -> None:
+        assert demo.claim_demo_user() is None
+
+    def test_pool_users_not_deactivated_as_expired(self) -> None:
+        pool_user = demo.provision_demo_user(is_demo_active=False)
+        expire(pool_user)
+
+        assert demo.deactivate_expired_demo_users() == 0
+
+
+@pytest.mark.benchmark
+@pytest.mark.skipif(not os.environ.get("RUN_BENCHMARKS"), reason="Set RUN_BENCHMARKS=1 to run benchmarks")
+def test_benchmark_deactivate_100k_expired_demo_users(django_assert_max_num_queries) -> None:
+    users_count = 100_000
+    expired_at = timezone.now() - timedelta(hours=config.DEMO_USER_HOURS_ALLOWED + 1)
+    User.objects.bulk_create(
+        [
+            User(username=f"demo-{i}", email=f"demo-{i}@demo.com", is_demo_user=True, is_demo_active=True)
+            for i in range(users_count)
+        ],
+        batch_size=5000,
+    )
+    for _ in range(100):
+        ScheduleFactory(tenant=UserFactory(is_demo_user=True, is_demo_active=True).tenant)
+    User.objects.filter(is_demo_user=True).update(created_at=expired_at)
+
+    chunks = users_count // config.DEMO_USERS_CLEANUP_CHUNK_SIZE + 1
+    started = time.perf_counter()
+    with django_assert_max_num_queries(chunks * 10):
+        deactivated = demo.deactivate_expired_demo_users()
+    elapsed = time.perf_counter() - started
+
+    logger.info("Deactivated %s expired demo users in %.2fs", deactivated, elapsed)
+    assert deactivated == users_count + 100
+    assert not Schedule.objects.exists()
@@ -1,9 +1,12 @@
 import logging
+import os
+import time
 
 import pytest
 
 from accounts.models import Tenant
 from factories import ItemFactory, UserFactory
+from main.models import Item, Price
 from utils import items
 
 logger = logging.getLogger(__name__)
@@ -21,7 +24,8 @@ class TestGetItemsWithPriceChangesOverThreshold:
         logger.info("Setting tenant's threshold to 0.1...")
         tenant.price_change_threshold = 0.1
 
-        item = ItemFactory(tenant=tenant)
+        # fixed price: with the factory's price sequence, 10000 -> 9990 would be exactly at the threshold
+        item = ItemFactory(tenant=tenant, price=1000)
         item.is_notifier_active = True
 
         logger.info("Creating item_data...")
@@ -57,3 +61,121 @@ class TestGetItemsWithPriceChangesOverThreshold:
         items_with_price_change = items.get_items_with_price_changes_over_threshold(tenant, [item_data])
         logger.info("Checking that the item is not in the list...")
         assert len(items_with_price_change) == 0
+
+    def test_only_changes_over_threshold_returned(self, tenant: Tenant, django_assert_num_queries) -> None:
+        tenant.price_change_threshold = 10
+        changed_item = ItemFactory(tenant=tenant, price=100)
+        slightly_changed_item = ItemFactory(tenant=tenant, price=100)
+        new_item = ItemFactory(tenant=tenant, price=100)
+        Price.objects.create(item=changed_item, value=120)
+        Price.objects.create(item=slightly_changed_item, value=105)
+        items_data = [{"sku": item.sku} for item in (changed_item, slightly_changed_item, new_item)]
+
+        with django_assert_num_queries(2):
+            items_with_price_change = items.get_items_with_price_changes_over_threshold(tenant, items_data)
+
+        assert items_with_price_change == [changed_item.id]
+
+    def test_items_without_previous_price_value_skipped(self, tenant: Tenant) -> None:
+        item = ItemFactory(tenant=tenant, price=0)
+        Price.objects.create(item=item, value=100)
+
+        assert items.get_items_with_price_changes_over_threshold(tenant, [{"sku": item.sku}]) == []
+
+    def test_items_of_other_tenants_skipped(self, tenant: Tenant) -> None:
+        item = ItemFactory(price=100)
+        Price.objects.create(item=item, value=200)
+
+        assert items.get_items_with_price_changes_over_threshold(tenant, [{"sku": item.sku}]) == []
+
+
+@pytest.mark.benchmark
+@pytest.mark.skipif(not os.environ.get("RUN_BENCHMARKS"), reason="Set RUN_BENCHMARKS=1 to run benchmarks")
+def test_benchmark_price_changes_over_threshold_of_10k_items(django_assert_num_queries) -> None:
+    items_count = 10_000
+    prices_per_item = 10
+    user = UserFactory(is_superuser=True)
+    tenant = user.tenant
+    tenant.price_change_threshold = 5
+    Item.objects.bulk_create(
+        [Item(tenant=tenant, sku=str(1_000_000 + i), name=f"Item {i}", price=100) for i in range(items_count)],
+        batch_size=2000,
+    )
+    item_ids = list(Item.objects.filter(tenant=tenant).values_list("id", flat=True))
+    # every other item's latest price is 10% up
+    Price.objects.bulk_create(
+        [
+            Price(item_id=item_id, value=110 if i % 2 and n == prices_per_item - 1 else 100)
+            for i, item_id in enumerate(item_ids)
+            for n in range(prices_per_item)
+        ],
+        batch_size=5000,
+    )
+    items_data = [{"sku": str(1_000_000 + i)} for i in range(items_count)]
+
+    started = time.perf_counter()
+    with django_assert_num_queries(2):
+        items_with_price_change = items.get_items_with_price_changes_over_threshold(tenant, items_data)
+    elapsed = time.perf_counter() - started
+
+    logger.info("Checked %s items with %s prices each in %.2fs", items_count, prices_per_item, elapsed)
+    assert len(items_with_price_change) == items_count // 2
+
+
+class TestBulkUpdateOrCreateItems:
+    def test_existing_items_updated_with_new_price_records(self) -> None:
+        item = ItemFactory(price=100)
+
+        items.bulk_update_or_create_items(item.tenant_id, [{"sku": item.sku, "name": "Renamed", "price": 150}])
+
+        item.refresh_from_db()
+        assert item.name == "Renamed"
+        assert item.price == 150
+        assert list(Price.objects.filter(item=item).values_list("value", flat=True)) == [150, 100]
+
+    def test_price_changes_detected_during_update(self) -> None:
+        tenant = UserFactory().tenant
+        changed_item = ItemFactory(tenant=tenant, sku="11111", price=100)
+        unchanged_item = ItemFactory(tenant=tenant, sku="22222", price=200)
+        items_data = [
+            {"sku": changed_item.sku, "price": 150},
+            {"sku": unchanged_item.sku, "price": 200},
+            {"sku": "33333", "name": "New item", "price": 300},
+        ]
+
+        price_changes = items.bulk_update_or_create_items(tenant.id, items_data)
+
+        assert price_changes == [items.PriceChange(changed_item.id, 100, 150)]
+
+    def test_new_items_created(self) -> None:
+        tenant = UserFactory().tenant
+
+        items.bulk_update_or_create_items(tenant.id, [{"sku": 12345, "name": "New item", "price": 100}])
+
+        item = Item.objects.get(tenant=tenant, sku="12345")
+        assert item.prices.count() == 1
+
+    def test_queries_do_not_grow_with_number_of_items(self, django_assert_max_num_queries) -> None:
+        tenant = UserFactory().tenant
+        existing_items = ItemFactory.create_batch(20, tenant=tenant)
+        items_data = [{"sku": item.sku, "price": 500} for item in existing_items]
+
+        with django_assert_max_num_queries(4):
+            items.bulk_update_or_create_items(tenant.id, items_data)
+
+
+class TestUpdateOrCreateItem:
+    def test_price_change_of_existing_item_returned(self) -> None:
+        item = ItemFactory(price=100)
+
+        price_change = items.update_or_create_item(item.tenant, {"sku": item.sku, "price": 90})
+
+        assert price_change == items.PriceChange(item.id, 100, 90)
+        assert list(Price.objects.filter(item=item).values_list("value", flat=True)) == [90, 100]
+
+    def test_unchanged_and_new_items_have_no_price_change(self) -> None:
+        item = ItemFactory(price=100)
+
+        assert items.update_or_create_item(item.tenant, {"sku": item.sku, "price": 100}) is None
+        assert items.update_or_create_item(item.tenant, {"sku": "12345", "name": "New item", "price": 100}) is None
+        assert Item.objects.filter(tenant=item.tenant, sku="12345").exists()
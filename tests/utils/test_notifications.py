@@ -0,0 +1,126 @@
+from datetime import timedelta
+
+import pytest
+from django.core import mail
+from django.utils import timezone
+
+from accounts.models import Tenant
+from factories import ItemFactory, UserFactory
+from http_stub import HTTPStub
+from main.models import Item
+from notifier.dispatch import Dispatcher, EmailChannel, WebhookChannel
+from notifier.models import DeadLetterNotification, NotificationChannel, NotificationOutbox
+from utils import notifications
+
+
+class TestNotificationDigests:
+    @pytest.fixture
+    def tenant(self) -> Tenant:
+        return UserFactory().tenant
+
+    def queue_items(self, tenant: Tenant, count: int, minutes_ago: int) -> list[int]:
+        item_ids = [item.id for item in ItemFactory.create_batch(count, tenant=tenant)]
+        notifications.enqueue_price_change_notifications(tenant.id, item_ids)
+        NotificationOutbox.objects.filter(item_id__in=item_ids).update(
+            created_at=timezone.now() - timedelta(minutes=minutes_ago)
+        )
+        return item_ids
+
+    def test_item_queued_once_until_sent(self, tenant: Tenant) -> None:
+        item = ItemFactory(tenant=tenant)
+
+        notifications.enqueue_price_change_notifications(tenant.id, [item.id])
+        notifications.enqueue_price_change_notifications(tenant.id, [item.id])
+
+        assert NotificationOutbox.objects.filter(tenant=tenant, item=item).count() == 1
+
+    def test_items_within_window_merged_into_one_digest(self, tenant: Tenant) -> None:
+        self.queue_items(tenant, 2, minutes_ago=6)
+        self.queue_items(tenant, 1, minutes_ago=1)
+
+        assert notifications.flush_notification_digests(window_minutes=5) == 1
+
+        assert len(mail.outbox) == 1
+        assert "(3)" in mail.outbox[0].subject
+        assert not NotificationOutbox.objects.exists()
+
+    def test_digest_waits_for_window(self, tenant: Tenant) -> None:
+        self.queue_items(tenant, 1, minutes_ago=1)
+
+        assert notifications.flush_notification_digests(window_minutes=5) == 0
+
+        assert len(mail.outbox) == 0
+        assert NotificationOutbox.objects.count() == 1
+
+    def test_one_digest_per_tenant(self, tenant: Tenant) -> None:
+        self.queue_items(tenant, 1, minutes_ago=10)
+        self.queue_items(UserFactory().tenant, 1, minutes_ago=10)
+
+        assert notifications.flush_notification_digests(window_minutes=5) == 2
+
+        assert len(mail.outbox) == 2
+
+    def test_failed_digest_dead_lettered(self, tenant: Tenant, mocker) -> None:
+        mocker.patch(
+            "django.core.mail.backends.locmem.EmailBackend.send_messages", side_effect=ConnectionError("SMTP is down")
+        )
+        item_ids = self.queue_items(tenant, 1, minutes_ago=10)
+        dispatcher = Dispatcher([EmailChannel(max_attempts=2, retry_backoff=0)])
+
+        assert notifications.flush_notification_digests(window_minutes=5, dispatcher=dispatcher) == 0
+
+        dead_letter = DeadLetterNotification.objects.get()
+        assert (dead_letter.tenant, dead_letter.channel, dead_letter.attempts) == (tenant, "email", 2)
+        assert dead_letter.payload["item_ids"] == item_ids
+        assert not NotificationOutbox.objects.exists()
+
+    def test_failed_digest_retried(self, tenant: Tenant, mocker) -> None:
+        mocker.patch("django.core.mail.backends.locmem.EmailBackend.send_messages", side_effect=[ConnectionError, 1])
+        self.queue_items(tenant, 1, minutes_ago=10)
+        dispatcher = Dispatcher([EmailChannel(retry_backoff=0)])
+
+        assert notifications.flush_notification_digests(window_minutes=5, dispatcher=dispatcher) == 1
+
+        assert not DeadLetterNotification.objects.exists()
+
+    def test_digest_that_failed_to_build_stays_queued(self, tenant: Tenant, mocker) -> None:
+        mocker.patch("utils.notifications.build_price_change_email", side_effect=ValueError)
+        self.queue_items(tenant, 1, minutes_ago=10)
+
+        assert notifications.flush_notification_digests(window_minutes=5) == 0
+
+        assert NotificationOutbox.objects.count() == 1
+
+    def test_digest_sent_to_tenant_channels(self, tenant: Tenant) -> None:
+        NotificationChannel.objects.create(tenant=tenant, kind="webhook", target="https://example.com/hook")
+        NotificationChannel.objects.create(tenant=tenant, kind="webhook", target="https://a.b", is_active=False)
+        item_ids = self.queue_items(tenant, 2, minutes_ago=10)
+        stub = HTTPStub()
+        dispatcher = Dispatcher([EmailChannel(), WebhookChannel()], transport=stub.transport)
+
+        assert notifications.flush_notification_digests(window_minutes=5, dispatcher=dispatcher) == 2
+
+        assert len(mail.outbox) == 1
+        [payload] = stub.webhook_payloads
+        assert (payload["tenant_id"], payload["item_ids"]) == (tenant.id, item_ids)
+        assert payload["text"] == mail.outbox[0].body
+
+    def test_digest_without_items_removed(self, tenant: Tenant) -> None:
+        item_ids = self.queue_items(tenant, 1, minutes_ago=10)
+        Item.objects.filter(id__in=item_ids).update(tenant=UserFactory().tenant)
+
+        assert notifications.flush_notification_digests(window_minutes=5) == 0
+
+        assert not NotificationOutbox.objects.exists()
+
+    def test_digests_share_smtp_connections(self, smtp_server) -> None:
+        for _ in range(5):
+            self.queue_items(UserFactory().tenant, 1, minutes_ago=10)
+
+        dispatcher = Dispatcher([EmailChannel(messages_per_connection=2)])
+
+        assert notifications.flush_notification_digests(window_minutes=5, dispatcher=dispatcher) == 5
+
+        assert len(smtp_server.messages) == 5
+        assert smtp_server.connections == 3
+        assert not NotificationOutbox.objects.exists()
@@ -0,0 +1,87 @@
+from decimal import Decimal
+
+import pytest
+
+from accounts.models import Tenant
+from factories import ItemFactory, UserFactory
+from main.models import Item
+from notifier.models import NotificationOutbox, PriceAlert
+from utils import price_alerts
+from utils.items import PriceChange
+from utils.notifications import process_price_change_notifications
+
+UP = PriceAlert.TargetPriceDirection.UP
+DOWN = PriceAlert.TargetPriceDirection.DOWN
+
+
+class TestAlertIndex:
+    @pytest.mark.parametrize(
+        "price, expected_alert_ids",
+        [(90, [3, 4]), (100, [1, 3]), (150, [1, 2]), (120, [1])],
+    )
+    def test_alerts_matched_by_direction(self, price: int, expected_alert_ids: list[int]) -> None:
+        index = price_alerts.AlertIndex(
+            [
+                (1, 2, Decimal("150"), UP),
+                (1, 1, Decimal("100"), UP),
+                (1, 3, Decimal("100"), DOWN),
+                (1, 4, Decimal("95"), DOWN),
+            ]
+        )
+
+        assert sorted(index.match(1, price)) == expected_alert_ids
+
+    def test_items_without_alerts_match_nothing(self) -> None:
+        index = price_alerts.AlertIndex([(1, 1, Decimal("100"), UP)])
+
+        assert index.match(2, 500) == []
+        assert index.match(1, None) == []
+
+
+class TestGetTriggeredAlerts:
+    @pytest.fixture
+    def tenant(self) -> Tenant:
+        return UserFactory().tenant
+
+    def create_alert(
+        self, tenant: Tenant, items: list[Item], target_price: int, direction: str, **kwargs
+    ) -> PriceAlert:
+        alert = PriceAlert.objects.create(
+            tenant=tenant, target_price=target_price, target_price_direction=direction, **kwargs
+        )
+        alert.items.add(*items)
+        return alert
+
+    def test_only_active_alerts_of_tenant_triggered(self, tenant: Tenant) -> None:
+        item = ItemFactory(tenant=tenant)
+        triggered = self.create_alert(tenant, [item], 100, UP)
+        self.create_alert(tenant, [item], 100, UP, is_active=False)
+        self.create_alert(UserFactory().tenant, [item], 100, UP)
+        self.create_alert(tenant, [item], 200, UP)
+
+        assert price_alerts.get_triggered_alerts(tenant, {item.id: 150}) == {item.id: [triggered.id]}
+
+    def test_alerts_loaded_with_one_query(self, tenant: Tenant, django_assert_num_queries) -> None:
+        items = ItemFactory.create_batch(5, tenant=tenant)
+        for item in items:
+            self.create_alert(tenant, [item], 100, DOWN)
+            self.create_alert(tenant, [item], 50, UP)
+
+        with django_assert_num_queries(1):
+            triggered_alerts = price_alerts.get_triggered_alerts(tenant, {item.id: 75 for item in items})
+
+        assert len(triggered_alerts) == 5
+        assert all(len(alert_ids) == 2 for alert_ids in triggered_alerts.values())
+
+    def test_triggered_alerts_deleted_after_notification(self, tenant: Tenant) -> None:
+        item, other_item = ItemFactory.create_batch(2, tenant=tenant)
+        triggered = self.create_alert(tenant, [item], 100, DOWN)
+        not_triggered = self.create_alert(tenant, [other_item], 100, DOWN)
+
+        process_price_change_notifications(
+            tenant, [PriceChange(item.id, 120, 90), PriceChange(other_item.id, 130, 120)]
+        )
+
+        assert list(NotificationOutbox.objects.values_list("item_id", flat=True)) == [item.id]
+        assert not PriceAlert.objects.filter(id=triggered.id).exists()
+        assert PriceAlert.objects.filter(id=not_triggered.id).exists()
@@ -0,0 +1,43 @@
+from datetime import timedelta
+
+import pytest
+from django.utils import timezone
+
+from factories import ScheduleFactory
+from main.models import Schedule
+from utils import run_locks
+
+
+class TestRunLocks:
+    @pytest.fixture
+    def schedule(self) -> Schedule:
+        return ScheduleFactory()
+
+    def test_lock_is_exclusive(self, schedule: Schedule) -> None:
+        assert run_locks.acquire_run_lock(schedule.tenant_id, "first")
+        assert not run_locks.acquire_run_lock(schedule.tenant_id, "second")
+
+    def test_expired_lease_can_be_taken_over(self, schedule: Schedule) -> None:
+        run_locks.acquire_run_lock(schedule.tenant_id, "crashed")
+        Schedule.objects.filter(id=schedule.id).update(locked_until=timezone.now() - timedelta(seconds=1))
+
+        assert run_locks.acquire_run_lock(schedule.tenant_id, "next")
+        assert not run_locks.extend_run_lock(schedule.tenant_id, "crashed")
+
+    def test_heartbeat_extends_lease(self, schedule: Schedule) -> None:
+        run_locks.acquire_run_lock(schedule.tenant_id, "run")
+        Schedule.objects.filter(id=schedule.id).update(locked_until=timezone.now() + timedelta(seconds=1))
+
+        assert run_locks.extend_run_lock(schedule.tenant_id, "run")
+        schedule.refresh_from_db()
+        assert schedule.locked_until > timezone.now() + timedelta(seconds=60)
+
+    def test_release_only_by_owner(self, schedule: Schedule) -> None:
+        run_locks.acquire_run_lock(schedule.tenant_id, "run")
+
+        assert run_locks.release_run_lock(schedule.tenant_id, "other") is None
+        assert run_locks.release_run_lock(schedule.tenant_id, "run") is not None
+        assert run_locks.acquire_run_lock(schedule.tenant_id, "next")
+
+    def test_no_lock_without_schedule(self) -> None:
+        assert not run_locks.acquire_run_lock(tenant_id=0, token="run")
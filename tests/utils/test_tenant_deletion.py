@@ -0,0 +1,66 @@
+import pytest
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import Group
+
+from accounts.models import Tenant, TenantStatus
+from factories import ItemFactory, ScheduleFactory, UserFactory
+from main.models import Item, Order, Payment, Price, Schedule
+from notifier.models import PriceAlert
+from utils import tenant_deletion
+
+User = get_user_model()
+
+
+class TestTenantDeletion:
+    @pytest.fixture
+    def user(self) -> User:
+        user = UserFactory()
+        ScheduleFactory(tenant=user.tenant)
+        items = ItemFactory.create_batch(3, tenant=user.tenant)  # saving an item creates its Price
+        alert = PriceAlert.objects.create(tenant=user.tenant, target_price=100)
+        alert.items.set(items)
+        order = Order.objects.create(tenant=user.tenant, order_id="order-1", amount=100)
+        Payment.objects.create(
+            tenant=user.tenant, order=order, payment_id="payment-1", amount=100, merchant="m", terminal_key="t"
+        )
+        return user
+
+    def test_tenant_marked_deleted_and_stopped(self, user: User) -> None:
+        tenant_deletion.mark_tenant_deleted(user.tenant)
+
+        assert Tenant.objects.get(id=user.tenant_id).status == TenantStatus.DELETED
+        assert not User.objects.get(id=user.id).is_active
+        assert not Schedule.objects.exists()
+        assert Item.objects.filter(tenant_id=user.tenant_id).count() == 3
+
+    def test_tenant_purged_in_batches(self, user: User) -> None:
+        other_item = ItemFactory()
+        tenant_deletion.mark_tenant_deleted(user.tenant)
+        progress = []
+
+        deleted = tenant_deletion.purge_tenant(user.tenant_id, batch_size=2, on_progress=lambda *p: progress.append(p))
+
+        assert deleted["main.Price"] == 3
+        assert deleted["main.Item"] == 3
+        assert deleted["notifier.PriceAlert"] == 1
+        assert ("main.Order", 1) in progress
+        assert not Tenant.objects.filter(id=user.tenant_id).exists()
+        assert not User.objects.filter(id=user.id).exists()
+        assert not Group.objects.filter(name=user.tenant.name).exists()
+        assert list(Item.objects.all()) == [other_item]
+
+    def test_batches_bounded(self, user: User, mocker) -> None:
+        execute = mocker.spy(tenant_deletion.connection.cursor().__class__, "execute")
+
+        tenant_deletion.delete_in_batches(Price.objects.filter(item__tenant=user.tenant), batch_size=2)
+
+        deletes = [call.args[2] for call in execute.call_args_list if call.args[1].startswith("DELETE")]
+        assert [len(ids) for ids in deletes] == [2, 1]
+
+    def test_purge_can_be_rerun(self, user: User) -> None:
+        tenant_deletion.delete_in_batches(Price.objects.filter(item__tenant=user.tenant), batch_size=2)
+
+        tenant_deletion.purge_tenant(user.tenant_id)
+
+        assert not Tenant.objects.filter(id=user.tenant_id).exists()
+        assert tenant_deletion.purge_tenant(user.tenant_id) == {}
@@ -0,0 +1,111 @@
+"""
+Adaptive polling of scheduled items.
+
+Items of an adaptive Schedule are not polled on the schedule's fixed interval. Each item gets its own interval
+based on how often its price actually changed recently: volatile items are polled more often, stable ones less.
+"""
+
+import logging
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+from django.utils import timezone
+
+import config
+from main.models import Price, Schedule
+from utils import billing
+
+logger = logging.getLogger(__name__)
+
+
+def get_change_rates(item_ids: list[int]) -> dict[int, float]:
+    """Estimates how often the price of each item changes between two consecutive scrapes.
+
+    Uses the Price history of the last config.ADAPTIVE_POLLING_WINDOW_DAYS days.
+
+    Args:
+        item_ids: IDs of the items to estimate.
+
+    Returns:
+        Dictionary of item ID -> share of scrapes that caught a price change (0.0 - 1.0).
+        Items with less than two prices in the window are left out.
+    """
+    since = timezone.now() - timedelta(days=config.ADAPTIVE_POLLING_WINDOW_DAYS)
+    prices = (
+        Price.objects.filter(item_id__in=item_ids, created_at__gte=since)
+        .order_by("item_id", "created_at")
+        .values_list("item_id", "value")
+    )
+    values_by_item = defaultdict(list)
+    for item_id, value in prices:
+        values_by_item[item_id].append(value)
+
+    change_rates = {}
+    for item_id, values in values_by_item.items():
+        if len(values) < 2:
+            continue
+        changes = sum(1 for previous, current in zip(values, values[1:]) if previous != current)
+        change_rates[item_id] = changes / (len(values) - 1)
+    return change_rates
+
+
+def get_adaptive_interval(
+    base_interval: timedelta, change_rate: float | None, min_interval: timedelta, max_interval: timedelta
+) -> timedelta:
+    """Scales the schedule's interval by the item's change rate.
+
+    An item that changes on half of the scrapes keeps the base interval. An item that changes on every scrape
+    is polled config.ADAPTIVE_POLLING_MAX_SPEEDUP times as often, and an item that never changes
+    config.ADAPTIVE_POLLING_MAX_SLOWDOWN times as rarely.
+
+    Args:
+        base_interval: The schedule's interval.
+        change_rate: Result of get_change_rates for the item, None if unknown.
+        min_interval: Lower bound of the result.
+        max_interval: Upper bound of the result.
+    """
+    if change_rate is None:
+        return base_interval
+    if change_rate >= 0.5:
+        factor = 1 / (1 + (config.ADAPTIVE_POLLING_MAX_SPEEDUP - 1) * (change_rate - 0.5) * 2)
+    else:
+        factor = 1 + (config.ADAPTIVE_POLLING_MAX_SLOWDOWN - 1) * (0.5 - change_rate) * 2
+    return min(max(base_interval * factor, min_interval), max_interval)
+
+
+def get_adaptive_next_run_ats(schedule: Schedule, item_ids: list[int], now: datetime) -> dict[int, datetime]:
+    """Calculates when each of the schedule's items should be polled next.
+
+    The intervals never go below the tenant's plan minimum. On the whole, the items are not polled more often than
+    they would be on the fixed schedule, so adaptive mode never spends more parse units
+    (TenantQuota.parse_units_limit) than the fixed interval would. It moves them from stable items to volatile ones.
+
+    Args:
+        schedule: The tenant's adaptive Schedule.
+        item_ids: IDs of the items that have just been dispatched.
+        now: Time of the dispatch.
+
+    Returns:
+        Dictionary of item ID -> next_run_at.
+    """
+    base_interval = schedule.run_every
+    min_interval = max(
+        base_interval / config.ADAPTIVE_POLLING_MAX_SPEEDUP, billing.get_plan_min_interval(schedule.tenant)
+    )
+    max_interval = max(base_interval * config.ADAPTIVE_POLLING_MAX_SLOWDOWN, min_interval)
+    change_rates = get_change_rates(item_ids)
+    intervals = {
+        item_id: get_adaptive_interval(base_interval, change_rates.get(item_id), min_interval, max_interval)
+        for item_id in item_ids
+    }
+
+    # number of polls per base interval, compared to one poll per item on the fixed schedule
+    polls = sum(base_interval / interval for interval in intervals.values())
+    if polls > len(intervals):
+        budget_factor = polls / len(intervals)
+        logger.info(
+            "Adaptive polling of tenant %s over budget, slowing down by %.2f", schedule.tenant_id, budget_factor
+        )
+        intervals = {item_id: min(interval * budget_factor, max_interval) for item_id, interval in intervals.items()}
+
+    return {item_id: now + interval for item_id, interval in intervals.items()}
@@ -1,13 +1,13 @@
 """Billing and quota management utilities."""
 
 import logging
-import re
+from datetime import timedelta
 
 from django.contrib.auth import get_user_model
-from django.http import HttpRequest
+from django.db.models import F
 
 import config
-from accounts.models import TenantQuota, Tenant
+from accounts.models import PaymentPlan, TenantQuota, TenantQuotaCounter, Tenant
 from main.exceptions import QuotaExceededException
 
 logger = logging.getLogger(__name__)
@@ -56,36 +56,97 @@ def set_tenant_quota(
     )
     # assign the quota to the tenant
     tenant.save(update_fields=["quota"])
+    TenantQuotaCounter.objects.update_or_create(
+        tenant=tenant,
+        defaults={"skus_remaining": skus_limit, "parse_units_remaining": parse_units_limit},
+    )
+
+
+def get_quota_counter(tenant: Tenant) -> TenantQuotaCounter:
+    """Returns the tenant's quota counter, creating it from the limits of the tenant's quota on first use."""
+    try:
+        return TenantQuotaCounter.objects.get(tenant=tenant)
+    except TenantQuotaCounter.DoesNotExist:
+        pass
+    quota = tenant.quota
+    counter, _ = TenantQuotaCounter.objects.get_or_create(
+        tenant=tenant,
+        defaults={
+            "skus_remaining": (quota.skus_limit or 0) if quota else 0,
+            "parse_units_remaining": (quota.parse_units_limit or 0) if quota else 0,
+        },
+    )
+    return counter
 
 
-def update_tenant_quota_for_max_allowed_sku(request: HttpRequest, skus: str) -> None:
+def reserve_quota(tenant: Tenant, skus: int = 0, parse_units: int = 0) -> None:
     """
-    Checks if the user has enough quota to scrape items and then updates the remaining user quota.
+    Reserves SKUs and parse units of the tenant's quota before scraping.
+
+    The check and the decrement are a single conditional UPDATE, so concurrent scrapes can neither
+    lose each other's charges nor overdraw the quota. What is not used is refunded by commit_quota.
 
     Args:
-        request: The HttpRequest object containing user and form data.
-        skus (str): The string of SKUs to check.
+        tenant: The tenant whose quota is charged.
+        skus: Number of new items.
+        parse_units: Number of SKUs to scrape.
+
+    Raises:
+        QuotaExceededException: If the remaining quota is not enough. Nothing is reserved in that case.
     """
-    user_quota = get_user_quota(request.user)
-    skus_count: int = len(re.split(r"\s+|\n|,(?:\s*)", skus))
-    if skus_count <= user_quota.skus_limit:
-        user_quota.skus_limit -= skus_count
-        user_quota.save()
-    else:
+    counter = get_quota_counter(tenant)
+    reserved = TenantQuotaCounter.objects.filter(
+        id=counter.id, skus_remaining__gte=skus, parse_units_remaining__gte=parse_units
+    ).update(
+        skus_remaining=F("skus_remaining") - skus,
+        parse_units_remaining=F("parse_units_remaining") - parse_units,
+    )
+    if reserved:
+        return
+
+    counter.refresh_from_db()
+    if counter.skus_remaining < skus:
         raise QuotaExceededException(
             message="Превышен лимит количества товаров для данного тарифа.",
             quota_type="max_allowed_skus",
         )
+    raise QuotaExceededException(
+        message="Превышен лимит единиц проверки для данного тарифа.",
+        quota_type="allowed_parse_units",
+    )
 
 
-def update_user_quota_for_allowed_parse_units(user: User, skus: str) -> None:
-    user_quota = get_user_quota(user)
-    skus_count = len(re.split(r"\s+|\n|,(?:\s*)", skus))
-    if user_quota.parse_units_limit >= skus_count:
-        user_quota.parse_units_limit -= skus_count
-        user_quota.save()
-    else:
-        raise QuotaExceededException(
-            message="Превышен лимит единиц проверки для данного тарифа.",
-            quota_type="allowed_parse_units",
-        )
+def commit_quota(
+    tenant_id: int,
+    reserved_skus: int = 0,
+    used_skus: int = 0,
+    reserved_parse_units: int = 0,
+    used_parse_units: int = 0,
+) -> None:
+    """
+    Settles a reservation made by reserve_quota once scraping is done: only the successfully scraped SKUs
+    stay charged, the rest of the reservation is returned to the tenant's quota with a single UPDATE.
+    """
+    refund_skus = max(reserved_skus - used_skus, 0)
+    refund_parse_units = max(reserved_parse_units - used_parse_units, 0)
+    if not refund_skus and not refund_parse_units:
+        return
+    TenantQuotaCounter.objects.filter(tenant_id=tenant_id).update(
+        skus_remaining=F("skus_remaining") + refund_skus,
+        parse_units_remaining=F("parse_units_remaining") + refund_parse_units,
+    )
+    logger.info(
+        "Refunded %s SKUs and %s parse units of unused quota to tenant %s", refund_skus, refund_parse_units, tenant_id
+    )
+
+
+def get_plan_min_interval(tenant: Tenant) -> timedelta:
+    """Returns the shortest scrape interval allowed by the tenant's plan.
+
+    Args:
+        tenant: The tenant object.
+    """
+    # Currently, we only have schedule limitations for the FREE plan
+    if tenant.payment_plan.name == PaymentPlan.PlanName.FREE.value:
+        return timedelta(hours=config.FREE_PLAN_MIN_SCHEDULE_INTERVAL_HOURS)
+    return timedelta(0)
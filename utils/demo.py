@@ -3,21 +3,27 @@ Demo system management utilities for handling demo users and demo data.
 """
 
 import logging
+from datetime import timedelta
 from uuid import uuid4
 
 from django.contrib.auth import get_user_model
 from django.core.exceptions import ValidationError
-from django.db import IntegrityError
+from django.db import IntegrityError, transaction
+from django.db.models import QuerySet
+from django.utils import timezone
 
-from main.models import Item
+import config
+from main.models import Item, Schedule
+from utils.billing import reserve_quota, set_tenant_quota
 
 logger = logging.getLogger(__name__)
 User = get_user_model()
 
 
-def create_demo_user() -> tuple[User, str]:
+def create_demo_user(is_demo_active: bool = True) -> tuple[User, str]:
     """
     Create a demo user with a random name and password.
+    Users created for the demo pool are not active demo users until they are claimed (see claim_demo_user).
     """
     name_uuid = str(uuid4())
     password_uuid = str(uuid4())
@@ -27,7 +33,7 @@ def create_demo_user() -> tuple[User, str]:
             username=f"demo-user-{name_uuid}",
             email=f"demo-user-{name_uuid}@demo.com",
             is_demo_user=True,
-            is_demo_active=True,
+            is_demo_active=is_demo_active,
         )
         demo_user.set_password(password_uuid)
         demo_user.save()
@@ -80,9 +86,104 @@ def create_demo_items(demo_user: User) -> list[Item]:
     return created_items
 
 
+def provision_demo_user(is_demo_active: bool = True) -> User:
+    """Create a demo user together with the demo quota and demo items of their tenant."""
+    demo_user, _ = create_demo_user(is_demo_active=is_demo_active)
+    set_tenant_quota(tenant=demo_user.tenant)
+    demo_items = create_demo_items(demo_user)
+    reserve_quota(demo_user.tenant, skus=len(demo_items))
+    return demo_user
+
+
+def get_demo_pool() -> QuerySet:
+    """Provisioned demo users that are waiting to be claimed."""
+    return User.objects.filter(is_demo_user=True, is_demo_active=False, is_active=True)
+
+
+def claim_demo_user() -> User | None:
+    """Claim a pre-provisioned demo user from the pool.
+
+    The row is locked with SKIP LOCKED, so that concurrent requests claim different users without waiting
+    for each other. The demo period starts when the user is claimed.
+
+    Returns:
+        The claimed demo user, or None if the pool is empty.
+    """
+    with transaction.atomic():
+        demo_user = get_demo_pool().select_for_update(skip_locked=True).order_by("id").first()
+        if demo_user is None:
+            logger.warning("Demo pool is empty")
+            return None
+        demo_user.is_demo_active = True
+        demo_user.created_at = timezone.now()
+        demo_user.save(update_fields=["is_demo_active", "created_at"])
+
+    logger.info("Demo user %s claimed from the pool", demo_user.email)
+    return demo_user
+
+
+def refill_demo_pool(size: int = config.DEMO_POOL_SIZE) -> int:
+    """Provision demo users until the pool holds `size` of them.
+
+    Returns:
+        Number of provisioned demo users.
+    """
+    missing = size - get_demo_pool().count()
+    for _ in range(missing):
+        with transaction.atomic():
+            provision_demo_user(is_demo_active=False)
+    if missing > 0:
+        logger.info("Demo pool refilled with %s users", missing)
+    return max(missing, 0)
+
+
 def no_active_demo_user(user: User) -> bool:
     """Make sure no active demo user exists for the user.
     Prevents the user from going directly to demo/ url and creating another demo session
     while the first one is still active.
     """
     return not (user.is_authenticated and hasattr(user, "is_demo_user") and user.is_demo_user)
+
+
+def deactivate_expired_demo_users(chunk_size: int = config.DEMO_USERS_CLEANUP_CHUNK_SIZE) -> int:
+    """Deactivates the demo users whose demo has expired.
+
+    The scrape schedules of their tenants are deleted together with the tenants' items.
+    Expired users are found in SQL by created_at (see User.is_demo_expired) and processed in chunks of `chunk_size`
+    users, each chunk in its own transaction, so that the number of queries and the size of the transactions
+    don't grow with the number of demo users.
+    Used by both the mp_monitor.celery.check_expired_demo_users task and the accounts.views mirror of it.
+
+    Args:
+        chunk_size: Number of users deactivated per transaction.
+
+    Returns:
+        Number of deactivated users.
+    """
+    expired_before = timezone.now() - timedelta(hours=config.DEMO_USER_HOURS_ALLOWED)
+    # users waiting in the demo pool are not active demo users yet, their demo starts when they are claimed
+    expired_users = User.objects.filter(
+        is_demo_user=True, is_demo_active=True, is_active=True, created_at__lt=expired_before
+    )
+
+    deactivated = 0
+    while True:
+        with transaction.atomic():
+            chunk = list(expired_users.order_by("id").values_list("id", "tenant_id")[:chunk_size])
+            if not chunk:
+                break
+            user_ids = [user_id for user_id, _ in chunk]
+            tenant_ids = {tenant_id for _, tenant_id in chunk if tenant_id is not None}
+
+            # tenant ID -> ID of its schedule
+            schedules = dict(Schedule.objects.filter(tenant_id__in=tenant_ids).values_list("tenant_id", "id"))
+            if schedules:
+                Item.objects.filter(tenant_id__in=schedules.keys()).delete()
+                Schedule.objects.filter(id__in=schedules.values()).delete()
+            User.objects.filter(id__in=user_ids).update(is_demo_active=False, is_active=False)
+
+        deactivated += len(user_ids)
+        logger.info("Deactivated %s expired demo users, deleted %s schedules", len(user_ids), len(schedules))
+
+    logger.info("Deactivated %s expired demo users in total", deactivated)
+    return deactivated
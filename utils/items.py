@@ -1,12 +1,16 @@
 """Item state management and operations utilities."""
 
 import logging
-from typing import Any, Dict, List
+from decimal import Decimal
+from typing import Any, Dict, List, NamedTuple
 
+import numpy as np
 from django.contrib import messages
 from django.core.handlers.wsgi import WSGIRequest
-from django.db.models import Q, Prefetch
+from django.db.models import F, Q, Window
+from django.db.models.functions import RowNumber
 from django.http import HttpRequest
+from django.utils import timezone
 
 from accounts.models import Tenant
 from main.models import Item, Price
@@ -14,38 +18,95 @@ from main.models import Item, Price
 logger = logging.getLogger(__name__)
 
 
-def update_or_create_items(request: HttpRequest, items_data: List[Dict[str, Any]]) -> None:
-    """Update existing items or create new ones for the user's tenant.
+class PriceChange(NamedTuple):
+    """
+    Price change of an item, detected while persisting the scraped item data.
+    Passed between Celery tasks as a plain list, restore it with PriceChange(*change).
+    """
 
-    Args:
-        request: The HTTP request object with user information.
-        items_data: List of item data dictionaries.
+    item_id: int
+    old_price: int | None
+    new_price: int | None
+
+
+def _get_price_change(item: Item, old_price: Decimal | None) -> PriceChange | None:
+    if item.price == old_price:
+        return None
+    # prices are whole rubles (decimal_places=0), ints also survive Celery's JSON serializer
+    return PriceChange(
+        item.id,
+        int(old_price) if old_price is not None else None,
+        int(item.price) if item.price is not None else None,
+    )
+
+
+def update_or_create_item(tenant: Tenant, item_data: Dict[str, Any]) -> PriceChange | None:
+    """Update the tenant's item with the scraped data or create it.
+
+    Returns:
+        The price change of an existing item, None if its price didn't change or the item is new.
     """
-    logger.info("Update from user=%s", request.user.id if request.user.is_authenticated else "Anonymous")
-    for item_data in items_data:
-        item, created = Item.objects.update_or_create(  # pylint: disable=unused-variable
-            tenant=request.user.tenant,
-            sku=item_data["sku"],
-            defaults=item_data,
-        )
+    item = Item.objects.filter(tenant=tenant, sku=item_data["sku"]).first()
+    if item is None:
+        Item.objects.create(tenant=tenant, **item_data)
+        return None
+
+    old_price = item.price
+    for field, value in item_data.items():
+        setattr(item, field, value)
+    item.save()
+    return _get_price_change(item, old_price)
+
 
+def bulk_update_or_create_items(tenant_id: int, items_data: List[Dict[str, Any]]) -> list[PriceChange]:
+    """Persist a batch of scraped items for a tenant with a constant number of queries.
 
-def update_or_create_items_interval(tenant_id, items_data):
-    """Update or create items for a specific tenant.
+    Existing items are updated with a single bulk_update and their new prices are written with a single
+    bulk_create, since neither goes through Item.save(). Items that don't exist yet are rare in scheduled updates
+    and are created one by one, so that Item.save() and its signals (price record, permissions) still apply.
 
     Args:
         tenant_id: ID of the tenant.
         items_data: List of item data dictionaries.
+
+    Returns:
+        Price changes of the existing items, compared with the prices they had before the update.
     """
-    logger.info("Update tenant_id=%s", tenant_id)
-    tenant = Tenant.objects.get(id=tenant_id)
-    logger.info("Update tenant=%s", tenant)
+    if not items_data:
+        return []
+
+    existing_items = Item.objects.filter(tenant_id=tenant_id, sku__in=[item_data["sku"] for item_data in items_data])
+    items_by_sku = {item.sku: item for item in existing_items}
+    now = timezone.now()
+    items_to_update = []
+    price_changes = []
+    update_fields = {"updated_at"}
+
     for item_data in items_data:
-        item, created = Item.objects.update_or_create(  # pylint: disable=unused-variable
-            tenant=tenant,
-            sku=item_data["sku"],
-            defaults=item_data,
-        )
+        item = items_by_sku.get(str(item_data["sku"]))
+        if item is None:
+            Item.objects.create(tenant_id=tenant_id, **item_data)
+            continue
+        old_price = item.price
+        for field, value in item_data.items():
+            setattr(item, field, value)
+        item.updated_at = now
+        update_fields.update(item_data.keys())
+        items_to_update.append(item)
+        price_change = _get_price_change(item, old_price)
+        if price_change:
+            price_changes.append(price_change)
+
+    if items_to_update:
+        Item.objects.bulk_update(items_to_update, sorted(update_fields))
+        Price.objects.bulk_create([Price(item=item, value=item.price) for item in items_to_update])
+    logger.info(
+        "Tenant %s: updated %s items, created %s items",
+        tenant_id,
+        len(items_to_update),
+        len(items_data) - len(items_to_update),
+    )
+    return price_changes
 
 
 def is_at_least_one_item_selected(request: HttpRequest, selected_item_ids: list[str] | str) -> bool:
@@ -91,14 +152,20 @@ def activate_parsing_for_selected_items(request: WSGIRequest, skus_list: list[in
     Item.objects.filter(Q(tenant_id=request.user.tenant.id) & Q(sku__in=skus_list)).update(is_parser_active=True)
 
 
-def get_items_with_price_changes_over_threshold(tenant: Tenant, items_data: list[dict]) -> list[Item]:
+def get_items_with_price_changes_over_threshold(tenant: Tenant, items_data: list[dict]) -> list[int]:
     """
     Check if any items have price change that is over the threshold set in the tenant settings.
 
+    The last two prices of all the items are fetched with a single window query,
+    and their percent changes are compared with the threshold as a NumPy array.
+
     Args:
         tenant: The tenant whose items are being checked.
         items_data: List of dictionaries containing item data.
 
+    Returns:
+        IDs of the items whose price changed by more than the threshold.
+
     Note:
         Uses tenant.price_change_threshold to determine price changes
     """
@@ -108,49 +175,37 @@ def get_items_with_price_changes_over_threshold(tenant: Tenant, items_data: list
         logger.info("No superusers found. Exiting.")
         return []
 
-    items_with_price_change: list[Item] = []
-    items = Item.objects.filter(sku__in=[item["sku"] for item in items_data])  # Queryset[Item]
+    latest_prices = (
+        Price.objects.filter(item__tenant=tenant, item__sku__in=[item["sku"] for item in items_data])
+        .annotate(
+            row_number=Window(RowNumber(), partition_by=F("item_id"), order_by=[F("created_at").desc(), F("id").desc()])
+        )
+        .filter(row_number__lte=2)
+        .order_by("item_id", "row_number")
+        .values_list("item_id", "row_number", "value")
+    )
+    rows = list(latest_prices)
+    if not rows:
+        return []
 
     logger.info("Checking if any items have price change...")
-    for item in items:
-        if item.previous_price and abs(item.price_percent_change) > tenant.price_change_threshold:
-            items_with_price_change.append(item)
-
+    item_ids = np.array([row[0] for row in rows], dtype=np.int64)
+    row_numbers = np.array([row[1] for row in rows], dtype=np.int64)
+    values = np.array([np.nan if row[2] is None else float(row[2]) for row in rows], dtype=np.float64)
+
+    # rows are ordered by item, with the current price first: the previous price directly follows it
+    is_current = row_numbers == 1
+    has_previous = np.append(row_numbers[1:] == 2, False)
+    current_rows = np.flatnonzero(is_current & has_previous)
+    current = values[current_rows]
+    previous = values[current_rows + 1]
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        percent_changes = (current - previous) / previous * 100
+    # items without a previous price (None or 0) are skipped, NaN and inf never pass the comparison
+    threshold = float(tenant.price_change_threshold or 0)
+    is_over_threshold = np.isfinite(percent_changes) & (np.abs(percent_changes) > threshold)
+
+    items_with_price_change = item_ids[current_rows][is_over_threshold].tolist()
     logger.info("Found %s items with price change", len(items_with_price_change))
     return items_with_price_change
-
-
-def get_items_with_price_change(tenant: Tenant, items_data: list[dict]) -> list[Item]:
-    """
-    Fetch items with price changes for the given tenant and items data.
-    """
-
-    logger.info("Getting items with price changes...")
-    items = Item.objects.filter(sku__in=[item["sku"] for item in items_data], tenant=tenant).prefetch_related(
-        Prefetch("prices", queryset=Price.objects.order_by("-created_at"))
-    )
-
-    items_with_price_change = [item for item in items if item.previous_price != item.price]
-    logger.info("Found %s items with price changes", len(items_with_price_change))
-
-    return items_with_price_change
-
-
-def get_items_with_active_alerts(tenant: Tenant, items_with_price_change: list[Item]) -> list[Item]:
-    """
-    Fetch items with active price alerts for the given tenant.
-    Returns a list of items that hit the threshold to trigger the alert.
-    """
-    logger.info("Getting items with active alerts...")
-
-    logger.debug("Extracting IDs from items_with_price_change...")
-    item_ids_with_price_change: list = [item.id for item in items_with_price_change]
-
-    items_with_alerts = (
-        Item.objects.filter(Q(id__in=item_ids_with_price_change) & Q(price_alerts__is_active=True) & Q(tenant=tenant))
-        .distinct()
-        .prefetch_related("price_alerts")
-    )
-    logger.info("Found %s items with active alerts", items_with_alerts.count())
-
-    return list(items_with_alerts)
@@ -288,6 +288,18 @@ def scrape_item(sku: str, use_selenium: bool = False) -> Dict[str, Any]:
     }
 
 
+def split_skus(skus: str) -> list[str]:
+    """Split a string of SKUs into a list.
+
+    Args:
+        skus: A string containing SKUs, separated by spaces, newlines, or commas.
+
+    Returns:
+        A list of SKU strings in the order they were given.
+    """
+    return re.split(r"\s+|\n|,(?:\s*)", skus)
+
+
 def scrape_items_from_skus(skus: str, is_parser_active: bool = False) -> tuple[list[dict[str, Any]], list[str]]:
     """Scrapes item data from a string of SKUs.
 
@@ -304,7 +316,7 @@ def scrape_items_from_skus(skus: str, is_parser_active: bool = False) -> tuple[l
     items_data = []
     invalid_skus = []
 
-    for sku in re.split(r"\s+|\n|,(?:\s*)", skus):
+    for sku in split_skus(skus):
         logger.info("Scraping item: %s", sku)
         try:
             item_data = scrape_item(sku)
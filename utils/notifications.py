@@ -3,19 +3,22 @@ User feedback system utilities for displaying messages and processing notificati
 """
 
 import logging
+from collections import defaultdict
+from datetime import timedelta
 from typing import Any, Dict, List
 
 from django.contrib import messages
-from django.db.models import Q
+from django.db import transaction
 from django.http import HttpRequest
+from django.utils import timezone
 from django.utils.safestring import mark_safe
 
 import config
 from accounts.models import Tenant
-from main.models import Item
-from notifier.models import PriceAlert
-from notifier.tasks import send_price_change_email
-from utils import items
+from notifier.dispatch import Dispatcher, EmailChannel, Notification, get_dispatcher
+from notifier.models import DeadLetterNotification, NotificationChannel, NotificationOutbox
+from notifier.rendering import build_price_change_email
+from utils import items, price_alerts
 
 logger = logging.getLogger(__name__)
 
@@ -55,56 +58,123 @@ def show_invalid_skus_message(request: HttpRequest, invalid_skus: list) -> None:
         )
 
 
-def deactivate_price_alerts(tenant: Tenant, items_with_active_alerts: list[Item]) -> None:
+def process_price_change_notifications(tenant: Tenant, price_changes: list[items.PriceChange]) -> None:
     """
-    Once price alerts are sent, deactivate them to prevent sending them again.
+    Notify the tenant about the price changes detected while persisting the scraped items
+    (see items.bulk_update_or_create_items), without reading the price history again.
     """
-    for item in items_with_active_alerts:
-        current_price = item.price
+    logger.info("Checking is user needs to be notified of price changes...")
 
-        # Get alerts for this item and tenant
-        alerts = PriceAlert.objects.filter(tenant=tenant, items=item)
+    # Step 1
+    if not price_changes:
+        logger.info("No price changes")
+        return
+    new_prices = {price_change.item_id: price_change.new_price for price_change in price_changes}
 
-        # Filter alerts based on the trigger condition
-        triggered_alerts = alerts.filter(
-            Q(target_price_direction=PriceAlert.TargetPriceDirection.UP, target_price__lte=current_price)
-            | Q(target_price_direction=PriceAlert.TargetPriceDirection.DOWN, target_price__gte=current_price)
-        ).filter(is_active=True)
+    # Step 2
+    triggered_alerts: dict[int, list[int]] = price_alerts.get_triggered_alerts(tenant, new_prices)
+    if not triggered_alerts:
+        return
+    # Step 3
+    enqueue_price_change_notifications(tenant.id, list(triggered_alerts))
 
-        triggered_alerts.update(is_active=False)
+    # Step 4
+    triggered_alert_ids = {alert_id for alert_ids in triggered_alerts.values() for alert_id in alert_ids}
+    price_alerts.delete_price_alerts(triggered_alert_ids)
+    # price_alerts.deactivate_price_alerts(triggered_alert_ids)
 
 
-def delete_price_alerts(tenant: Tenant, items_with_active_alerts: list[Item]) -> None:
+def enqueue_price_change_notifications(tenant_id: int, item_ids: list[int]) -> None:
     """
-    Once price alerts are sent, delete them to remove triggered alerts.
+    Queue the items for the tenant's next digest email (see flush_notification_digests),
+    so that the price changes of several chunks or scrapes are sent in one email.
+    Items that are already queued are not added again.
     """
-    for item in items_with_active_alerts:
-        current_price = item.price
-
-        # Get alerts for this item and tenant
-        alerts = PriceAlert.objects.filter(tenant=tenant, items=item)
-
-        # Filter alerts based on the trigger condition
-        triggered_alerts = alerts.filter(
-            Q(target_price_direction=PriceAlert.TargetPriceDirection.UP, target_price__lte=current_price)
-            | Q(target_price_direction=PriceAlert.TargetPriceDirection.DOWN, target_price__gte=current_price)
-        ).filter(is_active=True)
+    NotificationOutbox.objects.bulk_create(
+        [NotificationOutbox(tenant_id=tenant_id, item_id=item_id) for item_id in item_ids],
+        ignore_conflicts=True,
+    )
+    logger.info("Queued %s items for the next digest of tenant %s", len(item_ids), tenant_id)
 
-        triggered_alerts.delete()
 
+def flush_notification_digests(
+    window_minutes: int = config.NOTIFICATION_DIGEST_WINDOW_MINUTES,
+    dispatcher: Dispatcher | None = None,
+) -> int:
+    """
+    Send one digest to every tenant whose oldest queued notification has waited for the whole window.
+    The digest lists all the items queued for the tenant so far and is sent by email and through the tenant's
+    active notification channels (see notifier.dispatch).
 
-def process_price_change_notifications(tenant: Tenant, items_data: list[dict]) -> None:
-    logger.info("Checking is user needs to be notified of price changes...")
+    The items are removed from the outbox before the digests are sent, so that slow channels don't keep the rows
+    locked while the scrapes enqueue new ones. Digests that fail even after the retries are dead-lettered.
 
-    # Step 1
-    items_with_price_change: list[Item] = items.get_items_with_price_change(tenant, items_data)
-
-    # Step 2
-    items_with_active_alerts: list[Item] = items.get_items_with_active_alerts(tenant, items_with_price_change)
+    Args:
+        window_minutes: How long the oldest queued notification of a tenant waits for the next ones.
+        dispatcher: Sends the digests, defaults to the dispatcher with all the configured channels.
 
-    # Step 3
-    send_price_change_email(tenant, items_with_active_alerts)
-
-    # Step 4
-    delete_price_alerts(tenant, items_with_active_alerts)
-    # deactivate_price_alerts(tenant, items_with_active_alerts)
+    Returns:
+        Number of delivered notifications (one per digest and channel).
+    """
+    due_before = timezone.now() - timedelta(minutes=window_minutes)
+    tenant_ids = list(
+        NotificationOutbox.objects.filter(created_at__lte=due_before)
+        .order_by()
+        .values_list("tenant_id", flat=True)
+        .distinct()
+    )
+    if not tenant_ids:
+        return 0
+
+    with transaction.atomic():
+        entries_by_tenant = defaultdict(list)
+        for entry_id, tenant_id, item_id in (
+            NotificationOutbox.objects.select_for_update(skip_locked=True)
+            .filter(tenant_id__in=tenant_ids)
+            .order_by("id")
+            .values_list("id", "tenant_id", "item_id")
+        ):
+            entries_by_tenant[tenant_id].append((entry_id, item_id))
+
+        channels_by_tenant = defaultdict(list)
+        for channel in NotificationChannel.objects.filter(tenant_id__in=entries_by_tenant, is_active=True):
+            channels_by_tenant[channel.tenant_id].append(channel)
+
+        digests, done_entry_ids = [], []
+        for tenant_id, entries in entries_by_tenant.items():
+            item_ids = [item_id for _, item_id in entries]
+            try:
+                msg = build_price_change_email(tenant_id, item_ids)
+            except Exception:
+                logger.exception("Failed to build the notification digest of tenant %s", tenant_id)
+                continue
+            done_entry_ids.extend(entry_id for entry_id, _ in entries)
+            if msg is None:
+                # the items or the users are gone, there is nothing to send
+                continue
+            digests.append(Notification(tenant_id, EmailChannel.name, msg.subject, msg.body, item_ids, message=msg))
+            digests.extend(
+                Notification(tenant_id, channel.kind, msg.subject, msg.body, item_ids, target=channel.target)
+                for channel in channels_by_tenant[tenant_id]
+            )
+        NotificationOutbox.objects.filter(id__in=done_entry_ids).delete()
+
+    if not digests:
+        return 0
+    result = (dispatcher or get_dispatcher()).dispatch(digests)
+    DeadLetterNotification.objects.bulk_create(
+        [
+            DeadLetterNotification(
+                tenant_id=notification.tenant_id,
+                channel=notification.channel,
+                target=notification.target,
+                payload=notification.to_payload(),
+                error=error,
+                attempts=notification.attempts,
+            )
+            for notification, error in result.dead_letters
+        ]
+    )
+    sent = sum(result.delivered.values())
+    logger.info("Sent %s notification digests, %s dead-lettered", sent, len(result.dead_letters))
+    return sent
@@ -116,14 +116,16 @@ def update_payment_records(data: dict[str, Any], order: Order) -> None:
         is_successful=True,
     )
 
+    # locked until the end of the transaction, so that a concurrent plan switch or payment can't save a stale balance
+    tenant = Tenant.objects.select_for_update().get(id=order.tenant_id)
     # if order.order_intent == Order.OrderIntent.ADD_TO_BALANCE:
     logger.debug("Adding %s rub. to tenant balance...", amount_rubles)
-    order.tenant.add_to_balance(amount_rubles)
+    tenant.add_to_balance(amount_rubles)
     if order.order_intent == Order.OrderIntent.SWITCH_PLAN:
         plan_name = order.description
-        order.tenant.switch_plan(new_plan=plan_name)
-        order.tenant.billing_start_date = timezone.now()
-    order.tenant.save()
+        tenant.switch_plan(new_plan=plan_name)
+        tenant.billing_start_date = timezone.now()
+        tenant.save(update_fields=["billing_start_date"])
 
 
 class TinkoffTokenGenerator:
@@ -0,0 +1,102 @@
+"""
+Matching of price changes against the tenant's price alerts.
+
+All active alerts of the changed items are loaded with one query and indexed per item by their target prices,
+sorted separately for each direction. The alerts triggered by a price are then found with a binary search
+instead of a query per item, and are removed with a single statement.
+"""
+
+import logging
+from bisect import bisect_left, bisect_right
+from collections import defaultdict
+from decimal import Decimal
+
+from accounts.models import Tenant
+from notifier.models import PriceAlert
+
+logger = logging.getLogger(__name__)
+
+
+class _ItemAlerts:
+    """Active alerts of a single item, sorted by target price for each direction."""
+
+    def __init__(self, alerts: list[tuple[Decimal, str, int]]) -> None:
+        up_alerts = sorted(
+            (price, alert_id)
+            for price, direction, alert_id in alerts
+            if direction == PriceAlert.TargetPriceDirection.UP
+        )
+        down_alerts = sorted(
+            (price, alert_id)
+            for price, direction, alert_id in alerts
+            if direction == PriceAlert.TargetPriceDirection.DOWN
+        )
+        self.up_prices = [price for price, _ in up_alerts]
+        self.up_alert_ids = [alert_id for _, alert_id in up_alerts]
+        self.down_prices = [price for price, _ in down_alerts]
+        self.down_alert_ids = [alert_id for _, alert_id in down_alerts]
+
+    def match(self, price: int | Decimal) -> list[int]:
+        # UP alerts trigger once the price reaches the target (target <= price): a prefix of the sorted targets,
+        # DOWN alerts once it falls to the target (target >= price): a suffix
+        triggered = self.up_alert_ids[: bisect_right(self.up_prices, price)]
+        triggered += self.down_alert_ids[bisect_left(self.down_prices, price) :]
+        return triggered
+
+
+class AlertIndex:
+    """Active price alerts of a set of items, indexed for matching their new prices."""
+
+    def __init__(self, alerts: list[tuple[int, int, Decimal, str]]) -> None:
+        alerts_by_item = defaultdict(list)
+        for item_id, alert_id, target_price, direction in alerts:
+            alerts_by_item[item_id].append((target_price, direction, alert_id))
+        self._alerts_by_item = {item_id: _ItemAlerts(item_alerts) for item_id, item_alerts in alerts_by_item.items()}
+
+    @classmethod
+    def load(cls, tenant: Tenant, item_ids: list[int]) -> "AlertIndex":
+        """Loads the tenant's active alerts of the items with a single query."""
+        alerts = PriceAlert.items.through.objects.filter(
+            item_id__in=item_ids, pricealert__tenant=tenant, pricealert__is_active=True
+        ).values_list("item_id", "pricealert_id", "pricealert__target_price", "pricealert__target_price_direction")
+        return cls(list(alerts))
+
+    def match(self, item_id: int, price: int | Decimal | None) -> list[int]:
+        """Returns the IDs of the item's alerts triggered by the price."""
+        item_alerts = self._alerts_by_item.get(item_id)
+        if item_alerts is None or price is None:
+            return []
+        return item_alerts.match(price)
+
+
+def get_triggered_alerts(tenant: Tenant, prices: dict[int, int | Decimal | None]) -> dict[int, list[int]]:
+    """
+    Finds the tenant's active alerts triggered by the new prices of the items.
+
+    Args:
+        tenant: The tenant whose alerts are checked.
+        prices: Item ID -> new price of the item.
+
+    Returns:
+        Item ID -> IDs of its triggered alerts, only for the items with at least one.
+    """
+    if not prices:
+        return {}
+    index = AlertIndex.load(tenant, list(prices))
+    triggered_alerts = {}
+    for item_id, price in prices.items():
+        alert_ids = index.match(item_id, price)
+        if alert_ids:
+            triggered_alerts[item_id] = alert_ids
+    logger.info("Found %s items with triggered alerts", len(triggered_alerts))
+    return triggered_alerts
+
+
+def delete_price_alerts(alert_ids: set[int]) -> None:
+    """Once price alerts are sent, delete them to remove triggered alerts."""
+    PriceAlert.objects.filter(id__in=alert_ids).delete()
+
+
+def deactivate_price_alerts(alert_ids: set[int]) -> None:
+    """Once price alerts are sent, deactivate them to prevent sending them again."""
+    PriceAlert.objects.filter(id__in=alert_ids, is_active=True).update(is_active=False)
@@ -0,0 +1,75 @@
+"""
+Per-tenant leases for scheduled runs.
+
+The lease lives on the tenant's Schedule row: a run owns it while `lock_token` is its token and `locked_until`
+is in the future. The chunks of the run extend it (heartbeat), so a run that is still making progress keeps it,
+while the lease of a crashed run expires after config.SCHEDULED_RUN_LOCK_TTL_SECONDS.
+"""
+
+import logging
+from datetime import datetime, timedelta
+
+from django.db.models import Q, QuerySet
+from django.utils import timezone
+
+import config
+from main.models import Schedule
+
+logger = logging.getLogger(__name__)
+
+
+def _lock_ttl() -> timedelta:
+    return timedelta(seconds=config.SCHEDULED_RUN_LOCK_TTL_SECONDS)
+
+
+def acquire_run_lock(tenant_id: int, token: str) -> bool:
+    """Takes the tenant's run lock unless another run holds an unexpired lease.
+
+    Args:
+        tenant_id: ID of the tenant.
+        token: Unique token of the run.
+
+    Returns:
+        True if the lock was acquired.
+    """
+    now = timezone.now()
+    acquired = (
+        Schedule.objects.filter(tenant_id=tenant_id)
+        .filter(Q(locked_until__isnull=True) | Q(locked_until__lte=now))
+        .update(lock_token=token, locked_at=now, locked_until=now + _lock_ttl())
+    )
+    return bool(acquired)
+
+
+def extend_run_lock(tenant_id: int, token: str) -> bool:
+    """Heartbeat of a running run: pushes the lease expiry one TTL forward.
+
+    Returns:
+        False if the run no longer owns the lock (e.g. the lease expired and another run took it).
+    """
+    extended = Schedule.objects.filter(tenant_id=tenant_id, lock_token=token).update(
+        locked_until=timezone.now() + _lock_ttl()
+    )
+    if not extended:
+        logger.warning("Run %s of tenant %s lost its lock", token, tenant_id)
+    return bool(extended)
+
+
+def release_run_lock(tenant_id: int, token: str) -> datetime | None:
+    """Releases the tenant's run lock if the run still owns it.
+
+    Returns:
+        When the lock was acquired, None if the run no longer owned it.
+    """
+    locked_at = (
+        Schedule.objects.filter(tenant_id=tenant_id, lock_token=token).values_list("locked_at", flat=True).first()
+    )
+    Schedule.objects.filter(tenant_id=tenant_id, lock_token=token).update(
+        lock_token="", locked_at=None, locked_until=None
+    )
+    return locked_at
+
+
+def get_locked_tenant_ids() -> QuerySet:
+    """Tenants whose scheduled run is in progress."""
+    return Schedule.objects.filter(locked_until__gt=timezone.now()).values("tenant_id")
@@ -3,64 +3,156 @@ Task scheduling and management utilities for periodic tasks and scheduling.
 """
 
 import logging
+from datetime import timedelta
 
 from django.contrib.auth import get_user_model
-from django.core.handlers.wsgi import WSGIRequest
-from django_celery_beat.models import PeriodicTask
+from django.db.models import Count, Q
+from django.db.models.functions import TruncMinute
+from django.utils import timezone
 
+import config
 from accounts.models import Tenant, PaymentPlan
 from main.exceptions import PlanScheduleLimitationException
+from main.models import Item, Schedule, ScrapeJob
+from main.tasks import scrape_job_task
 
 logger = logging.getLogger(__name__)
 User = get_user_model()
 
 
-def task_name(user: User) -> str:
-    """Get the task name for a user.
+def start_scrape_job(
+    tenant: Tenant,
+    skus: list[str],
+    kind: str = ScrapeJob.Kind.SCRAPE,
+    reserved_skus: int = 0,
+    reserved_parse_units: int = 0,
+) -> ScrapeJob:
+    """Create a ScrapeJob for the given SKUs and queue it for a Celery worker.
+
+    Args:
+        tenant: The tenant the scraped items belong to.
+        skus: List of SKUs to scrape.
+        kind: ScrapeJob.Kind of the job (adding new items or updating existing ones).
+        reserved_skus: SKUs of the tenant's quota reserved for the job (see billing.reserve_quota).
+        reserved_parse_units: Parse units of the tenant's quota reserved for the job.
+
+    Returns:
+        The created ScrapeJob. Its progress can be polled via the scrape_job_progress view.
+    """
+    job = ScrapeJob.objects.create(
+        tenant=tenant,
+        kind=kind,
+        skus=skus,
+        total=len(skus),
+        reserved_skus=reserved_skus,
+        reserved_parse_units=reserved_parse_units,
+    )
+    result = scrape_job_task.delay(job.id)
+    ScrapeJob.objects.filter(id=job.id).update(task_id=result.id)
+    logger.info("Scrape job %s queued for tenant %s with %s SKUs", job.id, tenant.id, len(skus))
+    return job
+
+
+def schedule_exists(user: User) -> bool:
+    """Checks whether the user's tenant has a scrape schedule.
 
     Args:
         user: The user object.
 
     Returns:
-        The task name string.
+        True if the schedule exists, False otherwise.
     """
-    return f"task_tenant_{user.tenant.id}"
+    return Schedule.objects.filter(tenant_id=user.tenant.id).exists()
+
 
+def reschedule_items(schedule: Schedule) -> None:
+    """Sync the due times of the tenant's items with its schedule.
 
-def periodic_task_exists(request: WSGIRequest) -> bool:
-    """Checks for the existence of a periodic task with the given name.
+    Inactive items are taken off the schedule. Active items that are not scheduled yet, or are scheduled
+    later than the next run of the schedule (e.g. the interval was shortened), become due at the next run.
+    Items that are already due sooner keep their place.
 
     Args:
-        request: The WSGI request object.
+        schedule: The tenant's Schedule.
+    """
+    next_run_at = schedule.get_next_run_at(timezone.now())
+    tenant_items = Item.objects.filter(tenant_id=schedule.tenant_id)
+    tenant_items.filter(is_parser_active=False).exclude(next_run_at=None).update(next_run_at=None)
+    rescheduled = tenant_items.filter(
+        Q(is_parser_active=True) & (Q(next_run_at=None) | Q(next_run_at__gt=next_run_at))
+    ).update(next_run_at=next_run_at)
+    logger.info("Rescheduled %s items of tenant %s to %s", rescheduled, schedule.tenant_id, next_run_at)
+
+
+def get_scheduler_capacity(window_minutes: int = 60) -> dict:
+    """Estimates the load that the scrape schedules put on WB and on the scheduled workers.
+
+    Every scheduled SKU is a single request to WB.
+
+    Args:
+        window_minutes: How many minutes ahead to look at the items' due times.
 
     Returns:
-        True if the task exists, False otherwise.
+        A dictionary with:
+            - average_rpm: expected requests per minute across all schedules, averaged over their intervals
+            - overdue: number of active items that are already due but have not been dispatched yet
+            - per_minute: list of (minute, requests) for each minute of the window, based on items' next_run_at
+            - peak_rpm: the busiest minute of the window
+            - schedules: list of (schedule, active items, requests per minute), busiest schedules first
     """
-    try:
-        PeriodicTask.objects.get(
-            name=task_name(request),
+    now = timezone.now()
+    window_start = now.replace(second=0, microsecond=0)
+
+    schedules = []
+    for schedule in (
+        Schedule.objects.filter(tenant__isnull=False)
+        .select_related("tenant")
+        .annotate(active_items=Count("tenant__item", filter=Q(tenant__item__is_parser_active=True)))
+    ):
+        schedule_rpm = schedule.active_items / (schedule.run_every.total_seconds() / 60)
+        schedules.append((schedule, schedule.active_items, round(schedule_rpm, 2)))
+    schedules.sort(key=lambda row: row[2], reverse=True)
+
+    active_items = Item.objects.filter(is_parser_active=True)
+    due_per_minute = dict(
+        active_items.filter(
+            next_run_at__gte=window_start, next_run_at__lt=window_start + timedelta(minutes=window_minutes)
         )
-        return True
-    except PeriodicTask.DoesNotExist:
-        return False
+        .annotate(minute=TruncMinute("next_run_at"))
+        .values("minute")
+        .annotate(requests=Count("id"))
+        .values_list("minute", "requests")
+    )
+    per_minute = [
+        (minute, due_per_minute.get(minute, 0))
+        for minute in (window_start + timedelta(minutes=offset) for offset in range(window_minutes))
+    ]
+
+    return {
+        "average_rpm": round(sum(row[2] for row in schedules), 2),
+        "overdue": active_items.filter(next_run_at__lt=window_start).count(),
+        "per_minute": per_minute,
+        "peak_rpm": max((requests for _, requests in per_minute), default=0),
+        "schedules": schedules,
+    }
 
 
-def get_interval_russian_translation(periodic_task: PeriodicTask) -> str:
+def get_interval_russian_translation(schedule: Schedule) -> str:
     """
-    Translates the interval of a periodic task into Russian.
+    Translates the interval of a scrape schedule into Russian.
 
     It takes into account the grammatical rules of the Russian language for numbers and units of time.
     The function supports translation for seconds, minutes, hours, and days.
 
     Args:
-        periodic_task (PeriodicTask): The periodic task object which contains the interval to be translated.
+        schedule (Schedule): The schedule object which contains the interval to be translated.
 
     Returns:
-        str: A string in Russian that represents the interval of the periodic task.
+        str: A string in Russian that represents the interval of the schedule.
              The string is in the format: "{every} {time_unit_number} {time_unit_name}" (e.g. "каждые 25 минут")
     """
-    time_unit_number: int = periodic_task.interval.every
-    time_unit_name: str = periodic_task.interval.period
+    time_unit_number: int = schedule.interval_value
+    time_unit_name: str = schedule.period
 
     translations = {
         "seconds": ["секунду", "секунды", "секунд"],
@@ -102,7 +194,7 @@ def check_plan_schedule_limitations(tenant: Tenant, period: str, interval: int)
     """
     # Currently, we only have schedule limitations for the FREE plan
     if tenant.payment_plan.name == PaymentPlan.PlanName.FREE.value:
-        if period == "hours" and interval < 24:
+        if period == "hours" and interval < config.FREE_PLAN_MIN_SCHEDULE_INTERVAL_HOURS:
             raise PlanScheduleLimitationException(
                 tenant,
                 plan=tenant.payment_plan.name,
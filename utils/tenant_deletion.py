@@ -0,0 +1,116 @@
+"""
+Deletion of tenants with all their data.
+
+Deleting a tenant with Django's cascade collector loads every related row (items, their prices, alerts, orders, ...)
+into memory first, which doesn't work for large tenants. Instead, the tenant is marked as deleted right away
+and its data is purged in the background table by table, in bounded batches of raw DELETEs.
+"""
+
+import logging
+from typing import Callable
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import Group
+from django.db import connection, transaction
+from django.db.models import QuerySet
+
+import config
+from accounts.models import Tenant, TenantStatus
+from accounts.tenant_context import invalidate_tenant_context
+from main.models import Item, Order, Payment, Price, Schedule, ScheduledRun, ScrapeJob
+from notifier.models import DeadLetterNotification, NotificationChannel, NotificationOutbox, PriceAlert
+
+logger = logging.getLogger(__name__)
+User = get_user_model()
+
+
+def mark_tenant_deleted(tenant: Tenant) -> None:
+    """Mark the tenant as deleted and stop everything that could still use its data.
+
+    Its users can no longer log in and its scheduled updates are stopped. The data itself is purged by purge_tenant.
+    """
+    with transaction.atomic():
+        Tenant.objects.filter(id=tenant.id).update(status=TenantStatus.DELETED)
+        User.objects.filter(tenant=tenant).update(is_active=False)
+        Schedule.objects.filter(tenant=tenant).delete()
+        Item.objects.filter(tenant=tenant, next_run_at__isnull=False).update(next_run_at=None)
+    invalidate_tenant_context(tenant.id)
+    logger.info("Tenant %s marked as deleted", tenant.id)
+
+
+def _get_purge_querysets(tenant: Tenant) -> list[QuerySet]:
+    """The tenant's data, in the order in which it can be deleted without violating foreign keys."""
+    return [
+        NotificationOutbox.objects.filter(tenant=tenant),
+        NotificationChannel.objects.filter(tenant=tenant),
+        DeadLetterNotification.objects.filter(tenant=tenant),
+        PriceAlert.items.through.objects.filter(pricealert__tenant=tenant),
+        PriceAlert.objects.filter(tenant=tenant),
+        Price.objects.filter(item__tenant=tenant),
+        Item.objects.filter(tenant=tenant),
+        ScheduledRun.objects.filter(tenant=tenant),
+        ScrapeJob.objects.filter(tenant=tenant),
+        Payment.objects.filter(tenant=tenant),
+        Order.objects.filter(tenant=tenant),
+    ]
+
+
+def delete_in_batches(queryset: QuerySet, batch_size: int) -> int:
+    """Delete the rows of the queryset with raw `DELETE ... WHERE id IN (...)` statements of at most `batch_size` ids.
+
+    Bypasses the cascade collector and signals, so the rows that reference these rows must be deleted first.
+
+    Returns:
+        Number of deleted rows.
+    """
+    meta = queryset.model._meta
+    table = connection.ops.quote_name(meta.db_table)
+    pk_column = connection.ops.quote_name(meta.pk.column)
+    deleted = 0
+    while True:
+        ids = list(queryset.order_by().values_list("pk", flat=True)[:batch_size])
+        if not ids:
+            return deleted
+        placeholders = ", ".join(["%s"] * len(ids))
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {table} WHERE {pk_column} IN ({placeholders})", ids)
+        deleted += len(ids)
+
+
+def purge_tenant(
+    tenant_id: int,
+    batch_size: int = config.TENANT_DELETION_BATCH_SIZE,
+    on_progress: Callable[[str, int], None] | None = None,
+) -> dict[str, int]:
+    """Delete the tenant and all its data, table by table in batches.
+
+    Can be safely rerun if interrupted.
+
+    Args:
+        tenant_id: ID of the tenant (marked by mark_tenant_deleted).
+        batch_size: Number of rows deleted per statement.
+        on_progress: Called with the model label and the number of its deleted rows after each table.
+
+    Returns:
+        Dictionary of model label -> number of deleted rows.
+    """
+    tenant = Tenant.objects.filter(id=tenant_id).first()
+    if tenant is None:
+        logger.warning("Tenant %s is already deleted", tenant_id)
+        return {}
+
+    deleted = {}
+    for queryset in _get_purge_querysets(tenant):
+        label = queryset.model._meta.label
+        deleted[label] = delete_in_batches(queryset, batch_size)
+        logger.info("Deleted %s %s rows of tenant %s", deleted[label], label, tenant_id)
+        if on_progress:
+            on_progress(label, deleted[label])
+
+    # only a few rows are left, the cascade collector can take care of them (profiles, email addresses, etc.)
+    with transaction.atomic():
+        User.objects.filter(tenant=tenant).delete()
+        Group.objects.filter(name=tenant.name).delete()
+        tenant.delete()
+    logger.info("Tenant %s deleted", tenant_id)
+    return deleted